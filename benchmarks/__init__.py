@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for LexAI.
+
+Run ``python -m benchmarks.run --help`` for usage.
+"""
@@ -0,0 +1,66 @@
+"""
+In-process stand-in for the OpenAI client used by end-to-end benchmarks.
+
+It answers ``embeddings.create`` and ``chat.completions.create`` after a
+configurable delay, so benchmarks measure LexAI's own overhead on top of a
+known upstream latency without network access or API costs. Its
+embeddings match those of the HTTP fake in ``lexai.tools.fake_openai``.
+"""
+
+import time
+from types import SimpleNamespace
+from typing import Union
+
+from lexai.tools.fake_openai import fake_embedding
+
+
+class _Embeddings:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, input: Union[str, list[str]], model: str, **_):
+        self._owner.sleep(self._owner.embedding_latency)
+        texts = [input] if isinstance(input, str) else list(input)
+        return SimpleNamespace(data=[
+            SimpleNamespace(
+                index=i, embedding=fake_embedding(text, self._owner.dim).tolist()
+            )
+            for i, text in enumerate(texts)
+        ])
+
+
+class _Completions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, model: str, messages: list[dict], **_):
+        self._owner.sleep(self._owner.chat_latency)
+        message = SimpleNamespace(content="Synthetic answer.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeOpenAI:
+    """
+    Minimal synchronous OpenAI client with simulated latency.
+
+    Parameters
+    ----------
+    dim : int
+        The dimensionality of the returned embeddings.
+    embedding_latency : float
+        Seconds to wait before answering an embeddings request.
+    chat_latency : float
+        Seconds to wait before answering a chat completion request.
+    """
+
+    def __init__(self, dim: int, embedding_latency: float, chat_latency: float):
+        self.dim = dim
+        self.embedding_latency = embedding_latency
+        self.chat_latency = chat_latency
+        self.embeddings = _Embeddings(self)
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    @staticmethod
+    def sleep(seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
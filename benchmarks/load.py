@@ -0,0 +1,294 @@
+"""
+Open-loop load generator for a running LexAI server.
+
+Sends queries at a fixed target rate, regardless of how quickly earlier
+requests complete, so queueing shows up as latency instead of being hidden
+by a slower send rate. Sweeping several rates gives a saturation curve: the
+achieved throughput and tail latency at each offered load. Usage::
+
+    python -m lexai.tools.fake_openai --port 8100 &
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 python -m lexai &
+    python -m benchmarks.load --url http://127.0.0.1:7860 \\
+        --qps 1,2,5,10,20,50 --duration 30 --output load.json
+
+``--target http`` (the default) posts to the JSON ``/api/query`` endpoint;
+``--target gradio`` calls the Gradio submit handler through
+``gradio_client``. A level is marked saturated when it completes less than
+90% of the requests that arrived or its p95 latency exceeds ``--slo-ms``.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, Sequence
+
+from benchmarks.report import save_results, summarize_latencies
+
+DEFAULT_QUERIES = (
+    "Can I build a backyard fire pit at my home?",
+    "What permits are required to build an accessory dwelling unit (ADU)?",
+    "Are there restrictions on short-term rentals (e.g., Airbnb)?",
+    "What are the setback requirements for residential construction?",
+    "Is a fence over 6 feet allowed without a permit?",
+    "Can I run a home-based business from my residence?",
+)
+SATURATION_THROUGHPUT = 0.9
+
+# Sends one query and returns whether it succeeded.
+SendFunction = Callable[[str], Awaitable[bool]]
+
+
+async def run_level(
+    send: SendFunction,
+    queries: Sequence[str],
+    qps: float,
+    duration: float,
+    max_in_flight: int = 1000,
+    poisson: bool = True,
+    seed: int = 0,
+) -> dict[str, float]:
+    """
+    Offers ``qps`` requests per second for ``duration`` seconds.
+
+    Parameters
+    ----------
+    send : SendFunction
+        Sends one query and returns True if it succeeded.
+    queries : Sequence[str]
+        Queries to send, in rotation.
+    qps : float
+        The offered load, in requests per second.
+    duration : float
+        How long to offer load, in seconds. In-flight requests are awaited
+        afterwards.
+    max_in_flight : int, optional
+        Arrivals beyond this many outstanding requests are dropped and
+        counted, to keep a saturated server from exhausting the client.
+    poisson : bool, optional
+        Whether arrivals are exponentially spaced (the default) or uniform.
+    seed : int, optional
+        Seed for the arrival process.
+
+    Returns
+    -------
+    dict[str, float]
+        ``offered_qps``, ``arrival_qps`` (the rate actually drawn by the
+        arrival process), ``achieved_qps``, ``sent``, ``errors``,
+        ``dropped``, ``error_rate`` and the latency summary of the
+        successful requests.
+    """
+    rng = random.Random(seed)
+    latencies: list[float] = []
+    outcome = {"errors": 0, "dropped": 0}
+    in_flight: set[asyncio.Task] = set()
+
+    async def one(query: str) -> None:
+        start = time.perf_counter()
+        try:
+            ok = await send(query)
+        except Exception:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - start)
+        else:
+            outcome["errors"] += 1
+
+    start = time.perf_counter()
+    next_arrival = start
+    sent = 0
+    while next_arrival - start < duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            outcome["dropped"] += 1
+        else:
+            task = asyncio.create_task(one(queries[sent % len(queries)]))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            sent += 1
+        gap = rng.expovariate(qps) if poisson else 1.0 / qps
+        next_arrival += gap
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    elapsed = time.perf_counter() - start
+
+    attempted = sent + outcome["dropped"]
+    failed = outcome["errors"] + outcome["dropped"]
+    return {
+        "offered_qps": qps,
+        "arrival_qps": attempted / duration,
+        "achieved_qps": len(latencies) / elapsed if elapsed else 0.0,
+        "sent": sent,
+        "errors": outcome["errors"],
+        "dropped": outcome["dropped"],
+        "error_rate": failed / attempted if attempted else 0.0,
+        **summarize_latencies(latencies),
+    }
+
+
+def is_saturated(level: dict[str, float], slo_ms: float) -> bool:
+    """
+    Returns whether a level missed its throughput or p95 latency target.
+
+    Throughput is compared with the arrival rate rather than the nominal
+    offered load, so random Poisson gaps are not mistaken for saturation.
+    """
+    if level["achieved_qps"] < SATURATION_THROUGHPUT * level["arrival_qps"]:
+        return True
+    return level.get("p95_ms", float("inf")) > slo_ms
+
+
+async def run_sweep(
+    send: SendFunction,
+    queries: Sequence[str],
+    rates: Sequence[float],
+    duration: float,
+    slo_ms: float,
+    max_in_flight: int = 1000,
+    poisson: bool = True,
+) -> dict:
+    """
+    Runs ``run_level`` at each rate and summarizes the saturation curve.
+
+    Rates are tried in order, and the sweep stops after the first saturated
+    level rather than pushing an overloaded server further.
+
+    Returns
+    -------
+    dict
+        ``levels``, one entry per rate tried with a ``saturated`` flag, and
+        ``max_sustainable_qps``, the highest rate below the first saturated
+        one (0 if even the lowest rate saturated).
+    """
+    levels = []
+    max_sustainable = 0.0
+    for i, qps in enumerate(rates):
+        level = await run_level(
+            send, queries, qps, duration, max_in_flight, poisson, seed=i
+        )
+        level["saturated"] = is_saturated(level, slo_ms)
+        levels.append(level)
+        print(_format_level(level))
+        if level["saturated"]:
+            break
+        max_sustainable = qps
+    return {"levels": levels, "max_sustainable_qps": max_sustainable, "slo_ms": slo_ms}
+
+
+def _format_level(level: dict) -> str:
+    return (
+        f"offered {level['offered_qps']:7.2f}/s  "
+        f"achieved {level['achieved_qps']:7.2f}/s  "
+        f"p50 {level.get('p50_ms', float('nan')):8.1f} ms  "
+        f"p95 {level.get('p95_ms', float('nan')):8.1f} ms  "
+        f"p99 {level.get('p99_ms', float('nan')):8.1f} ms  "
+        f"errors {level['error_rate']:6.1%}"
+        + ("  SATURATED" if level["saturated"] else "")
+    )
+
+
+def http_sender(url: str, location: Sequence[str], timeout: float):
+    """
+    Returns a sender posting to ``/api/query`` and its client, to be closed.
+    """
+    import httpx
+
+    client = httpx.AsyncClient(
+        base_url=url,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=100),
+    )
+    location = list(location) if len(location) > 1 else location[0]
+
+    async def send(query: str) -> bool:
+        response = await client.post(
+            "/api/query", json={"query": query, "location": location}
+        )
+        return response.status_code == 200 and "error_html" not in response.json()
+
+    return send, client
+
+
+def gradio_sender(url: str, location: Sequence[str], api_name: str):
+    """
+    Returns a sender calling the Gradio submit handler via ``gradio_client``.
+    """
+    from gradio_client import Client
+
+    client = Client(url, verbose=False)
+
+    async def send(query: str) -> bool:
+        await asyncio.to_thread(
+            client.predict, query, list(location), api_name=api_name
+        )
+        return True
+
+    return send, None
+
+
+def _read_queries(path: Optional[str]) -> list[str]:
+    if path is None:
+        return list(DEFAULT_QUERIES)
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+async def _main(args: argparse.Namespace) -> dict:
+    locations = [loc.strip() for loc in args.location.split(",")]
+    if args.target == "gradio":
+        send, client = gradio_sender(args.url, locations, args.api_name)
+    else:
+        send, client = http_sender(args.url, locations, args.timeout)
+    try:
+        results = await run_sweep(
+            send,
+            _read_queries(args.queries),
+            [float(rate) for rate in args.qps.split(",")],
+            args.duration,
+            args.slo_ms,
+            args.max_in_flight,
+            poisson=not args.uniform,
+        )
+    finally:
+        if client is not None:
+            await client.aclose()
+    results.update(target=args.target, url=args.url, location=locations)
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Runs a load sweep from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Load-test a LexAI server.")
+    parser.add_argument("--url", default="http://127.0.0.1:7860")
+    parser.add_argument("--target", choices=("http", "gradio"), default="http")
+    parser.add_argument("--api-name", default="/handle_submit_stream",
+                        help="Gradio endpoint for --target gradio.")
+    parser.add_argument("--location", default="Denver",
+                        help="Comma-separated jurisdictions.")
+    parser.add_argument("--queries", help="File with one query per line.")
+    parser.add_argument("--qps", default="1,2,5,10,20",
+                        help="Comma-separated offered loads, in requests/s.")
+    parser.add_argument("--duration", type=float, default=30.0,
+                        help="Seconds of load per level.")
+    parser.add_argument("--slo-ms", type=float, default=5000.0,
+                        help="p95 latency above which a level is saturated.")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--uniform", action="store_true",
+                        help="Space arrivals evenly instead of as a Poisson process.")
+    parser.add_argument("--output", help="Write the sweep results to this file.")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(_main(args))
+    print(f"Max sustainable load: {results['max_sustainable_qps']:g} req/s")
+    if args.output:
+        save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
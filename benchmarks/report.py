@@ -0,0 +1,144 @@
+"""
+Latency statistics, result files and baseline comparison for benchmarks.
+
+A result file maps each corpus size to its stages, and each stage to a
+flat dictionary of metrics. Baseline comparisons look at the p50/p95/p99
+latencies and peak RSS (lower is better) and at throughputs, whose names end
+in ``_per_s`` (higher is better). Usage::
+
+    python -m benchmarks.report results.json baseline.json --tolerance 0.15
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+
+
+def summarize_latencies(latencies: Sequence[float]) -> dict[str, float]:
+    """
+    Summarizes per-call latencies, given in seconds.
+
+    Parameters
+    ----------
+    latencies : Sequence[float]
+        One duration per call.
+
+    Returns
+    -------
+    dict[str, float]
+        ``count``, ``mean_ms``, ``p50_ms``, ``p95_ms``, ``p99_ms`` and
+        ``max_ms``.
+    """
+    if not latencies:
+        return {"count": 0}
+    values = np.asarray(latencies, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(values.max()),
+    }
+
+
+def save_results(results: dict[str, Any], path: str) -> None:
+    """
+    Writes benchmark results as indented JSON.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> dict[str, Any]:
+    """
+    Reads a benchmark result file.
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float = 0.10,
+    min_delta_ms: float = 0.5,
+) -> list[str]:
+    """
+    Lists the metrics that regressed by more than ``tolerance``.
+
+    Only sizes, stages and metrics present in both files are compared, and
+    only the metrics described in the module docstring. Latency changes
+    smaller than ``min_delta_ms`` are ignored as timer noise.
+
+    Parameters
+    ----------
+    current : dict[str, Any]
+        The new results.
+    baseline : dict[str, Any]
+        The reference results.
+    tolerance : float, optional
+        The allowed relative slowdown, by default 10%.
+    min_delta_ms : float, optional
+        The smallest absolute latency increase reported, by default 0.5 ms.
+
+    Returns
+    -------
+    list[str]
+        One human-readable line per regression; empty if none.
+    """
+    regressions = []
+    for size, stages in current.get("results", {}).items():
+        baseline_stages = baseline.get("results", {}).get(size, {})
+        for stage, metrics in stages.items():
+            baseline_metrics = baseline_stages.get(stage, {})
+            for name, value in metrics.items():
+                reference = baseline_metrics.get(name)
+                if not isinstance(value, (int, float)) or not reference:
+                    continue
+                if name in LOWER_IS_BETTER:
+                    regressed = value > reference * (1 + tolerance) and not (
+                        name.endswith("_ms") and value - reference < min_delta_ms
+                    )
+                elif name.endswith("_per_s"):
+                    regressed = value < reference * (1 - tolerance)
+                else:
+                    continue
+                if regressed:
+                    regressions.append(
+                        f"{size} {stage}.{name}: {reference:.3f} -> {value:.3f} "
+                        f"({(value - reference) / reference:+.1%})"
+                    )
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Compares two result files and exits non-zero on regressions.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare benchmark results against a baseline."
+    )
+    parser.add_argument("current", help="New result file.")
+    parser.add_argument("baseline", help="Baseline result file.")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    regressions = compare_results(
+        load_results(args.current), load_results(args.baseline), args.tolerance
+    )
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
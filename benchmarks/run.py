@@ -0,0 +1,420 @@
+"""
+Benchmarks corpus loading, retrieval and end-to-end query latency.
+
+Usage::
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 1000,10000,100000,1000000 \\
+        --output results.json --baseline benchmarks/baseline.json
+
+For each corpus size a synthetic corpus is generated (and cached in
+``--data-dir``), then every stage runs in a fresh subprocess so its peak RSS
+is measured in isolation:
+
+- ``load_npz``: ``load_embeddings`` on a legacy float64 .npz file (only for
+  sizes up to ``--npz-max-sections``).
+- ``load_corpus``: ``load_embeddings`` on a memory-mapped corpus directory.
+- ``corpus_load``: ``Corpus.load``, i.e. loading plus building the engine.
+- ``find_top_matches``: the stateless matcher, one query at a time.
+- ``corpus_search``: the resident engine used by the app.
+- ``search_batch``: ``Corpus.search_batch`` with ``--batch-size`` queries.
+- ``e2e``: ``generate_matches`` against an in-process fake OpenAI client
+  with the configured latencies, sequentially and then with
+  ``--concurrency`` threads.
+
+Results are written to ``--output`` as JSON. With ``--baseline`` the run
+exits non-zero if any latency, throughput or memory metric regressed by more
+than ``--tolerance`` (see ``benchmarks.report``).
+"""
+
+import argparse
+import datetime
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Sequence
+
+import numpy as np
+
+from benchmarks.fake_client import FakeOpenAI, fake_embedding
+from benchmarks.report import (
+    compare_results,
+    load_results,
+    save_results,
+    summarize_latencies,
+)
+from benchmarks.synthetic import make_corpus, npz_path
+
+logger = logging.getLogger(__name__)
+
+STAGES = (
+    "load_npz",
+    "load_corpus",
+    "corpus_load",
+    "find_top_matches",
+    "corpus_search",
+    "search_batch",
+    "e2e",
+)
+
+DEFAULT_SIZES = "1000,10000,100000"
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(__file__), ".data")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Returns this process's peak resident set size in MiB, if available.
+
+    On Linux ``VmHWM`` is used, because ``ru_maxrss`` survives ``exec`` and
+    would report the parent's peak in a freshly spawned stage process.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _timed(fn: Callable[[], Any], repeats: int) -> list[float]:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _throughput(latencies: Sequence[float], items_per_call: int = 1) -> float:
+    total = sum(latencies)
+    return len(latencies) * items_per_call / total if total else 0.0
+
+
+def _queries(count: int, dim: int, prefix: str = "benchmark query") -> np.ndarray:
+    return np.array([fake_embedding(f"{prefix} {i}", dim) for i in range(count)])
+
+
+def bench_load(path: str, repeats: int) -> dict[str, Any]:
+    from lexai.core.data_loader import load_embeddings
+
+    latencies = _timed(lambda: load_embeddings(path), repeats)
+    return summarize_latencies(latencies)
+
+
+def bench_corpus_load(path: str, repeats: int) -> dict[str, Any]:
+    from lexai.core.corpus_registry import Corpus
+
+    latencies = _timed(lambda: Corpus.load("Benchmark", path), repeats)
+    return summarize_latencies(latencies)
+
+
+def bench_find_top_matches(path: str, dim: int, num_queries: int) -> dict[str, Any]:
+    from lexai.core.data_loader import load_embeddings
+    from lexai.core.matcher import find_top_matches
+
+    embeddings, metadata = load_embeddings(path)
+    queries = iter(_queries(num_queries, dim))
+    latencies = _timed(
+        lambda: find_top_matches(next(queries), embeddings, metadata), num_queries
+    )
+    return {
+        **summarize_latencies(latencies),
+        "throughput_per_s": _throughput(latencies),
+    }
+
+
+def bench_corpus_search(path: str, dim: int, num_queries: int) -> dict[str, Any]:
+    from lexai.core.corpus_registry import Corpus
+
+    corpus = Corpus.load("Benchmark", path)
+    queries = iter(_queries(num_queries, dim))
+    latencies = _timed(lambda: corpus.search(next(queries)), num_queries)
+    return {
+        **summarize_latencies(latencies),
+        "throughput_per_s": _throughput(latencies),
+    }
+
+
+def bench_search_batch(
+    path: str,
+    dim: int,
+    num_queries: int,
+    batch_size: int,
+) -> dict[str, Any]:
+    from lexai.core.corpus_registry import Corpus
+
+    corpus = Corpus.load("Benchmark", path)
+    queries = _queries(num_queries, dim)
+    batches = iter([
+        queries[start:start + batch_size]
+        for start in range(0, num_queries, batch_size)
+    ])
+    num_batches = -(-num_queries // batch_size)
+    latencies = _timed(lambda: corpus.search_batch(next(batches)), num_batches)
+    return {
+        **summarize_latencies(latencies),
+        "throughput_per_s": num_queries / sum(latencies) if latencies else 0.0,
+    }
+
+
+def bench_e2e(
+    path: str,
+    dim: int,
+    num_queries: int,
+    concurrency: int,
+    embedding_latency: float,
+    chat_latency: float,
+) -> dict[str, Any]:
+    from unittest.mock import patch
+
+    import lexai.services.openai_client as openai_client
+    from lexai.core import match_engine
+    from lexai.core.corpus_registry import Corpus
+
+    corpus = Corpus.load("Benchmark", path)
+    location = next(iter(match_engine.LOCATION_INFO))
+    fake = FakeOpenAI(dim, embedding_latency, chat_latency)
+
+    def ask(query: str) -> None:
+        result = match_engine.generate_matches(query, location)
+        if "error_html" in result:
+            raise RuntimeError(result["error_html"])
+
+    with patch.object(openai_client, "client", fake), patch.object(
+        match_engine, "get_corpus", return_value=corpus
+    ):
+        texts = iter([f"benchmark question {i}" for i in range(num_queries)])
+        latencies = _timed(lambda: ask(next(texts)), num_queries)
+
+        concurrent_texts = [
+            f"benchmark concurrent question {i}" for i in range(num_queries)
+        ]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(ask, concurrent_texts))
+        elapsed = time.perf_counter() - start
+
+    return {
+        **summarize_latencies(latencies),
+        "throughput_per_s": _throughput(latencies),
+        "concurrent_throughput_per_s": num_queries / elapsed,
+    }
+
+
+def _run_stage(stage: str, options: dict[str, Any]) -> dict[str, Any]:
+    """
+    Runs one stage; executed in a fresh subprocess.
+    """
+    path, dim = options["path"], options["dim"]
+    queries, repeats = options["queries"], options["load_repeats"]
+    if stage == "load_npz":
+        metrics = bench_load(options["npz_path"], repeats)
+    elif stage == "load_corpus":
+        metrics = bench_load(path, repeats)
+    elif stage == "corpus_load":
+        metrics = bench_corpus_load(path, repeats)
+    elif stage == "find_top_matches":
+        metrics = bench_find_top_matches(path, dim, queries)
+    elif stage == "corpus_search":
+        metrics = bench_corpus_search(path, dim, queries)
+    elif stage == "search_batch":
+        metrics = bench_search_batch(path, dim, queries, options["batch_size"])
+    elif stage == "e2e":
+        metrics = bench_e2e(
+            path,
+            dim,
+            queries,
+            options["concurrency"],
+            options["embedding_latency"],
+            options["chat_latency"],
+        )
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+    return {**metrics, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_benchmarks(
+    sizes: Sequence[int],
+    stages: Sequence[str] = STAGES,
+    dim: int = 1536,
+    queries: int = 100,
+    load_repeats: int = 3,
+    batch_size: int = 32,
+    concurrency: int = 16,
+    embedding_latency: float = 0.02,
+    chat_latency: float = 0.1,
+    npz_max_sections: int = 100_000,
+    data_dir: str = DEFAULT_DATA_DIR,
+    isolate: bool = True,
+) -> dict[str, Any]:
+    """
+    Runs the requested stages for every corpus size.
+
+    Parameters
+    ----------
+    sizes : Sequence[int]
+        Corpus sizes (number of sections) to benchmark.
+    stages : Sequence[str], optional
+        Stages to run; see ``STAGES``.
+    dim : int, optional
+        Embedding dimensionality, by default 1536.
+    queries : int, optional
+        Queries per search and end-to-end stage.
+    load_repeats : int, optional
+        How often each load stage is repeated.
+    batch_size : int, optional
+        Queries per ``search_batch`` call.
+    concurrency : int, optional
+        Threads used for the concurrent end-to-end measurement.
+    embedding_latency, chat_latency : float, optional
+        Simulated OpenAI latencies in seconds.
+    npz_max_sections : int, optional
+        Largest size for which a .npz file is generated and loaded.
+    data_dir : str, optional
+        Where synthetic corpora are cached between runs.
+    isolate : bool, optional
+        Run each stage in a fresh subprocess (needed for per-stage peak RSS).
+
+    Returns
+    -------
+    dict[str, Any]
+        ``{"meta": {...}, "results": {size: {stage: metrics}}}``.
+    """
+    results: dict[str, Any] = {}
+    context = multiprocessing.get_context("spawn")
+    for size in sizes:
+        with_npz = "load_npz" in stages and size <= npz_max_sections
+        logger.info(f"Preparing synthetic corpus with {size} sections.")
+        path = make_corpus(data_dir, size, dim, with_npz=with_npz)
+        options = {
+            "path": path,
+            "npz_path": npz_path(data_dir, size, dim),
+            "dim": dim,
+            "queries": queries,
+            "load_repeats": load_repeats,
+            "batch_size": batch_size,
+            "concurrency": concurrency,
+            "embedding_latency": embedding_latency,
+            "chat_latency": chat_latency,
+        }
+
+        size_results = {}
+        for stage in stages:
+            if stage == "load_npz" and not with_npz:
+                continue
+            logger.info(f"Running {stage} on {size} sections.")
+            if isolate:
+                with ProcessPoolExecutor(1, mp_context=context) as executor:
+                    metrics = executor.submit(_run_stage, stage, options).result()
+            else:
+                metrics = _run_stage(stage, options)
+            size_results[stage] = metrics
+        results[str(size)] = size_results
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "dim": dim,
+            "queries": queries,
+            "concurrency": concurrency,
+            "embedding_latency_ms": embedding_latency * 1000,
+            "chat_latency_ms": chat_latency * 1000,
+        },
+        "results": results,
+    }
+
+
+def _print_summary(results: dict[str, Any]) -> None:
+    print(f"{'size':>9}  {'stage':<17} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'per s':>9} {'RSS MiB':>9}")
+    for size, stages in results["results"].items():
+        for stage, metrics in stages.items():
+            print(
+                f"{size:>9}  {stage:<17} "
+                f"{metrics.get('p50_ms', 0):9.2f} {metrics.get('p95_ms', 0):9.2f} "
+                f"{metrics.get('p99_ms', 0):9.2f} "
+                f"{metrics.get('throughput_per_s', 0):9.1f} "
+                f"{metrics.get('peak_rss_mb') or 0:9.1f}"
+            )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Command-line entry point for the benchmark suite.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark LexAI's hot path.")
+    parser.add_argument(
+        "--sizes", default=DEFAULT_SIZES,
+        help=f"Comma-separated corpus sizes (default: {DEFAULT_SIZES}).",
+    )
+    parser.add_argument(
+        "--stages", default=",".join(STAGES),
+        help="Comma-separated stages to run (default: all).",
+    )
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--load-repeats", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=100.0)
+    parser.add_argument("--npz-max-sections", type=int, default=100_000)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Result file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    stages = [stage for stage in args.stages.split(",") if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(
+        [int(size) for size in args.sizes.split(",")],
+        stages=stages,
+        dim=args.dim,
+        queries=args.queries,
+        load_repeats=args.load_repeats,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        embedding_latency=args.embedding_latency_ms / 1000,
+        chat_latency=args.chat_latency_ms / 1000,
+        npz_max_sections=args.npz_max_sections,
+        data_dir=args.data_dir,
+    )
+    save_results(results, args.output)
+    _print_summary(results)
+    print(f"Results written to {args.output}.")
+
+    if args.baseline:
+        regressions = compare_results(
+            results, load_results(args.baseline), args.tolerance
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
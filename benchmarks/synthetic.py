@@ -0,0 +1,120 @@
+"""
+Synthetic corpora for benchmarking.
+
+Corpora are written in the memory-mapped corpus format (and optionally as a
+legacy .npz file) with random unit-length embeddings, so their size is
+realistic even though their content is not. Generation is chunked, so even a
+1M x 1536 corpus never needs the full matrix in memory.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from lexai.core.corpus_format import (
+    is_corpus_dir,
+    open_corpus,
+    read_manifest,
+    write_corpus,
+)
+
+_CHUNK_ROWS = 65536
+
+
+def _columns(num_sections: int) -> dict[str, list[str]]:
+    return {
+        "url": [f"https://example.com/code/{i}" for i in range(num_sections)],
+        "title": [f"Section {i}" for i in range(num_sections)],
+        "subtitle": [f"Subsection {i % 97}" for i in range(num_sections)],
+        "content": [
+            f"Synthetic ordinance text for section {i}. " * 8
+            for i in range(num_sections)
+        ],
+    }
+
+
+def corpus_path(directory: str, num_sections: int, dim: int) -> str:
+    """
+    Returns the path of the synthetic corpus directory for a size.
+    """
+    return os.path.join(directory, f"synthetic_{num_sections}x{dim}.corpus")
+
+
+def npz_path(directory: str, num_sections: int, dim: int) -> str:
+    """
+    Returns the path of the synthetic .npz file for a size.
+    """
+    return os.path.join(directory, f"synthetic_{num_sections}x{dim}.npz")
+
+
+def make_corpus(
+    directory: str,
+    num_sections: int,
+    dim: int = 1536,
+    seed: int = 0,
+    with_npz: bool = False,
+) -> str:
+    """
+    Writes a synthetic corpus, reusing one generated by an earlier run.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to write the corpus into.
+    num_sections : int
+        The number of sections (embedding rows).
+    dim : int, optional
+        The embedding dimensionality, by default 1536.
+    seed : int, optional
+        Seed for the random embeddings.
+    with_npz : bool, optional
+        Whether to also write a legacy float64 .npz file.
+
+    Returns
+    -------
+    str
+        The path to the corpus directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = corpus_path(directory, num_sections, dim)
+    if not (
+        is_corpus_dir(path)
+        and read_manifest(path)["count"] == num_sections
+        and read_manifest(path)["dim"] == dim
+    ):
+        _write_synthetic_corpus(path, num_sections, dim, seed)
+
+    if with_npz and not os.path.exists(npz_path(directory, num_sections, dim)):
+        _write_synthetic_npz(path, npz_path(directory, num_sections, dim))
+    return path
+
+
+def _write_synthetic_corpus(path: str, num_sections: int, dim: int, seed: int):
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(path)) as tmp:
+        embeddings = np.lib.format.open_memmap(
+            os.path.join(tmp, "embeddings.npy"),
+            mode="w+",
+            dtype=np.float32,
+            shape=(num_sections, dim),
+        )
+        for start in range(0, num_sections, _CHUNK_ROWS):
+            stop = min(start + _CHUNK_ROWS, num_sections)
+            chunk = rng.standard_normal((stop - start, dim), dtype=np.float32)
+            chunk /= np.linalg.norm(chunk, axis=1, keepdims=True)
+            embeddings[start:stop] = chunk
+        write_corpus(path, embeddings, _columns(num_sections))
+        del embeddings
+
+
+def _write_synthetic_npz(corpus_dir: str, output_path: str) -> None:
+    embeddings, metadata = open_corpus(corpus_dir)
+    np.savez(
+        output_path,
+        embeddings=np.asarray(embeddings, dtype=np.float64),
+        urls=np.array(metadata.columns["url"].tolist()),
+        titles=np.array(metadata.columns["title"].tolist()),
+        subtitles=np.array(metadata.columns["subtitle"].tolist()),
+        contents=np.array(metadata.columns["content"].tolist()),
+    )
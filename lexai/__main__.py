@@ -1,28 +1,170 @@
 """
 Entry point for launching the LexAI application.
 
-This script configures logging and starts the Gradio interface.
+This script configures logging and starts the Gradio interface. It also
+dispatches the ``lexai`` command-line subcommands:
+
+- ``lexai`` / ``lexai serve``: launch the web application, optionally
+  with ``--workers N`` worker processes sharing one port and one copy of
+  each corpus.
+- ``lexai ingest``: build a corpus from raw jurisdiction documents.
+- ``lexai batch``: answer a JSONL file of queries without the web interface.
 """
 
+import argparse
+import json
 import logging
+import os
+import sys
+import threading
+from typing import Optional, Sequence
 
 from dotenv import load_dotenv
 
-from lexai.ui.gradio_interface import build_interface
+from lexai.config import SERVE_WORKERS
+from lexai.startup import StartupTimer
+
+# Heavy modules (the web stack, NumPy, the OpenAI SDK) are imported inside
+# the subcommands that need them, and timed as part of startup.
 
 
 def run_lexai_app():
     """
-    Configures logging and launches the LexAI Gradio interface.
+    Configures logging, warms up every jurisdiction and launches the LexAI
+    Gradio interface, with request metrics served at ``/metrics``.
+
+    Corpora are loaded and searched once, in a background thread while the
+    web stack is imported, and the server only starts listening once that
+    warm-up has finished, so the first request does not pay for a cold
+    corpus. A startup timing report is logged just before serving.
     """
+    timer = StartupTimer()
     load_dotenv()
     logging.basicConfig(level=logging.INFO)
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
     logging.info("Launching LexAI...")
-    iface = build_interface()
-    iface.launch()
+    with timer.phase("import_core"):
+        from lexai.core.corpus_registry import corpus_registry
+        from lexai.core.match_engine import warm_up
+        from lexai.services import openai_client
+
+    def warm_up_all():
+        with timer.phase("warm_up_corpora"):
+            warm_up()
+        with timer.phase("warm_up_openai_clients"):
+            openai_client.warm_up()
+
+    warm_up_thread = threading.Thread(target=warm_up_all, name="lexai-warm-up")
+    warm_up_thread.start()
+    with timer.phase("import_web_stack"):
+        import uvicorn
+
+        from lexai.ui.server import create_app
+    with timer.phase("build_app"):
+        app = create_app()
+    with timer.phase("wait_for_warm_up"):
+        warm_up_thread.join()
+
+    corpus_registry.start_watcher()
+    timer.log()
+    uvicorn.run(
+        app,
+        host=os.getenv("GRADIO_SERVER_NAME", "127.0.0.1"),
+        port=int(os.getenv("GRADIO_SERVER_PORT", "7860")),
+    )
+
+
+def run_lexai_workers(workers: int):
+    """
+    Serves LexAI from ``workers`` processes behind one listening socket.
+
+    This process acts as the supervisor. It stages every corpus once, in
+    shared memory when needed (see ``lexai.core.shared_corpus``), and
+    points the workers at the staged copies through ``LEXAI_CORPUS_PATHS``.
+    While the server runs, it re-stages any corpus whose original changes,
+    so the workers hot-reload it. ``LEXAI_SERVE_WORKERS`` is set for the
+    workers, which divide the admission and upstream limits among
+    themselves, and ``LEXAI_METRICS_DIR`` points them at a directory where
+    they share their metrics, so that ``/metrics`` reports the whole server.
+
+    Uvicorn then binds the port and runs the workers, each of which builds
+    its application with ``lexai.ui.server.create_worker_app``. The staged
+    corpora and the metrics directory are removed when the server exits.
+    """
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    import uvicorn
+
+    from lexai.config import LOCATION_INFO
+    from lexai.core.shared_corpus import CorpusStager, staging_directory
+
+    logging.info(f"Launching LexAI with {workers} workers...")
+    with staging_directory() as staging_dir:
+        stager = CorpusStager(LOCATION_INFO, staging_dir)
+        paths = stager.stage_all()
+        os.environ["LEXAI_CORPUS_PATHS"] = json.dumps(paths)
+        os.environ["LEXAI_SERVE_WORKERS"] = str(workers)
+        metrics_dir = os.path.join(staging_dir, "metrics")
+        os.mkdir(metrics_dir)
+        os.environ["LEXAI_METRICS_DIR"] = metrics_dir
+        stager.start_watcher()
+        try:
+            uvicorn.run(
+                "lexai.ui.server:create_worker_app",
+                factory=True,
+                workers=workers,
+                host=os.getenv("GRADIO_SERVER_NAME", "127.0.0.1"),
+                port=int(os.getenv("GRADIO_SERVER_PORT", "7860")),
+            )
+        finally:
+            stager.stop_watcher()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Parses the command line and runs the requested subcommand.
+    """
+    load_dotenv()
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    parser = argparse.ArgumentParser(prog="lexai", description="LexAI legal assistant.")
+    subcommands = parser.add_subparsers(dest="command")
+    serve_parser = subcommands.add_parser(
+        "serve", help="Launch the web application (default)."
+    )
+    serve_parser.add_argument(
+        "--workers", type=int, default=SERVE_WORKERS,
+        help="Worker processes serving the app (default: 1, in-process).",
+    )
+    ingest_parser = subcommands.add_parser(
+        "ingest", help="Build a corpus from raw documents."
+    )
+    if argv[:1] == ["ingest"]:
+        # The ingestion pipeline (and the OpenAI SDK it imports) is only
+        # loaded for the subcommand that needs it.
+        from lexai.tools import ingest
+
+        ingest.add_arguments(ingest_parser)
+    batch_parser = subcommands.add_parser(
+        "batch", help="Answer a JSONL file of queries."
+    )
+    if argv[:1] == ["batch"]:
+        from lexai.tools import batch
+
+        batch.add_arguments(batch_parser)
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        ingest.run(args)
+    elif args.command == "batch":
+        batch.run(args)
+    elif getattr(args, "workers", SERVE_WORKERS) > 1:
+        run_lexai_workers(args.workers)
+    else:
+        run_lexai_app()
 
 
 if __name__ == "__main__":
-    run_lexai_app()
+    main()
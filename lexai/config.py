@@ -4,15 +4,64 @@ Configuration constants for the LexAI application.
 Includes application-wide text, dropdown options, and file paths.
 """
 
+import json
 import os
 
+# Points the OpenAI clients at a compatible server, e.g. the local fake in
+# lexai.tools.fake_openai; None uses the real API.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# Connection pool shared by every OpenAI call.
+OPENAI_MAX_CONNECTIONS = int(os.getenv("LEXAI_OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("LEXAI_OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("LEXAI_OPENAI_KEEPALIVE_EXPIRY", "30"))
+
+# Deadlines in seconds. The read timeout bounds each wait for data; the total
+# deadline bounds a call including its retries (for streamed answers, up to
+# the first chunk).
+EMBEDDING_CONNECT_TIMEOUT = float(os.getenv("LEXAI_EMBEDDING_CONNECT_TIMEOUT", "2"))
+EMBEDDING_READ_TIMEOUT = float(os.getenv("LEXAI_EMBEDDING_READ_TIMEOUT", "10"))
+EMBEDDING_TOTAL_TIMEOUT = float(os.getenv("LEXAI_EMBEDDING_TOTAL_TIMEOUT", "20"))
+CHAT_CONNECT_TIMEOUT = float(os.getenv("LEXAI_CHAT_CONNECT_TIMEOUT", "2"))
+CHAT_READ_TIMEOUT = float(os.getenv("LEXAI_CHAT_READ_TIMEOUT", "30"))
+CHAT_TOTAL_TIMEOUT = float(os.getenv("LEXAI_CHAT_TOTAL_TIMEOUT", "60"))
+
+# Retries on 429s, 5xx responses, timeouts and connection errors.
+OPENAI_MAX_RETRIES = int(os.getenv("LEXAI_OPENAI_MAX_RETRIES", "3"))
+OPENAI_RETRY_BASE_DELAY = float(os.getenv("LEXAI_OPENAI_RETRY_BASE_DELAY", "0.25"))
+OPENAI_RETRY_MAX_DELAY = float(os.getenv("LEXAI_OPENAI_RETRY_MAX_DELAY", "8"))
+
+# Hedged embedding requests: once at least EMBEDDING_HEDGE_MIN_SAMPLES calls
+# have been timed, a duplicate request is sent when a call outlives the
+# EMBEDDING_HEDGE_QUANTILE of recent latencies, and the first answer wins.
+EMBEDDING_HEDGE = os.getenv("LEXAI_EMBEDDING_HEDGE", "0") == "1"
+EMBEDDING_HEDGE_QUANTILE = float(os.getenv("LEXAI_EMBEDDING_HEDGE_QUANTILE", "0.95"))
+EMBEDDING_HEDGE_MIN_SAMPLES = int(
+    os.getenv("LEXAI_EMBEDDING_HEDGE_MIN_SAMPLES", "20")
+)
+
 EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_MAX_BATCH_SIZE = 2048
+EMBEDDING_COALESCE_WINDOW_MS = float(
+    os.getenv("LEXAI_EMBEDDING_COALESCE_WINDOW_MS", "5")
+)
+EMBEDDING_COALESCE_MAX_BATCH_SIZE = int(
+    os.getenv("LEXAI_EMBEDDING_COALESCE_MAX_BATCH_SIZE", "64")
+)
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("LEXAI_EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_TTL = float(os.getenv("LEXAI_EMBEDDING_CACHE_TTL", "604800"))
+EMBEDDING_CACHE_PATH = os.getenv("LEXAI_EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_DISK_MAX_ENTRIES = int(
+    os.getenv("LEXAI_EMBEDDING_CACHE_DISK_MAX_ENTRIES", "1000000")
+)
 
 LOCATION_INFO = {
     "Boulder": {
         "npz_file": os.getenv(
             "BOULDER_NPZ_FILE", "lexai/data/boulder_embeddings.npz"
         ),
+        "quantization": os.getenv("BOULDER_EMBEDDING_QUANTIZATION"),
         "role_description": (
             "You are an AI-powered legal assistant specializing in the jurisdiction "
             "of Boulder County, Colorado."
@@ -20,6 +69,7 @@ LOCATION_INFO = {
     },
     "Denver": {
         "npz_file": os.getenv("DENVER_NPZ_FILE", "lexai/data/denver_embeddings.npz"),
+        "quantization": os.getenv("DENVER_EMBEDDING_QUANTIZATION"),
         "role_description": (
             "You are an AI-powered legal assistant specializing in the jurisdiction "
             "of Denver, Colorado."
@@ -27,6 +77,94 @@ LOCATION_INFO = {
     },
 }
 
+# Corpus paths that override the ones above, as a JSON object keyed by
+# location. ``lexai serve --workers N`` sets it for its worker processes to
+# point them at the corpora it has staged in shared memory.
+for _location, _path in json.loads(os.getenv("LEXAI_CORPUS_PATHS", "{}")).items():
+    if _location in LOCATION_INFO:
+        LOCATION_INFO[_location]["npz_file"] = _path
+
+# Multi-process serving: worker processes behind the one port (1 serves from
+# the launching process), and where shared corpora are staged (by default
+# /dev/shm, when it exists).
+SERVE_WORKERS = int(os.getenv("LEXAI_SERVE_WORKERS", "1"))
+SHARED_CORPUS_DIR = os.getenv("LEXAI_SHARED_CORPUS_DIR") or None
+# Where the workers write their metrics snapshots, so that /metrics can sum
+# them (set by ``lexai serve --workers N``), and how often.
+METRICS_DIR = os.getenv("LEXAI_METRICS_DIR") or None
+METRICS_FLUSH_INTERVAL = float(os.getenv("LEXAI_METRICS_FLUSH_INTERVAL", "1"))
+
+
+def _per_worker(limit: int) -> int:
+    # Concurrency limits below are for the whole server; each of the
+    # SERVE_WORKERS processes enforces its share, and at least one slot.
+    if limit <= 0 or SERVE_WORKERS <= 1:
+        return limit
+    return max(limit // SERVE_WORKERS, 1)
+
+
+CORPUS_CHECK_INTERVAL = float(os.getenv("LEXAI_CORPUS_CHECK_INTERVAL", "5"))
+IVF_NPROBE = int(os.getenv("LEXAI_IVF_NPROBE", "8"))
+
+# "none", "float16" or "int8"; a location's "quantization" entry overrides it.
+EMBEDDING_QUANTIZATION = os.getenv("LEXAI_EMBEDDING_QUANTIZATION", "none")
+RESCORE_FACTOR = int(os.getenv("LEXAI_RESCORE_FACTOR", "4"))
+FANOUT_MAX_WORKERS = int(os.getenv("LEXAI_FANOUT_MAX_WORKERS", "8"))
+
+# Hybrid retrieval, for corpora with a lexical (BM25) index next to them.
+HYBRID_SEARCH = os.getenv("LEXAI_HYBRID_SEARCH", "1") == "1"
+HYBRID_CANDIDATES = int(os.getenv("LEXAI_HYBRID_CANDIDATES", "50"))
+RRF_K = int(os.getenv("LEXAI_RRF_K", "60"))
+BM25_K1 = float(os.getenv("LEXAI_BM25_K1", "1.2"))
+BM25_B = float(os.getenv("LEXAI_BM25_B", "0.75"))
+LEXICAL_FAST_PATH = os.getenv("LEXAI_LEXICAL_FAST_PATH", "1") == "1"
+
+ANSWER_CACHE_SIZE = int(os.getenv("LEXAI_ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("LEXAI_ANSWER_CACHE_THRESHOLD", "0.97"))
+
+JSON_LOGS = os.getenv("LEXAI_JSON_LOGS", "0") == "1"
+STREAM_RESPONSES = os.getenv("LEXAI_STREAM_RESPONSES", "1") == "1"
+
+# Headless bulk queries (``lexai batch``): queries in flight at once, and an
+# optional cap on queries started per second (0 for no cap).
+BATCH_CONCURRENCY = int(os.getenv("LEXAI_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_RATE = float(os.getenv("LEXAI_BATCH_MAX_RATE", "0"))
+
+# Admission control in front of the query service. At most
+# ADMISSION_MAX_CONCURRENT queries run at once, and each jurisdiction runs at
+# most ADMISSION_JURISDICTION_LIMIT. At most ADMISSION_MAX_QUEUE more wait for
+# each of these limits, each for up to ADMISSION_QUEUE_TIMEOUT seconds;
+# queries beyond that are turned away at once. A limit of 0 disables it.
+# Under multi-process serving, the limits and queue are divided among the
+# workers.
+ADMISSION_MAX_CONCURRENT = _per_worker(
+    int(os.getenv("LEXAI_ADMISSION_MAX_CONCURRENT", "32"))
+)
+ADMISSION_MAX_QUEUE = _per_worker(int(os.getenv("LEXAI_ADMISSION_MAX_QUEUE", "64")))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("LEXAI_ADMISSION_QUEUE_TIMEOUT", "5"))
+ADMISSION_JURISDICTION_LIMIT = _per_worker(
+    int(os.getenv("LEXAI_ADMISSION_JURISDICTION_LIMIT", "16"))
+)
+
+# OpenAI requests in flight per upstream, and how long a call may wait for a
+# free slot. A completion that cannot get one in time is degraded to a
+# references-only response. Like the admission limits, these are divided
+# among the workers.
+EMBEDDING_MAX_CONCURRENT = _per_worker(
+    int(os.getenv("LEXAI_EMBEDDING_MAX_CONCURRENT", "32"))
+)
+CHAT_MAX_CONCURRENT = _per_worker(int(os.getenv("LEXAI_CHAT_MAX_CONCURRENT", "16")))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("LEXAI_UPSTREAM_QUEUE_TIMEOUT", "2"))
+
+OVERLOADED_MESSAGE = (
+    "LexAI is handling more questions than it can answer right now. "
+    "Please try again in a moment."
+)
+DEGRADED_RESPONSE = (
+    "LexAI is too busy to summarize these sections right now; "
+    "the most relevant references are listed below."
+)
+
 GPT4_MODEL = "gpt-4"
 GPT4_TEMPERATURE = 0.7
 GPT4_MAX_TOKENS = 120
@@ -34,6 +172,8 @@ GPT4_TOP_P = 1
 GPT4_FREQUENCY_PENALTY = 0
 GPT4_PRESENCE_PENALTY = 0
 
+PROMPT_TOKEN_BUDGET = int(os.getenv("LEXAI_PROMPT_TOKEN_BUDGET", "1500"))
+
 AI_ROLE_TEMPLATE = (
     "Your expertise lies in providing accurate and timely information on the laws and "
     "regulations specific to your jurisdiction. Your role is to assist individuals, "
@@ -0,0 +1,164 @@
+"""
+Semantic answer cache for LexAI.
+
+Caches GPT-4 responses keyed by jurisdiction, the retrieved sections and the
+query embedding. A new query is answered from the cache when it retrieves
+exactly the same sections as a cached query and its embedding lies within a
+configurable cosine similarity of that query's embedding.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Union
+
+import numpy as np
+
+from lexai.config import ANSWER_CACHE_SIZE, ANSWER_CACHE_THRESHOLD
+from lexai.core.matcher import normalize_rows
+from lexai.services.embedding_cache import CacheStats
+
+
+class _Entry:
+    __slots__ = ("location", "section_ids", "embedding", "response")
+
+    def __init__(self, location, section_ids, embedding, response):
+        self.location = location
+        self.section_ids = section_ids
+        self.embedding = embedding
+        self.response = response
+
+
+class SemanticAnswerCache:
+    """
+    Bounded LRU cache of responses matched by query-embedding similarity.
+
+    Entries are grouped by ``(location, section_ids)`` so a lookup only
+    compares the query against cached queries that retrieved the same
+    sections. ``section_ids`` may be any hashable value; callers should
+    include the corpus version so entries never outlive the corpus they were
+    computed from. ``location`` may also be a tuple of jurisdictions for a
+    query that searched several of them.
+    """
+
+    def __init__(
+        self,
+        capacity: int = ANSWER_CACHE_SIZE,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.stats = CacheStats()
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._groups: dict[tuple[Hashable, Hashable], set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(
+        self,
+        location: Union[str, tuple[str, ...]],
+        query_embedding: np.ndarray,
+        section_ids: Hashable,
+    ) -> Optional[str]:
+        """
+        Returns a cached response for a sufficiently similar query, if any.
+
+        Parameters
+        ----------
+        location : str | tuple[str, ...]
+            The jurisdiction (or jurisdictions) the query was asked in.
+        query_embedding : np.ndarray
+            The embedding of the new query.
+        section_ids : Hashable
+            Identifies the sections retrieved for the new query.
+
+        Returns
+        -------
+        str or None
+            The cached response of the most similar matching query whose
+            cosine similarity is at least ``threshold``, otherwise None.
+        """
+        query = normalize_rows(query_embedding)
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in self._groups.get((location, section_ids), ()):
+                score = float(self._entries[entry_id].embedding @ query)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.stats.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.stats.hits += 1
+            return self._entries[best_id].response
+
+    def store(
+        self,
+        location: Union[str, tuple[str, ...]],
+        query_embedding: np.ndarray,
+        section_ids: Hashable,
+        response: str,
+    ) -> None:
+        """
+        Caches a response, evicting the least recently used entries if full.
+
+        Parameters
+        ----------
+        location : str | tuple[str, ...]
+            The jurisdiction (or jurisdictions) the query was asked in.
+        query_embedding : np.ndarray
+            The embedding of the query.
+        section_ids : Hashable
+            Identifies the sections retrieved for the query.
+        response : str
+            The generated response to cache.
+        """
+        if self.capacity <= 0:
+            return
+
+        entry = _Entry(location, section_ids, normalize_rows(query_embedding), response)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._groups.setdefault((location, section_ids), set()).add(entry_id)
+
+            while len(self._entries) > self.capacity:
+                evicted_id, evicted = self._entries.popitem(last=False)
+                key = (evicted.location, evicted.section_ids)
+                self._groups[key].discard(evicted_id)
+                if not self._groups[key]:
+                    del self._groups[key]
+                self.stats.evictions += 1
+
+    def invalidate(self, location: Optional[str] = None) -> None:
+        """
+        Drops every entry involving ``location``, or every entry if it is None.
+
+        Parameters
+        ----------
+        location : str, optional
+            The jurisdiction whose corpus changed.
+        """
+        with self._lock:
+            if location is None:
+                self._entries.clear()
+                self._groups.clear()
+                return
+
+            stale = [
+                key for key in self._groups
+                if key[0] == location
+                or (isinstance(key[0], tuple) and location in key[0])
+            ]
+            for key in stale:
+                for entry_id in self._groups.pop(key):
+                    del self._entries[entry_id]
+
+    def stats_dict(self) -> dict[str, Any]:
+        """Returns the cache's hit/miss counters and current size."""
+        return {**self.stats.as_dict(), "size": len(self)}
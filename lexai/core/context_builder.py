@@ -0,0 +1,170 @@
+"""
+Token-budgeted context assembly for GPT-4 prompts.
+
+Retrieved matches are rendered in a compact plain-text format and trimmed to
+a prompt-token budget. Matches are assumed to be ordered best first: each one
+is added in full while it fits, the first one that does not fit is truncated
+to the remaining budget, and the rest are dropped.
+
+Tokens are counted with ``tiktoken`` when it is installed. Otherwise a
+word-and-punctuation approximation is used, which tends to slightly
+overestimate the count for English text.
+"""
+
+import logging
+import re
+from typing import Any, Mapping, Optional, Sequence
+
+from lexai.config import GPT4_MODEL, PROMPT_TOKEN_BUDGET
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - exercised only without tiktoken
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_APPROX_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_encoding = None
+_encoding_unavailable = tiktoken is None
+
+
+def _get_encoding():
+    global _encoding, _encoding_unavailable
+    if _encoding is None and not _encoding_unavailable:
+        try:
+            _encoding = tiktoken.encoding_for_model(GPT4_MODEL)
+        except Exception as e:
+            # The BPE ranks are downloaded on first use; fall back to the
+            # approximation if that fails (e.g. on an offline host).
+            logger.warning(f"tiktoken unavailable, approximating tokens: {e}")
+            _encoding_unavailable = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts the prompt tokens in ``text``.
+
+    Parameters
+    ----------
+    text : str
+        The text to measure.
+
+    Returns
+    -------
+    int
+        The number of tokens.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(_APPROX_TOKEN_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Returns the longest prefix of ``text`` that fits in ``max_tokens`` tokens.
+
+    Parameters
+    ----------
+    text : str
+        The text to truncate.
+    max_tokens : int
+        The maximum number of tokens to keep.
+
+    Returns
+    -------
+    str
+        The truncated text, or ``text`` unchanged if it already fits.
+    """
+    if max_tokens <= 0:
+        return ""
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+
+    matches = list(_APPROX_TOKEN_PATTERN.finditer(text))
+    if len(matches) <= max_tokens:
+        return text
+    return text[:matches[max_tokens - 1].end()]
+
+
+def render_match(number: int, match: Mapping[str, Any]) -> tuple[str, str]:
+    """
+    Renders a match as a compact heading line and a body.
+
+    Parameters
+    ----------
+    number : int
+        The 1-based position of the match in the context.
+    match : Mapping[str, Any]
+        A retrieved section with 'title', 'subtitle' and 'content' fields,
+        and a 'jurisdiction' field for cross-jurisdiction searches.
+
+    Returns
+    -------
+    tuple[str, str]
+        The heading (e.g. ``[1] Title: Subtitle`` or
+        ``[1] (Denver) Title: Subtitle``) and the whitespace-collapsed section
+        content.
+    """
+    title = str(match.get("title", "")).strip()
+    subtitle = str(match.get("subtitle", "")).strip()
+    jurisdiction = str(match.get("jurisdiction", "")).strip()
+    heading = f"[{number}] ({jurisdiction}) {title}" if jurisdiction else (
+        f"[{number}] {title}"
+    )
+    if subtitle:
+        heading = f"{heading}: {subtitle}"
+    body = " ".join(str(match.get("content", "")).split())
+    return heading, body
+
+
+def build_context(
+    matches: Sequence[Mapping[str, Any]],
+    token_budget: Optional[int] = None,
+) -> str:
+    """
+    Renders retrieved matches as prompt context within a token budget.
+
+    Parameters
+    ----------
+    matches : Sequence[Mapping[str, Any]]
+        Retrieved sections, ordered from most to least relevant.
+    token_budget : int, optional
+        The maximum number of context tokens; defaults to
+        ``PROMPT_TOKEN_BUDGET``.
+
+    Returns
+    -------
+    str
+        The rendered context, one block per included section.
+    """
+    budget = PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    blocks = []
+    for number, match in enumerate(matches, start=1):
+        heading, body = render_match(number, match)
+        heading_tokens = count_tokens(heading) + 1
+        if heading_tokens > budget:
+            break
+
+        block = f"{heading}\n{body}"
+        block_tokens = count_tokens(block) + 1
+        if block_tokens <= budget:
+            blocks.append(block)
+            budget -= block_tokens
+            continue
+
+        # Reserve one token for the ellipsis marking the truncation.
+        remaining = budget - heading_tokens - 1
+        truncated = truncate_to_tokens(body, remaining)
+        if truncated:
+            blocks.append(f"{heading}\n{truncated}…")
+        break
+
+    return "\n\n".join(blocks)
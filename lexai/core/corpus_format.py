@@ -0,0 +1,247 @@
+"""
+Memory-mapped, pickle-free corpus format for LexAI.
+
+A corpus is stored as a directory containing:
+
+- ``corpus.json``: a manifest with the row count, dimensionality and columns.
+- ``embeddings.f32``: a contiguous, C-ordered float32 embedding matrix.
+- ``<column>.offsets`` / ``<column>.blob``: for each metadata column, an int64
+  array of ``count + 1`` byte offsets into a UTF-8 blob of concatenated values.
+
+Everything is opened with ``np.memmap``, so loading is zero-copy and the pages
+are shared by every process that maps the same files. Files are never
+rewritten in place: ``write_corpus`` builds a new directory and swaps it in,
+so a process that has the previous corpus mapped keeps reading it intact.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Sequence
+
+import numpy as np
+
+from lexai.core.metadata_store import (
+    RECORD_FIELDS,
+    MetadataStore,
+    StringColumn,
+    encode_column,
+)
+
+CORPUS_FORMAT = "lexai-corpus"
+CORPUS_FORMAT_VERSION = 1
+MANIFEST_FILE = "corpus.json"
+EMBEDDINGS_FILE = "embeddings.f32"
+METADATA_COLUMNS = RECORD_FIELDS
+
+
+def is_corpus_dir(path: str) -> bool:
+    """
+    Returns True if ``path`` is a directory in the memory-mapped corpus format.
+
+    Parameters
+    ----------
+    path : str
+        Path to check.
+
+    Returns
+    -------
+    bool
+        Whether the path contains a corpus manifest.
+    """
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def _open_array(path: str, dtype: Any, shape: tuple[int, ...]) -> np.ndarray:
+    # np.memmap refuses zero-length files, so empty arrays are built directly.
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+def write_corpus(
+    output_dir: str,
+    embeddings: np.ndarray,
+    columns: dict[str, Sequence[Any]],
+) -> None:
+    """
+    Writes embeddings and metadata columns in the memory-mapped corpus format.
+
+    The corpus is written into a new sibling directory and then renamed into
+    place. An existing corpus at ``output_dir`` is renamed aside first and
+    removed, so processes that have it mapped keep reading the unlinked files
+    until they reload, and a reader never sees a partially written corpus.
+    Other files in the old directory, such as indexes built for it, are not
+    carried over.
+
+    Parameters
+    ----------
+    output_dir : str
+        Directory to write the corpus to; replaced if it already holds one.
+    embeddings : np.ndarray
+        A 2-D embedding matrix; stored as float32.
+    columns : dict[str, Sequence[Any]]
+        Metadata columns keyed by name, each with one value per embedding row.
+
+    Raises
+    ------
+    ValueError
+        If the embeddings are not 2-D or a column has the wrong length.
+    FileExistsError
+        If ``output_dir`` is a non-empty directory that is not a corpus.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if embeddings.ndim != 2:
+        raise ValueError("Embeddings must be a 2-D matrix.")
+
+    count, dim = embeddings.shape
+    for name, values in columns.items():
+        if len(values) != count:
+            raise ValueError(
+                f"Column '{name}' has {len(values)} entries, expected {count}."
+            )
+
+    output_dir = os.path.normpath(output_dir)
+    if (
+        not is_corpus_dir(output_dir)
+        and os.path.isdir(output_dir)
+        and os.listdir(output_dir)
+    ):
+        raise FileExistsError(f"{output_dir} exists and is not a LexAI corpus.")
+
+    parent = os.path.dirname(output_dir) or "."
+    os.makedirs(parent, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(
+        prefix=f".{os.path.basename(output_dir)}.", suffix=".tmp", dir=parent
+    )
+    try:
+        embeddings.tofile(os.path.join(staging_dir, EMBEDDINGS_FILE))
+        for name, values in columns.items():
+            offsets, blob = encode_column(values)
+            offsets.tofile(os.path.join(staging_dir, f"{name}.offsets"))
+            with open(os.path.join(staging_dir, f"{name}.blob"), "wb") as f:
+                f.write(blob)
+
+        manifest = {
+            "format": CORPUS_FORMAT,
+            "version": CORPUS_FORMAT_VERSION,
+            "count": count,
+            "dim": dim,
+            "dtype": "float32",
+            "columns": list(columns),
+        }
+        with open(os.path.join(staging_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.chmod(staging_dir, 0o755)
+        replace_corpus_dir(staging_dir, output_dir)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+
+def replace_corpus_dir(new_dir: str, output_dir: str) -> None:
+    """
+    Publishes a fully written corpus directory at ``output_dir``.
+
+    An existing corpus at ``output_dir`` is renamed aside and removed, so
+    processes that have it mapped keep reading the unlinked files until they
+    reload. Both directories must be on the same file system.
+
+    Parameters
+    ----------
+    new_dir : str
+        The corpus directory to publish; it is moved, not copied.
+    output_dir : str
+        Where to publish it; an existing corpus there is replaced.
+    """
+    if is_corpus_dir(output_dir):
+        retired = f"{new_dir}.old"
+        os.rename(output_dir, retired)
+        os.rename(new_dir, output_dir)
+        shutil.rmtree(retired, ignore_errors=True)
+    else:
+        # Renaming onto an empty directory replaces it.
+        os.replace(new_dir, output_dir)
+
+
+def read_manifest(corpus_dir: str) -> dict[str, Any]:
+    """
+    Reads and validates a corpus manifest.
+
+    Parameters
+    ----------
+    corpus_dir : str
+        Path to the corpus directory.
+
+    Returns
+    -------
+    dict[str, Any]
+        The parsed manifest.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the directory has no manifest.
+    ValueError
+        If the manifest does not describe a supported corpus.
+    """
+    manifest_path = os.path.join(corpus_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"Corpus manifest not found: {manifest_path}")
+
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format") != CORPUS_FORMAT:
+        raise ValueError(f"Not a LexAI corpus: {corpus_dir}")
+    if manifest.get("version") != CORPUS_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported corpus version {manifest.get('version')} in {corpus_dir}"
+        )
+    return manifest
+
+
+def open_corpus(corpus_dir: str) -> tuple[np.ndarray, MetadataStore]:
+    """
+    Opens a memory-mapped corpus without copying its contents into the heap.
+
+    Parameters
+    ----------
+    corpus_dir : str
+        Path to the corpus directory.
+
+    Returns
+    -------
+    tuple[np.ndarray, MetadataStore]
+        A read-only float32 embedding matrix and its metadata columns.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the manifest or one of the data files is missing.
+    KeyError
+        If a required metadata column is absent.
+    """
+    manifest = read_manifest(corpus_dir)
+    count, dim = manifest["count"], manifest["dim"]
+
+    for name in METADATA_COLUMNS:
+        if name not in manifest["columns"]:
+            raise KeyError(f"Missing column '{name}' in {corpus_dir}")
+
+    embeddings = _open_array(
+        os.path.join(corpus_dir, EMBEDDINGS_FILE), np.float32, (count, dim)
+    )
+
+    columns = {}
+    for name in manifest["columns"]:
+        offsets = _open_array(
+            os.path.join(corpus_dir, f"{name}.offsets"), np.int64, (count + 1,)
+        )
+        blob_path = os.path.join(corpus_dir, f"{name}.blob")
+        blob_size = int(offsets[-1]) if count else 0
+        blob = _open_array(blob_path, np.uint8, (blob_size,))
+        columns[name] = StringColumn(offsets, blob)
+
+    return embeddings, MetadataStore(columns)
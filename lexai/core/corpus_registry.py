@@ -0,0 +1,498 @@
+"""
+Process-wide registry of jurisdiction corpora.
+
+This module keeps every configured jurisdiction's embeddings and metadata
+resident in memory so that requests do not reload corpus files from disk.
+Each corpus file is fingerprinted by its modification time and size; when the
+file changes, a fresh copy is loaded and swapped in atomically.
+
+If an IVF index has been built next to a corpus (see
+``lexai.tools.build_index``), it is loaded and used for searches instead of
+the exact engine. Likewise, a lexical (BM25) index built next to a corpus is
+loaded and fused with the vector ranking for queries that pass their text.
+Segmented corpora (see ``lexai.core.segments``) are searched
+across all of their segments and reloaded whenever their manifest changes.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional, Sequence, Union
+
+import numpy as np
+
+from lexai.config import (
+    CORPUS_CHECK_INTERVAL,
+    HYBRID_CANDIDATES,
+    HYBRID_SEARCH,
+    LOCATION_INFO,
+)
+from lexai.core.corpus_format import MANIFEST_FILE
+from lexai.core.data_loader import load_embeddings
+from lexai.core.ivf_index import IVFFlatIndex, ivf_index_path
+from lexai.core.lexical_index import (
+    LexicalIndex,
+    lexical_index_path,
+    reciprocal_rank_fusion,
+)
+from lexai.core.matcher import ExactSearchEngine, take_records
+from lexai.core.metadata_store import MatchRecord, MetadataStore
+from lexai.core.quantization import QuantizedSearchEngine, make_search_engine
+from lexai.core.segments import (
+    SEGMENTS_MANIFEST_FILE,
+    SegmentedEngine,
+    SegmentedMetadata,
+    is_segmented_dir,
+    load_segmented_corpus,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def file_fingerprint(path: str) -> tuple[int, int]:
+    """
+    Returns a cheap fingerprint (modification time, size) for a corpus file.
+
+    For a memory-mapped or segmented corpus directory the manifest is
+    fingerprinted, since it is always rewritten last.
+
+    Parameters
+    ----------
+    path : str
+        Path to the corpus file or directory.
+
+    Returns
+    -------
+    tuple[int, int]
+        The file's modification time in nanoseconds and its size in bytes.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file does not exist.
+    """
+    if is_segmented_dir(path):
+        path = os.path.join(path, SEGMENTS_MANIFEST_FILE)
+    elif os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_FILE)
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Corpus:
+    """
+    An immutable, fully loaded jurisdiction corpus.
+
+    Instances are never modified after construction; a reload produces a new
+    instance, so a request holding a reference always sees a consistent
+    embeddings/metadata pair. The search engine (and its normalized copy of
+    the embeddings) is built once per load rather than once per query.
+
+    A segmented corpus has no single embedding matrix; its ``embeddings`` is
+    None and its engine searches each segment. ``lexical`` is the corpus's
+    BM25 index, or None if none was built.
+    """
+
+    def __init__(
+        self,
+        location: str,
+        path: str,
+        embeddings: Optional[np.ndarray],
+        metadata: Union[MetadataStore, SegmentedMetadata],
+        fingerprint: tuple[int, int],
+        engine: Optional[
+            Union[
+                ExactSearchEngine,
+                QuantizedSearchEngine,
+                IVFFlatIndex,
+                SegmentedEngine,
+            ]
+        ] = None,
+        lexical: Optional[LexicalIndex] = None,
+    ):
+        if embeddings is not None and embeddings.shape[0] != len(metadata):
+            raise ValueError(
+                "Mismatch between number of embeddings and metadata entries.")
+
+        self.location = location
+        self.path = path
+        self.embeddings = embeddings
+        self.metadata = metadata
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.engine = engine or ExactSearchEngine(embeddings)
+        self.lexical = lexical
+
+    @classmethod
+    def load(
+        cls,
+        location: str,
+        path: str,
+        quantization: Optional[str] = None,
+    ) -> "Corpus":
+        """
+        Loads a corpus from disk.
+
+        Parameters
+        ----------
+        location : str
+            The jurisdiction name the corpus belongs to.
+        path : str
+            Path to the corpus file or directory.
+        quantization : str, optional
+            "none", "float16" or "int8"; defaults to
+            ``EMBEDDING_QUANTIZATION``. Ignored when an IVF index is used.
+
+        Returns
+        -------
+        Corpus
+            The loaded corpus.
+        """
+        fingerprint = file_fingerprint(path)
+        if is_segmented_dir(path):
+            engine, metadata = load_segmented_corpus(path, quantization)
+            return cls(location, path, None, metadata, fingerprint, engine)
+
+        embeddings, metadata = load_embeddings(path)
+
+        # The metadata digest is only computed, lazily, when an index file is
+        # present, so a corpus without one is still mapped without reading it.
+        engine = None
+        index_path = ivf_index_path(path)
+        if os.path.exists(index_path):
+            try:
+                engine = IVFFlatIndex.load(
+                    index_path, embeddings, corpus_digest=metadata.digest()
+                )
+            except ValueError as e:
+                logger.warning(f"Ignoring stale IVF index for {location}: {e}")
+        engine = engine or make_search_engine(embeddings, quantization)
+
+        lexical = None
+        lexical_path = lexical_index_path(path)
+        if os.path.exists(lexical_path):
+            try:
+                lexical = LexicalIndex.load(
+                    lexical_path, len(metadata), corpus_digest=metadata.digest()
+                )
+            except ValueError as e:
+                logger.warning(f"Ignoring stale lexical index for {location}: {e}")
+
+        return cls(location, path, embeddings, metadata, fingerprint, engine, lexical)
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    @property
+    def hybrid(self) -> bool:
+        """Whether searches given the query text fuse in lexical results."""
+        return HYBRID_SEARCH and self.lexical is not None
+
+    def _fuse(
+        self,
+        query: str,
+        vector_indices: np.ndarray,
+        num_matches: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        lexical_indices, _ = self.lexical.search(query, len(vector_indices))
+        return reciprocal_rank_fusion(
+            [vector_indices, lexical_indices], num_matches
+        )
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        num_matches: int = 3,
+        query: Optional[str] = None,
+    ) -> tuple[np.ndarray, np.ndarray, list[MatchRecord]]:
+        """
+        Finds the sections most similar to a query embedding.
+
+        When the query text is given and the corpus has a lexical index, the
+        top ``HYBRID_CANDIDATES`` vector and BM25 matches are fused by
+        reciprocal rank fusion.
+
+        Parameters
+        ----------
+        query_embedding : np.ndarray
+            The embedding of the user's query.
+        num_matches : int, optional
+            The number of matches to retrieve, by default 3.
+        query : str, optional
+            The text of the user's query, for hybrid search.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, list[MatchRecord]]
+            The row indices of the matching sections, their cosine
+            similarities (RRF scores for a hybrid search), and their metadata
+            rows, best first.
+        """
+        if query is None or not self.hybrid:
+            indices, scores = self.engine.search(query_embedding, num_matches)
+        else:
+            vector_indices, _ = self.engine.search(
+                query_embedding, max(num_matches, HYBRID_CANDIDATES)
+            )
+            indices, scores = self._fuse(query, vector_indices, num_matches)
+        return indices, scores, take_records(self.metadata, indices)
+
+    def search_lexical(
+        self,
+        query: str,
+        num_matches: int = 3,
+    ) -> tuple[np.ndarray, np.ndarray, list[MatchRecord]]:
+        """
+        Finds the sections with the best BM25 score, without an embedding.
+
+        Parameters
+        ----------
+        query : str
+            The text of the user's query.
+        num_matches : int, optional
+            The number of matches to retrieve, by default 3.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, list[MatchRecord]]
+            The row indices of the matching sections, their BM25 scores, and
+            their metadata rows, best first.
+
+        Raises
+        ------
+        ValueError
+            If the corpus has no lexical index.
+        """
+        if self.lexical is None:
+            raise ValueError(f"No lexical index for {self.location}.")
+        indices, scores = self.lexical.search(query, num_matches)
+        return indices, scores, take_records(self.metadata, indices)
+
+    def search_batch(
+        self,
+        query_matrix: np.ndarray,
+        num_matches: int = 3,
+        queries: Optional[Sequence[str]] = None,
+    ) -> list[tuple[np.ndarray, np.ndarray, list[MatchRecord]]]:
+        """
+        Finds the sections most similar to each row of a query matrix.
+
+        Parameters
+        ----------
+        query_matrix : np.ndarray
+            A (num_queries, dim) matrix of query embeddings.
+        num_matches : int, optional
+            The number of matches to retrieve per query, by default 3.
+        queries : Sequence[str], optional
+            The text of each query, for hybrid search as in ``search``.
+
+        Returns
+        -------
+        list[tuple[np.ndarray, np.ndarray, list[MatchRecord]]]
+            One ``search``-style (indices, scores, matches) tuple per query.
+        """
+        hybrid = queries is not None and self.hybrid
+        batch_indices, batch_scores = self.engine.search_batch(
+            query_matrix, max(num_matches, HYBRID_CANDIDATES) if hybrid else num_matches
+        )
+        results = []
+        for row, (indices, scores) in enumerate(zip(batch_indices, batch_scores)):
+            found = indices >= 0
+            indices, scores = indices[found], scores[found]
+            if hybrid:
+                indices, scores = self._fuse(queries[row], indices, num_matches)
+            results.append((indices, scores, take_records(self.metadata, indices)))
+        return results
+
+
+class CorpusRegistry:
+    """
+    Loads each configured jurisdiction once and serves it to every request.
+
+    Corpora are loaded on first use (or eagerly via ``load_all``) and kept in
+    memory. ``get`` re-checks the corpus file's fingerprint at most once per
+    ``check_interval`` seconds and swaps in a new ``Corpus`` when the file has
+    changed, so new embeddings can be deployed without restarting the process.
+    """
+
+    def __init__(
+        self,
+        location_info: dict[str, dict[str, Any]],
+        check_interval: float = CORPUS_CHECK_INTERVAL,
+    ):
+        self._location_info = location_info
+        self._check_interval = check_interval
+        self._corpora: dict[str, Corpus] = {}
+        self._last_checked: dict[str, float] = {}
+        self._locks = {location: threading.Lock() for location in location_info}
+        self._listeners: list[Callable[[Corpus], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def locations(self) -> list[str]:
+        """The jurisdictions known to this registry."""
+        return list(self._location_info)
+
+    def add_reload_listener(self, listener: Callable[[Corpus], None]) -> None:
+        """
+        Registers a callback invoked with the new corpus after every (re)load.
+
+        Parameters
+        ----------
+        listener : Callable[[Corpus], None]
+            Function receiving the freshly loaded corpus.
+        """
+        self._listeners.append(listener)
+
+    def get(self, location: str) -> Corpus:
+        """
+        Returns the resident corpus for a jurisdiction, loading it if needed.
+
+        Parameters
+        ----------
+        location : str
+            The jurisdiction to look up.
+
+        Returns
+        -------
+        Corpus
+            The current corpus for the jurisdiction.
+
+        Raises
+        ------
+        KeyError
+            If the location is not configured.
+        FileNotFoundError
+            If the corpus file does not exist.
+        """
+        if location not in self._location_info:
+            raise KeyError(f"Unknown location: {location}")
+
+        corpus = self._corpora.get(location)
+        now = time.monotonic()
+        if (
+            corpus is not None
+            and now - self._last_checked.get(location, 0.0) < self._check_interval
+        ):
+            return corpus
+
+        return self._refresh(location, force=corpus is None)
+
+    def load_all(self) -> None:
+        """
+        Eagerly loads every configured jurisdiction.
+
+        Failures are logged rather than raised, so a single missing corpus
+        does not prevent the others from being served.
+        """
+        for location in self._location_info:
+            try:
+                self._refresh(location, force=True)
+            except Exception:
+                logger.exception(f"Failed to load corpus for {location}.")
+
+    def refresh(self) -> None:
+        """
+        Checks every loaded corpus for on-disk changes and reloads stale ones.
+        """
+        for location in list(self._corpora):
+            try:
+                self._refresh(location)
+            except Exception:
+                logger.exception(f"Failed to reload corpus for {location}.")
+
+    def clear(self) -> None:
+        """Drops every resident corpus."""
+        self._corpora.clear()
+        self._last_checked.clear()
+
+    def start_watcher(self, interval: Optional[float] = None) -> None:
+        """
+        Starts a daemon thread that periodically calls ``refresh``.
+
+        Parameters
+        ----------
+        interval : float, optional
+            Seconds between checks; defaults to the registry's check interval.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        interval = self._check_interval if interval is None else interval
+        self._stop_event.clear()
+
+        def watch():
+            while not self._stop_event.wait(interval):
+                self.refresh()
+
+        self._watcher = threading.Thread(
+            target=watch, name="lexai-corpus-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        """Stops the background watcher thread, if running."""
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _refresh(self, location: str, force: bool = False) -> Corpus:
+        info = self._location_info[location]
+        path = info["npz_file"]
+        with self._locks[location]:
+            current = self._corpora.get(location)
+            self._last_checked[location] = time.monotonic()
+
+            if not force and current is not None:
+                try:
+                    fingerprint = file_fingerprint(path)
+                except FileNotFoundError:
+                    logger.warning(
+                        f"Corpus file for {location} disappeared; "
+                        "keeping the resident copy."
+                    )
+                    return current
+                if fingerprint == current.fingerprint:
+                    return current
+
+            try:
+                corpus = Corpus.load(location, path, info.get("quantization"))
+            except Exception:
+                if current is None:
+                    raise
+                # E.g. a file still being written; retried after the next
+                # check interval.
+                logger.exception(
+                    f"Failed to reload the corpus for {location}; "
+                    "keeping the resident copy."
+                )
+                return current
+            self._corpora[location] = corpus
+
+        logger.info(f"Loaded corpus for {location} ({len(corpus)} sections).")
+        for listener in self._listeners:
+            listener(corpus)
+        return corpus
+
+
+corpus_registry = CorpusRegistry(LOCATION_INFO)
+
+
+def get_corpus(location: str) -> Corpus:
+    """
+    Returns the resident corpus for a jurisdiction from the shared registry.
+
+    Parameters
+    ----------
+    location : str
+        The jurisdiction to look up.
+
+    Returns
+    -------
+    Corpus
+        The current corpus for the jurisdiction.
+    """
+    return corpus_registry.get(location)
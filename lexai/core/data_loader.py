@@ -2,31 +2,38 @@
 Data loader for LexAI embeddings.
 
 This module provides a utility function to load embedding vectors and
-their associated legal metadata from a .npz file.
+their associated legal metadata from a .npz file or a memory-mapped corpus
+directory (see ``lexai.core.corpus_format``).
 """
 
 import os
 
 import numpy as np
-import pandas as pd
 
+from lexai.core.corpus_format import is_corpus_dir, open_corpus
+from lexai.core.metadata_store import MetadataStore
 
-def load_embeddings(npz_file_path: str) -> tuple[np.ndarray, pd.DataFrame]:
+
+def load_embeddings(npz_file_path: str) -> tuple[np.ndarray, MetadataStore]:
     """
     Loads embeddings and associated jurisdiction data from a .npz file.
 
+    If the path is a memory-mapped corpus directory, the embeddings and
+    metadata are mapped from disk instead of being copied into memory.
+
     Parameters
     ----------
     npz_file_path : str
-        The full path to the .npz file containing the embeddings and metadata.
+        The full path to the .npz file (or corpus directory) containing the
+        embeddings and metadata.
 
     Returns
     -------
-    tuple[np.ndarray, pd.DataFrame]
+    tuple[np.ndarray, MetadataStore]
         A tuple containing:
         - embeddings (np.ndarray): The loaded numerical embeddings.
-        - jurisdiction_data (pd.DataFrame): A DataFrame with 'url', 'title',
-          'subtitle', and 'content' columns.
+        - jurisdiction_data (MetadataStore): The 'url', 'title', 'subtitle'
+          and 'content' columns, memory-mapped for a corpus directory.
 
     Raises
     ------
@@ -40,6 +47,9 @@ def load_embeddings(npz_file_path: str) -> tuple[np.ndarray, pd.DataFrame]:
     if not os.path.exists(npz_file_path):
         raise FileNotFoundError(f"Embedding file not found: {npz_file_path}")
 
+    if is_corpus_dir(npz_file_path):
+        return open_corpus(npz_file_path)
+
     data = np.load(npz_file_path, allow_pickle=True)
 
     required_keys = ["embeddings", "urls", "titles", "subtitles", "contents"]
@@ -48,12 +58,12 @@ def load_embeddings(npz_file_path: str) -> tuple[np.ndarray, pd.DataFrame]:
             raise KeyError(f"Missing key '{key}' in {npz_file_path}")
 
     embeddings = data["embeddings"]
-    jurisdiction_data = pd.DataFrame(
+    jurisdiction_data = MetadataStore.from_columns(
         {
-            "url": data["urls"],
-            "title": data["titles"],
-            "subtitle": data["subtitles"],
-            "content": data["contents"],
+            "url": data["urls"].tolist(),
+            "title": data["titles"].tolist(),
+            "subtitle": data["subtitles"].tolist(),
+            "content": data["contents"].tolist(),
         }
     )
     return embeddings, jurisdiction_data
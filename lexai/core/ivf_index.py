@@ -0,0 +1,377 @@
+"""
+Approximate nearest-neighbour search for large jurisdictions.
+
+This module implements an IVF-flat index in pure NumPy: embeddings are
+clustered with spherical k-means, each embedding is filed under its nearest
+centroid, and a query is only scored against the ``nprobe`` lists whose
+centroids are closest to it. ``nprobe`` trades recall for speed; probing
+every list gives exactly the same results as ``ExactSearchEngine``.
+
+The index exposes the same ``search`` / ``search_batch`` interface as
+``ExactSearchEngine`` and keeps one as ``exact`` for reference queries.
+"""
+
+import hashlib
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+from lexai.config import IVF_NPROBE
+from lexai.core.matcher import ExactSearchEngine, normalize_rows, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+IVF_INDEX_SUFFIX = ".ivf.npz"
+_ASSIGN_CHUNK_SIZE = 65536
+
+
+def ivf_index_path(corpus_path: str) -> str:
+    """
+    Returns the path where the IVF index for a corpus is stored.
+
+    Parameters
+    ----------
+    corpus_path : str
+        Path to a .npz corpus file or a memory-mapped corpus directory.
+
+    Returns
+    -------
+    str
+        ``<corpus>/index.ivf.npz`` for a corpus directory, otherwise the
+        corpus path with its extension replaced by ``.ivf.npz``.
+    """
+    if os.path.isdir(corpus_path):
+        return os.path.join(corpus_path, f"index{IVF_INDEX_SUFFIX}")
+    root, _ = os.path.splitext(corpus_path)
+    return f"{root}{IVF_INDEX_SUFFIX}"
+
+
+def index_digest(corpus_digest: str, vectors: np.ndarray) -> str:
+    """
+    Returns the digest saved with an IVF index built over ``vectors``.
+
+    It combines ``MetadataStore.digest()`` with the bytes of the normalized
+    vectors, so that an index is recognized as stale when the sections are
+    re-embedded with unchanged text, e.g. with another embedding model.
+
+    Parameters
+    ----------
+    corpus_digest : str
+        ``MetadataStore.digest()`` of the corpus.
+    vectors : np.ndarray
+        The L2-normalized float32 vectors the index lists.
+
+    Returns
+    -------
+    str
+        A hex digest.
+    """
+    hasher = hashlib.blake2b(corpus_digest.encode(), digest_size=16)
+    for start in range(0, vectors.shape[0], _ASSIGN_CHUNK_SIZE):
+        hasher.update(np.ascontiguousarray(vectors[start:start + _ASSIGN_CHUNK_SIZE]))
+    return hasher.hexdigest()
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], _ASSIGN_CHUNK_SIZE):
+        chunk = vectors[start:start + _ASSIGN_CHUNK_SIZE]
+        assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(
+    vectors: np.ndarray,
+    nlist: int,
+    num_iterations: int = 20,
+    max_training_points: int = 256,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Clusters unit-length vectors with spherical k-means.
+
+    Parameters
+    ----------
+    vectors : np.ndarray
+        L2-normalized (N, dim) float32 vectors.
+    nlist : int
+        The number of centroids to train.
+    num_iterations : int, optional
+        Lloyd iterations to run, by default 20.
+    max_training_points : int, optional
+        Training sample size per centroid, by default 256.
+    seed : int, optional
+        Seed for sampling and initialization.
+
+    Returns
+    -------
+    np.ndarray
+        A (nlist, dim) matrix of unit-length centroids.
+    """
+    rng = np.random.default_rng(seed)
+    num_vectors = vectors.shape[0]
+    sample_size = min(num_vectors, nlist * max_training_points)
+    sample = vectors[np.sort(rng.choice(num_vectors, sample_size, replace=False))]
+
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(num_iterations):
+        assignments = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+
+        empty = counts == 0
+        if np.any(empty):
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+class IVFFlatIndex:
+    """
+    Inverted-file index over L2-normalized embeddings.
+
+    The inverted lists are stored in CSR form: ``ids`` holds embedding row
+    numbers grouped by centroid and ``offsets[c]:offsets[c + 1]`` delimits the
+    rows filed under centroid ``c``. Candidate vectors are gathered from the
+    (possibly memory-mapped) embedding matrix at query time, so the index adds
+    only ``nlist * dim`` floats plus one integer per embedding.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        ids: np.ndarray,
+        nprobe: int = IVF_NPROBE,
+        corpus_digest: Optional[str] = None,
+    ):
+        if ids.shape[0] != embeddings.shape[0]:
+            raise ValueError(
+                "IVF index does not match the corpus: "
+                f"{ids.shape[0]} ids for {embeddings.shape[0]} embeddings."
+            )
+        if offsets.shape[0] != centroids.shape[0] + 1:
+            raise ValueError("IVF offsets must have one entry per centroid plus one.")
+
+        self.exact = ExactSearchEngine(embeddings)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.offsets = offsets
+        self.ids = ids
+        self.nprobe = nprobe
+        self.corpus_digest = corpus_digest
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        nlist: Optional[int] = None,
+        nprobe: int = IVF_NPROBE,
+        corpus_digest: Optional[str] = None,
+        **train_kwargs,
+    ) -> "IVFFlatIndex":
+        """
+        Trains centroids and builds the inverted lists for a set of embeddings.
+
+        Parameters
+        ----------
+        embeddings : np.ndarray
+            The (N, dim) corpus embeddings.
+        nlist : int, optional
+            The number of inverted lists; defaults to roughly ``sqrt(N)``.
+        nprobe : int, optional
+            The default number of lists probed per query.
+        corpus_digest : str, optional
+            ``MetadataStore.digest()`` of the corpus. Combined with the
+            embeddings by ``index_digest`` and saved with the index, so that
+            ``load`` can recognize a stale index.
+        **train_kwargs
+            Forwarded to ``train_centroids``.
+
+        Returns
+        -------
+        IVFFlatIndex
+            The built index.
+        """
+        exact = ExactSearchEngine(embeddings)
+        vectors = exact.embeddings
+        num_vectors = vectors.shape[0]
+        if num_vectors == 0:
+            raise ValueError("Cannot build an IVF index over an empty corpus.")
+
+        nlist = nlist or max(1, int(np.sqrt(num_vectors)))
+        nlist = min(nlist, num_vectors)
+
+        centroids = train_centroids(vectors, nlist, **train_kwargs)
+        assignments = _assign(vectors, centroids)
+        ids = np.argsort(assignments, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=nlist), out=offsets[1:])
+
+        logger.info(f"Built IVF index with {nlist} lists over {num_vectors} vectors.")
+        if corpus_digest is not None:
+            corpus_digest = index_digest(corpus_digest, vectors)
+        return cls(
+            vectors, centroids, offsets, ids, nprobe=nprobe, corpus_digest=corpus_digest
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Saves the centroids and inverted lists (not the embeddings) to ``path``.
+
+        Parameters
+        ----------
+        path : str
+            Destination .npz file, usually ``ivf_index_path(corpus_path)``.
+        """
+        arrays = {"centroids": self.centroids, "offsets": self.offsets, "ids": self.ids}
+        if self.corpus_digest is not None:
+            arrays["corpus_digest"] = np.array(self.corpus_digest)
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        embeddings: np.ndarray,
+        nprobe: int = IVF_NPROBE,
+        corpus_digest: Optional[str] = None,
+    ) -> "IVFFlatIndex":
+        """
+        Loads an index saved with ``save`` and attaches it to its embeddings.
+
+        Parameters
+        ----------
+        path : str
+            Path to the saved index.
+        embeddings : np.ndarray
+            The corpus embeddings the index was built from.
+        nprobe : int, optional
+            The default number of lists probed per query.
+        corpus_digest : str, optional
+            ``MetadataStore.digest()`` of the corpus; if given, the index must
+            have been built for the same sections and the same embeddings.
+
+        Returns
+        -------
+        IVFFlatIndex
+            The loaded index.
+
+        Raises
+        ------
+        ValueError
+            If the index was built for a corpus of a different size, or for
+            different sections or embeddings than ``corpus_digest`` and
+            ``embeddings`` describe.
+        """
+        with np.load(path) as data:
+            stored = str(data["corpus_digest"]) if "corpus_digest" in data else None
+            if corpus_digest is not None and stored is None:
+                raise ValueError(
+                    "IVF index was built for a different version of the corpus."
+                )
+            index = cls(
+                embeddings,
+                data["centroids"],
+                data["offsets"],
+                data["ids"],
+                nprobe,
+                corpus_digest=stored,
+            )
+        if corpus_digest is not None and stored != index_digest(
+            corpus_digest, index.exact.embeddings
+        ):
+            raise ValueError(
+                "IVF index was built for a different version of the corpus."
+            )
+        return index
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    @property
+    def dim(self) -> int:
+        """The dimensionality of the indexed embeddings."""
+        return self.exact.dim
+
+    @property
+    def nlist(self) -> int:
+        """The number of inverted lists."""
+        return self.centroids.shape[0]
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        num_matches: int,
+        nprobe: Optional[int] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds approximate nearest neighbours of a query.
+
+        Parameters
+        ----------
+        query_embedding : np.ndarray
+            A 1-D query vector.
+        num_matches : int
+            The number of matches to return.
+        nprobe : int, optional
+            Lists to probe for this query; defaults to the index's ``nprobe``.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The indices of the best matches and their cosine similarities,
+            ordered from most to least similar.
+        """
+        if query_embedding.ndim != 1 or query_embedding.shape[0] != self.dim:
+            raise ValueError(
+                "Query embedding must match the dimensionality of the embeddings."
+            )
+
+        query = normalize_rows(query_embedding)
+        probe = top_k_indices(self.centroids @ query, nprobe or self.nprobe)
+        candidates = np.concatenate(
+            [self.ids[self.offsets[c]:self.offsets[c + 1]] for c in probe]
+        )
+        candidates.sort()
+
+        scores = self.exact.embeddings[candidates] @ query
+        best = top_k_indices(scores, num_matches)
+        return candidates[best], scores[best]
+
+    def search_batch(
+        self,
+        query_matrix: np.ndarray,
+        num_matches: int,
+        nprobe: Optional[int] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Runs ``search`` for every row of a query matrix.
+
+        Rows with fewer than ``num_matches`` candidates are padded with index
+        -1 and score -inf.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            (num_queries, k) matrices of match indices and cosine similarities.
+        """
+        if query_matrix.ndim != 2 or query_matrix.shape[1] != self.dim:
+            raise ValueError(
+                "Query matrix must be 2-D and match the dimensionality of the "
+                "embeddings."
+            )
+
+        num_matches = min(num_matches, len(self))
+        indices = np.full((query_matrix.shape[0], num_matches), -1, dtype=np.intp)
+        scores = np.full((query_matrix.shape[0], num_matches), -np.inf, np.float32)
+        for row, query in enumerate(query_matrix):
+            row_indices, row_scores = self.search(query, num_matches, nprobe)
+            indices[row, :len(row_indices)] = row_indices
+            scores[row, :len(row_scores)] = row_scores
+        return indices, scores
@@ -0,0 +1,384 @@
+"""
+Lexical (BM25) retrieval for exact citations and terms of art.
+
+Embeddings rank queries such as "9-7-5 setbacks" or "accessory dwelling unit"
+poorly, because the tokens that matter carry little semantic weight. This
+module builds a BM25 inverted index over each section's title, subtitle and
+content, and fuses its ranking with the vector ranking by reciprocal rank
+fusion (RRF).
+
+The postings are stored in CSR form, like the IVF lists: ``terms`` is the
+sorted vocabulary, and ``offsets[t]:offsets[t + 1]`` delimits the
+``doc_ids`` and ``term_freqs`` of term ``t``. Each posting's BM25 weight is
+precomputed at load time, so scoring a query is a gather over its terms'
+postings plus a ``np.bincount``.
+"""
+
+import logging
+import os
+import re
+from collections import Counter
+from typing import Any, Iterable, Optional, Sequence
+
+import numpy as np
+
+from lexai.config import BM25_B, BM25_K1, RRF_K
+from lexai.core.matcher import top_k_indices
+from lexai.core.metadata_store import MetadataStore
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_INDEX_SUFFIX = ".bm25.npz"
+INDEXED_COLUMNS = ("title", "subtitle", "content")
+
+# Words are runs of letters and digits; internal hyphens, dots and colons are
+# kept so that citations such as "9-7-5" or "14.2" stay single terms.
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-.:][a-z0-9]+)*")
+_MAX_TERM_LENGTH = 40
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with".split()
+)
+# A section marker, or a number with at least two hyphens or dots ("9-7-5",
+# "14.2.3"). One separator is not enough, since decimals ("6.5") and times
+# ("10:30") look the same, and ISO dates are excluded explicitly.
+_CITATION_PATTERN = re.compile(
+    r"§|\b(?:sec(?:tion)?|art(?:icle)?|ch(?:apter)?)\.?\s*\d"
+    r"|\b(?!\d{4}([-.])\d{1,2}\1\d{1,2}\b)\d+[a-z]?(?:[-.]\d+[a-z]?){2,}\b",
+    re.IGNORECASE,
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lowercase index terms, dropping stopwords.
+
+    Parameters
+    ----------
+    text : str
+        The text to tokenize.
+
+    Returns
+    -------
+    list[str]
+        The terms, in order of appearance.
+    """
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if token not in _STOPWORDS and len(token) <= _MAX_TERM_LENGTH
+    ]
+
+
+def looks_like_citation(query: str) -> bool:
+    """
+    Returns True if a query refers to a code section by number.
+
+    Matches section signs, "Sec. 12"-style references and numbers with at
+    least two hyphens or dots, such as "9-7-5" or "14.2.3", but not decimals,
+    times or dates such as "6.5", "10:30" or "2024-01-15".
+    """
+    return _CITATION_PATTERN.search(query) is not None
+
+
+def citation_terms(query: str) -> list[str]:
+    """
+    Returns the query terms that contain a digit, e.g. ``["9-7-5"]``.
+    """
+    return [term for term in tokenize(query) if any(c.isdigit() for c in term)]
+
+
+def lexical_index_path(corpus_path: str) -> str:
+    """
+    Returns the path where the lexical index for a corpus is stored.
+
+    Parameters
+    ----------
+    corpus_path : str
+        Path to a .npz corpus file or a memory-mapped corpus directory.
+
+    Returns
+    -------
+    str
+        ``<corpus>/index.bm25.npz`` for a corpus directory, otherwise the
+        corpus path with its extension replaced by ``.bm25.npz``.
+    """
+    if os.path.isdir(corpus_path):
+        return os.path.join(corpus_path, f"index{LEXICAL_INDEX_SUFFIX}")
+    root, _ = os.path.splitext(corpus_path)
+    return f"{root}{LEXICAL_INDEX_SUFFIX}"
+
+
+def section_texts(metadata: Any) -> Iterable[str]:
+    """
+    Yields the indexed text (title, subtitle and content) of every section.
+
+    Parameters
+    ----------
+    metadata : MetadataStore | Mapping[str, Sequence[str]]
+        The corpus metadata, or its columns.
+    """
+    if isinstance(metadata, MetadataStore):
+        columns = [metadata.columns[name].tolist() for name in INDEXED_COLUMNS]
+    else:
+        columns = [list(metadata[name]) for name in INDEXED_COLUMNS]
+    for fields in zip(*columns):
+        yield " ".join(str(field) for field in fields)
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over the sections of one corpus.
+    """
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        corpus_digest: Optional[str] = None,
+    ):
+        if offsets.shape[0] != terms.shape[0] + 1:
+            raise ValueError("Lexical offsets must have one entry per term plus one.")
+        if doc_ids.shape[0] != term_freqs.shape[0]:
+            raise ValueError("Lexical postings and term frequencies differ in length.")
+
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.corpus_digest = corpus_digest
+
+        num_docs = doc_lengths.shape[0]
+        doc_freqs = np.diff(offsets).astype(np.float32)
+        self.idf = np.log1p((num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+
+        average_length = float(doc_lengths.mean()) if num_docs else 1.0
+        length_norms = k1 * (1 - b + b * doc_lengths / (average_length or 1.0))
+        tf = term_freqs.astype(np.float32)
+        self.weights = (tf * (k1 + 1) / (tf + length_norms[doc_ids])).astype(
+            np.float32
+        )
+
+    @classmethod
+    def build(cls, documents: Iterable[str], **kwargs) -> "LexicalIndex":
+        """
+        Tokenizes documents and builds their inverted index.
+
+        Parameters
+        ----------
+        documents : Iterable[str]
+            The text of each section, in corpus order.
+        **kwargs
+            ``k1``, ``b`` and ``corpus_digest``, forwarded to the constructor.
+            Pass ``corpus_digest=metadata.digest()`` so that ``load`` can
+            recognize an index left over from another version of the corpus.
+
+        Returns
+        -------
+        LexicalIndex
+            The built index.
+        """
+        vocabulary: dict[str, int] = {}
+        term_ids, doc_ids, term_freqs, doc_lengths = [], [], [], []
+        for doc_id, text in enumerate(documents):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(doc_id)
+                term_freqs.append(count)
+
+        # Renumber terms in sorted order so lookups can use binary search.
+        terms = np.array(list(vocabulary), dtype=str)
+        by_term = np.argsort(terms, kind="stable")
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[by_term] = np.arange(len(terms))
+        term_ids = rank[np.asarray(term_ids, dtype=np.int64)]
+
+        order = np.argsort(term_ids, kind="stable")
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+
+        logger.info(
+            f"Built lexical index with {len(terms)} terms over "
+            f"{len(doc_lengths)} sections."
+        )
+        return cls(
+            terms[by_term],
+            offsets,
+            np.asarray(doc_ids, dtype=np.int32)[order],
+            np.minimum(np.asarray(term_freqs), np.iinfo(np.uint16).max)
+            .astype(np.uint16)[order],
+            np.asarray(doc_lengths, dtype=np.int32),
+            **kwargs,
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Saves the vocabulary and postings to ``path``.
+
+        Parameters
+        ----------
+        path : str
+            Destination .npz file, usually ``lexical_index_path(corpus_path)``.
+        """
+        arrays = {
+            "terms": self.terms,
+            "offsets": self.offsets,
+            "doc_ids": self.doc_ids,
+            "term_freqs": self.term_freqs,
+            "doc_lengths": self.doc_lengths,
+        }
+        if self.corpus_digest is not None:
+            arrays["corpus_digest"] = np.array(self.corpus_digest)
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        num_sections: Optional[int] = None,
+        corpus_digest: Optional[str] = None,
+    ) -> "LexicalIndex":
+        """
+        Loads an index saved with ``save``.
+
+        Parameters
+        ----------
+        path : str
+            Path to the saved index.
+        num_sections : int, optional
+            The size of the corpus the index should cover.
+        corpus_digest : str, optional
+            ``MetadataStore.digest()`` of the corpus; if given, the index must
+            have been built with the same digest.
+
+        Returns
+        -------
+        LexicalIndex
+            The loaded index.
+
+        Raises
+        ------
+        ValueError
+            If the index was built for a corpus of a different size, or for
+            different sections than ``corpus_digest`` describes.
+        """
+        with np.load(path) as data:
+            stored = str(data["corpus_digest"]) if "corpus_digest" in data else None
+            if corpus_digest is not None and stored != corpus_digest:
+                raise ValueError(
+                    "Lexical index was built for a different version of the corpus."
+                )
+            index = cls(
+                data["terms"],
+                data["offsets"],
+                data["doc_ids"],
+                data["term_freqs"],
+                data["doc_lengths"],
+                corpus_digest=stored,
+            )
+        if num_sections is not None and len(index) != num_sections:
+            raise ValueError(
+                "Lexical index does not match the corpus: "
+                f"{len(index)} sections indexed, {num_sections} in the corpus."
+            )
+        return index
+
+    def __len__(self) -> int:
+        return self.doc_lengths.shape[0]
+
+    def _term_ids(self, terms: Sequence[str]) -> np.ndarray:
+        """
+        Returns the ids of the given terms that are in the vocabulary.
+        """
+        if not terms or not len(self.terms):
+            return np.empty(0, dtype=np.int64)
+        terms = np.unique(np.array(terms, dtype=str))
+        positions = np.searchsorted(self.terms, terms)
+        positions = np.minimum(positions, len(self.terms) - 1)
+        return positions[self.terms[positions] == terms]
+
+    def contains(self, terms: Sequence[str]) -> bool:
+        """
+        Returns True if every one of ``terms`` occurs in the corpus.
+        """
+        return len(self._term_ids(terms)) == len(set(terms))
+
+    def search(self, query: str, num_matches: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the sections with the highest BM25 score for a query.
+
+        Parameters
+        ----------
+        query : str
+            The query text.
+        num_matches : int
+            The number of matches to return.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The indices of the best matching sections and their BM25 scores,
+            best first. Sections sharing no term with the query are never
+            returned, so fewer than ``num_matches`` may be found.
+        """
+        term_ids = self._term_ids(tokenize(query))
+        if not len(term_ids):
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+
+        slices = [slice(self.offsets[t], self.offsets[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.doc_ids[s] for s in slices])
+        weights = np.concatenate(
+            [self.weights[s] * self.idf[t] for s, t in zip(slices, term_ids)]
+        )
+        candidates, positions = np.unique(docs, return_inverse=True)
+        scores = np.bincount(positions, weights=weights).astype(np.float32)
+        best = top_k_indices(scores, num_matches)
+        return candidates[best].astype(np.intp), scores[best]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[np.ndarray],
+    num_matches: int,
+    k: int = RRF_K,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fuses several rankings of the same sections into one.
+
+    Each section scores ``sum(1 / (k + rank))`` over the rankings it appears
+    in, with ranks starting at 1.
+
+    Parameters
+    ----------
+    rankings : Sequence[np.ndarray]
+        Section indices, best first, from each retriever.
+    num_matches : int
+        The number of fused matches to return.
+    k : int, optional
+        The RRF damping constant; larger values flatten the rank weights.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The fused section indices and their RRF scores, best first.
+    """
+    rankings = [np.asarray(ranking) for ranking in rankings if len(ranking)]
+    if not rankings:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+
+    docs = np.concatenate(rankings)
+    weights = np.concatenate(
+        [1.0 / (k + np.arange(1, len(ranking) + 1)) for ranking in rankings]
+    )
+    candidates, positions = np.unique(docs, return_inverse=True)
+    scores = np.bincount(positions, weights=weights).astype(np.float32)
+    best = top_k_indices(scores, num_matches)
+    return candidates[best].astype(np.intp), scores[best]
@@ -4,59 +4,148 @@ Core logic for generating legal responses based on user queries and location.
 This module embeds the matching engine that performs semantic search using vector
 similarity and invokes GPT-4 to generate responses. It returns structured data
 for rendering in the UI.
+
+Jurisdictions with a lexical index are searched with hybrid (vector + BM25)
+retrieval. Queries that cite a code section found in those indexes take a
+lexical-only fast path that skips the embedding call altogether.
+
+When the chat upstream is saturated (see ``lexai.services.admission``), a
+query that has already retrieved its references is answered with those
+references and ``DEGRADED_RESPONSE`` instead of failing.
 """
 
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from html import escape
+from typing import AsyncIterator, Hashable, Optional, Sequence, Union
 
-import openai
+import numpy as np
 
-from lexai.config import AI_ROLE_TEMPLATE, LOCATION_INFO
-from lexai.core.data_loader import load_embeddings
-from lexai.core.matcher import find_top_matches
-from lexai.services.openai_client import get_chat_completion, get_embedding
+from lexai.config import (
+    AI_ROLE_TEMPLATE,
+    DEGRADED_RESPONSE,
+    FANOUT_MAX_WORKERS,
+    LEXICAL_FAST_PATH,
+    LOCATION_INFO,
+    OVERLOADED_MESSAGE,
+    RRF_K,
+)
+from lexai.core.answer_cache import SemanticAnswerCache
+from lexai.core.context_builder import build_context, count_tokens
+from lexai.core.corpus_registry import Corpus, corpus_registry, get_corpus
+from lexai.core.lexical_index import citation_terms, looks_like_citation
+from lexai.core.metadata_store import MatchRecord
+from lexai.services.admission import Overloaded
+from lexai.services.metrics import (
+    record_cache_lookup,
+    record_degraded,
+    record_error,
+    record_retrieval,
+    record_stage,
+    request_trace,
+    span,
+    traced_stream,
+)
+from lexai.services.openai_client import (
+    get_chat_completion,
+    get_chat_completion_async,
+    get_embedding,
+    get_embedding_async,
+    get_embeddings,
+    stream_chat_completion_async,
+)
+from lexai.services.transport import retry_reason
 
 logger = logging.getLogger(__name__)
 
+answer_cache = SemanticAnswerCache()
+corpus_registry.add_reload_listener(
+    lambda corpus: answer_cache.invalidate(corpus.location)
+)
 
-def generate_matches(query: str, location: str) -> dict:
-    """
-    Generate a legal response and references for a given query and location.
+# Searches the jurisdictions of a fan-out query concurrently; NumPy releases
+# the GIL during the similarity products.
+_fanout_executor = ThreadPoolExecutor(
+    max_workers=FANOUT_MAX_WORKERS, thread_name_prefix="lexai-fanout"
+)
 
-    Returns a dictionary with keys:
-        - "response": the GPT-generated answer string
-        - "references": list of dicts with keys: url, title, subtitle
-        - "error_html": optional HTML string if an error occurred
+Locations = Union[str, Sequence[str]]
+
+
+def _as_locations(location: Locations) -> tuple[str, ...]:
+    if isinstance(location, str):
+        return (location,)
+    return tuple(dict.fromkeys(location))
+
+
+def _invalid_locations(locations: tuple[str, ...]) -> list[str]:
+    if not locations:
+        return [""]
+    return [location for location in locations if location not in LOCATION_INFO]
+
+
+def _degraded_result(
+    error: Overloaded,
+    top_matches: list[MatchRecord],
+    trace: Optional[dict] = None,
+) -> dict:
+    """
+    Returns the references of a query whose completion could not be admitted.
     """
-    if location not in LOCATION_INFO:
-        logger.error(f"Invalid location: {location}")
+    logger.warning(f"Answering with references only: {error}")
+    record_degraded(error.pool, trace)
+    return {"response": DEGRADED_RESPONSE, "matches": top_matches, "degraded": True}
+
+
+def _invalid_location_result(location: str, trace: Optional[dict] = None) -> dict:
+    logger.error(f"Invalid location: {location}")
+    record_error("InvalidLocation", trace)
+    if not location:
         return {
             "error_html": (
                 "<p><strong>Input Error:</strong> "
-                f"Invalid location: '{escape(location)}'.</p>"
+                "Please select at least one location.</p>"
             )
         }
+    return {
+        "error_html": (
+            "<p><strong>Input Error:</strong> "
+            f"Invalid location: '{escape(location)}'.</p>"
+        )
+    }
 
-    try:
-        query_embedding = get_embedding(query)
-        location_data = LOCATION_INFO[location]
-        embeddings, metadata = load_embeddings(location_data["npz_file"])
 
-        if embeddings.shape[0] != len(metadata):
-            raise ValueError(
-                "Mismatch between number of embeddings and metadata entries.")
+def _error_result(error: Exception, trace: Optional[dict] = None) -> dict:
+    """
+    Maps an exception raised while answering a query to an error result.
 
-        top_matches = find_top_matches(query_embedding, embeddings, metadata)
-        system_prompt = f"{location_data['role_description']}\n{AI_ROLE_TEMPLATE}"
-        match_summary = str(top_matches)
-        ai_response = get_chat_completion(system_prompt, match_summary, query)
+    Single queries let ``Overloaded`` propagate instead; a batch reports it
+    for each of its queries. Transient failures (``Overloaded``, and OpenAI
+    errors that were retried until the retries ran out) are marked
+    ``"retryable"``, so that callers such as ``lexai batch`` can try again
+    later.
+    """
+    result = _describe_error(error, trace)
+    if isinstance(error, Overloaded) or retry_reason(error) is not None:
+        result["retryable"] = True
+    return result
+
+
+def _describe_error(error: Exception, trace: Optional[dict] = None) -> dict:
+    import openai
 
+    record_error(error, trace)
+    if isinstance(error, Overloaded):
+        logger.warning(f"Rejected a query: {error}")
         return {
-            "response": ai_response,
-            "matches": top_matches
+            "error_html": (
+                "<p style='color: #d9534f;'><strong>Busy:</strong> "
+                f"{OVERLOADED_MESSAGE}</p>"
+            )
         }
-
-    except openai.AuthenticationError:
+    if isinstance(error, openai.AuthenticationError):
         logger.error("Invalid OpenAI API key.")
         return {
             "error_html": (
@@ -64,35 +153,559 @@ def generate_matches(query: str, location: str) -> dict:
                 "Invalid OpenAI API key.</p>"
             )
         }
-    except openai.OpenAIError as e:
-        logger.error(f"OpenAI API Error: {e}")
+    if isinstance(error, openai.OpenAIError):
+        logger.error(f"OpenAI API Error: {error}")
         return {
             "error_html": (
                 "<p style='color: #d9534f;'><strong>OpenAI Error:</strong> "
-                f"{escape(str(e))}</p>"
+                f"{escape(str(error))}</p>"
             )
         }
-    except FileNotFoundError as e:
-        logger.error(f"File not found: {e}")
+    if isinstance(error, FileNotFoundError):
+        logger.error(f"File not found: {error}")
         return {
             "error_html": (
                 "<p style='color: #d9534f;'><strong>File Error:</strong> "
-                f"{escape(str(e))}</p>"
+                f"{escape(str(error))}</p>"
             )
         }
-    except ValueError as e:
-        logger.error(f"Value error: {e}")
+    if isinstance(error, ValueError):
+        logger.error(f"Value error: {error}")
         return {
             "error_html": (
                 "<p><strong>Input Error:</strong> "
-                f"{escape(str(e))}</p>"
+                f"{escape(str(error))}</p>"
             )
         }
-    except Exception as e:
-        logger.exception("Unhandled exception during generate_matches.")
-        return {
-            "error_html": (
-                "<p style='color: #d9534f;'><strong>Unexpected error:</strong> "
-                f"{escape(str(e))}</p>"
+    logger.error("Unhandled exception during generate_matches.", exc_info=error)
+    return {
+        "error_html": (
+            "<p style='color: #d9534f;'><strong>Unexpected error:</strong> "
+            f"{escape(str(error))}</p>"
+        )
+    }
+
+
+def _scope(locations: tuple[str, ...]) -> Union[str, tuple[str, ...]]:
+    """
+    Returns the answer-cache scope: the location, or all fan-out locations.
+    """
+    return locations[0] if len(locations) == 1 else locations
+
+
+def _system_prompt(scope: Union[str, tuple[str, ...]]) -> str:
+    if isinstance(scope, str):
+        return f"{LOCATION_INFO[scope]['role_description']}\n{AI_ROLE_TEMPLATE}"
+    return (
+        "You are an AI-powered legal assistant comparing the laws of the "
+        f"following jurisdictions: {', '.join(scope)}. Each reference is "
+        "labelled with the jurisdiction it comes from; say which jurisdiction "
+        f"each rule applies to.\n{AI_ROLE_TEMPLATE}"
+    )
+
+
+def _section_ids(corpus: Corpus, indices: np.ndarray) -> tuple:
+    return corpus.fingerprint, tuple(indices.tolist())
+
+
+def _merge_results(
+    corpora: list[Corpus],
+    results: list[tuple[np.ndarray, np.ndarray, list[MatchRecord]]],
+    num_matches: int,
+    by_score: bool = True,
+) -> tuple[Hashable, list[MatchRecord]]:
+    """
+    Merges per-jurisdiction search results into a global top-k.
+
+    Cosine similarities from plain vector searches are comparable across
+    jurisdictions and are merged by score. Hybrid (RRF) and BM25 scores
+    depend on each corpus's own rankings and statistics, so with
+    ``by_score=False`` the per-jurisdiction rankings are fused by reciprocal
+    rank fusion instead: a match scores ``1 / (RRF_K + rank)``.
+
+    Each merged match is tagged with its "jurisdiction". Ties keep the order
+    in which the jurisdictions were requested.
+    """
+    candidates = [
+        (score if by_score else 1.0 / (RRF_K + rank), corpus, index, match)
+        for corpus, (indices, scores, matches) in zip(corpora, results)
+        for rank, (index, score, match) in enumerate(
+            zip(indices.tolist(), scores.tolist(), matches), start=1
+        )
+    ]
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+    best = candidates[:num_matches]
+
+    section_ids = tuple(
+        (corpus.location, corpus.fingerprint, index) for _, corpus, index, _ in best
+    )
+    matches = [
+        match.with_jurisdiction(corpus.location) for _, corpus, _, match in best
+    ]
+    return section_ids, matches
+
+
+def _retrieval_mode(corpora: list[Corpus], query: Optional[str]) -> str:
+    if query is not None and any(corpus.hybrid for corpus in corpora):
+        return "hybrid"
+    return "vector"
+
+
+def _search(
+    locations: tuple[str, ...],
+    query_embedding: np.ndarray,
+    num_matches: int = 3,
+    query: Optional[str] = None,
+) -> tuple[Hashable, list[MatchRecord]]:
+    """
+    Retrieves the best sections for a query from one or more jurisdictions.
+
+    With the query text, jurisdictions that have a lexical index are searched
+    with hybrid retrieval.
+
+    Returns
+    -------
+    tuple[Hashable, list[MatchRecord]]
+        The answer-cache section ids and the top matches, best first.
+    """
+    if len(locations) == 1:
+        with span("corpus_load"):
+            corpus = get_corpus(locations[0])
+        record_retrieval(_retrieval_mode([corpus], query))
+        with span("search"):
+            indices, _, top_matches = corpus.search(
+                query_embedding, num_matches, query
             )
-        }
+        return _section_ids(corpus, indices), top_matches
+
+    with span("corpus_load"):
+        corpora = list(_fanout_executor.map(get_corpus, locations))
+    mode = _retrieval_mode(corpora, query)
+    record_retrieval(mode)
+    with span("search"):
+        results = list(_fanout_executor.map(
+            lambda corpus: corpus.search(query_embedding, num_matches, query),
+            corpora,
+        ))
+        return _merge_results(
+            corpora, results, num_matches, by_score=mode == "vector"
+        )
+
+
+def _wants_lexical_search(query: str) -> bool:
+    return LEXICAL_FAST_PATH and looks_like_citation(query)
+
+
+def _lexical_search(
+    locations: tuple[str, ...],
+    query: str,
+    num_matches: int = 3,
+) -> Optional[tuple[Hashable, list[MatchRecord]]]:
+    """
+    Answers a citation-like query from the lexical indexes alone.
+
+    Returns None, so that the caller falls back to embedding the query, if a
+    jurisdiction has no lexical index, if no jurisdiction contains every
+    cited number, or if nothing matches.
+    """
+    terms = citation_terms(query)
+    if not terms:
+        return None
+
+    with span("corpus_load"):
+        corpora = list(_fanout_executor.map(get_corpus, locations))
+    if any(corpus.lexical is None for corpus in corpora) or not any(
+        corpus.lexical.contains(terms) for corpus in corpora
+    ):
+        return None
+
+    with span("search"):
+        results = [corpus.search_lexical(query, num_matches) for corpus in corpora]
+    if not any(len(indices) for indices, _, _ in results):
+        return None
+    record_retrieval("lexical")
+    if len(corpora) == 1:
+        indices, _, top_matches = results[0]
+        return _section_ids(corpora[0], indices), top_matches
+    return _merge_results(corpora, results, num_matches, by_score=False)
+
+
+def _search_batch(
+    locations: tuple[str, ...],
+    query_matrix: np.ndarray,
+    num_matches: int = 3,
+    queries: Optional[Sequence[str]] = None,
+) -> list[tuple[Hashable, list[MatchRecord]]]:
+    """
+    Runs ``_search`` for every row of a query matrix.
+
+    Each jurisdiction is searched once for the whole batch.
+    """
+    if len(locations) == 1:
+        with span("corpus_load"):
+            corpus = get_corpus(locations[0])
+        with span("search"):
+            return [
+                (_section_ids(corpus, indices), top_matches)
+                for indices, _, top_matches in corpus.search_batch(
+                    query_matrix, num_matches, queries
+                )
+            ]
+
+    with span("corpus_load"):
+        corpora = list(_fanout_executor.map(get_corpus, locations))
+    by_score = queries is None or not any(corpus.hybrid for corpus in corpora)
+    with span("search"):
+        per_corpus = list(_fanout_executor.map(
+            lambda corpus: corpus.search_batch(query_matrix, num_matches, queries),
+            corpora,
+        ))
+        return [
+            _merge_results(corpora, list(rows), num_matches, by_score)
+            for rows in zip(*per_corpus)
+        ]
+
+
+def _cached_answer(
+    scope: Union[str, tuple[str, ...]],
+    query_embedding: Optional[np.ndarray],
+    section_ids: Hashable,
+    trace: Optional[dict] = None,
+) -> Optional[str]:
+    """
+    Looks up the answer cache; queries answered without an embedding (by the
+    lexical fast path) bypass it.
+    """
+    if query_embedding is None:
+        return None
+    cached = answer_cache.lookup(scope, query_embedding, section_ids)
+    record_cache_lookup("answer", cached is not None, trace)
+    return cached
+
+
+def _store_answer(
+    scope: Union[str, tuple[str, ...]],
+    query_embedding: Optional[np.ndarray],
+    section_ids: Hashable,
+    ai_response: str,
+) -> None:
+    if query_embedding is not None:
+        answer_cache.store(scope, query_embedding, section_ids, ai_response)
+
+
+def _answer(
+    query: str,
+    query_embedding: Optional[np.ndarray],
+    scope: Union[str, tuple[str, ...]],
+    section_ids: Hashable,
+    top_matches: list[MatchRecord],
+) -> str:
+    """
+    Returns the answer for a query, from the answer cache when possible.
+    """
+    cached = _cached_answer(scope, query_embedding, section_ids)
+    if cached is not None:
+        return cached
+
+    with span("context"):
+        context = build_context(top_matches)
+    with span("completion"):
+        ai_response = get_chat_completion(_system_prompt(scope), context, query)
+    _store_answer(scope, query_embedding, section_ids, ai_response)
+    return ai_response
+
+
+async def _answer_async(
+    query: str,
+    query_embedding: Optional[np.ndarray],
+    scope: Union[str, tuple[str, ...]],
+    section_ids: Hashable,
+    top_matches: list[MatchRecord],
+) -> str:
+    """
+    Asynchronous variant of ``_answer``.
+    """
+    cached = _cached_answer(scope, query_embedding, section_ids)
+    if cached is not None:
+        return cached
+
+    with span("context"):
+        context = build_context(top_matches)
+    with span("completion"):
+        ai_response = await get_chat_completion_async(
+            _system_prompt(scope), context, query)
+    _store_answer(scope, query_embedding, section_ids, ai_response)
+    return ai_response
+
+
+def generate_matches(query: str, location: Locations) -> dict:
+    """
+    Generate a legal response and references for a given query and location.
+
+    ``location`` may also be a list of jurisdictions, which are searched
+    concurrently; their results are merged into one global top-k and each
+    match is tagged with its "jurisdiction".
+
+    Responses are served from the semantic answer cache when a sufficiently
+    similar query already retrieved the same sections.
+
+    Returns a dictionary with keys:
+        - "response": the GPT-generated answer string
+        - "matches": MatchRecords with keys: url, title, subtitle, content
+          (and jurisdiction, for several locations)
+        - "degraded": True if the model was too busy to answer, in which case
+          "response" is ``DEGRADED_RESPONSE``
+        - "error_html": optional HTML string if an error occurred
+
+    Raises ``Overloaded`` if the query cannot get an embeddings slot, so that
+    callers can turn it away like a query rejected by admission control.
+    """
+    locations = _as_locations(location)
+    with request_trace("generate_matches", locations=list(locations)):
+        invalid = _invalid_locations(locations)
+        if invalid:
+            return _invalid_location_result(invalid[0])
+
+        try:
+            query_embedding = found = None
+            if _wants_lexical_search(query):
+                found = _lexical_search(locations, query)
+            if found is None:
+                with span("embedding"):
+                    query_embedding = get_embedding(query)
+                found = _search(locations, query_embedding, query=query)
+            section_ids, top_matches = found
+            try:
+                ai_response = _answer(
+                    query, query_embedding, _scope(locations), section_ids,
+                    top_matches)
+            except Overloaded as e:
+                return _degraded_result(e, top_matches)
+
+            return {
+                "response": ai_response,
+                "matches": top_matches
+            }
+
+        except Overloaded:
+            raise
+        except Exception as e:
+            return _error_result(e)
+
+
+async def generate_matches_async(query: str, location: Locations) -> dict:
+    """
+    Asynchronous variant of ``generate_matches``.
+
+    OpenAI calls are awaited on the event loop. Corpus loading and the
+    similarity search run in a worker thread so that a large corpus does not
+    stall other in-flight requests.
+
+    Returns a dictionary shaped like the result of ``generate_matches``, and
+    likewise raises ``Overloaded`` if the query cannot get an embeddings slot.
+    """
+    locations = _as_locations(location)
+    with request_trace("generate_matches", locations=list(locations)):
+        invalid = _invalid_locations(locations)
+        if invalid:
+            return _invalid_location_result(invalid[0])
+
+        try:
+            query_embedding = found = None
+            if _wants_lexical_search(query):
+                found = await asyncio.to_thread(_lexical_search, locations, query)
+            if found is None:
+                with span("embedding"):
+                    query_embedding = await get_embedding_async(query)
+                found = await asyncio.to_thread(
+                    _search, locations, query_embedding, query=query)
+            section_ids, top_matches = found
+            try:
+                ai_response = await _answer_async(
+                    query, query_embedding, _scope(locations), section_ids,
+                    top_matches)
+            except Overloaded as e:
+                return _degraded_result(e, top_matches)
+
+            return {
+                "response": ai_response,
+                "matches": top_matches
+            }
+
+        except Overloaded:
+            raise
+        except Exception as e:
+            return _error_result(e)
+
+
+async def stream_matches_async(
+    query: str,
+    location: Locations,
+) -> AsyncIterator[dict]:
+    """
+    Stream a legal response for a query, yielding events as they become known.
+
+    Yields dictionaries with one of the keys:
+        - "matches": the retrieved references, yielded once before the model
+          is called
+        - "delta": the next fragment of the GPT-generated answer
+        - "error_html": an HTML error message; no further events follow
+
+    A cached answer is yielded as a single delta. ``location`` may be a list
+    of jurisdictions, as for ``generate_matches``. ``Overloaded`` is raised,
+    before any event, if the query cannot get an embeddings slot.
+    """
+    locations = _as_locations(location)
+    with request_trace(
+        "stream_matches", bind=False, locations=list(locations)
+    ) as trace:
+        async for event in traced_stream(_stream_matches(query, locations), trace):
+            yield event
+
+
+async def _stream_matches(
+    query: str,
+    locations: tuple[str, ...],
+) -> AsyncIterator[dict]:
+    """
+    The body of ``stream_matches_async``, run with its trace bound.
+    """
+    invalid = _invalid_locations(locations)
+    if invalid:
+        yield _invalid_location_result(invalid[0])
+        return
+
+    try:
+        query_embedding = found = None
+        if _wants_lexical_search(query):
+            found = await asyncio.to_thread(_lexical_search, locations, query)
+        if found is None:
+            with span("embedding"):
+                query_embedding = await get_embedding_async(query)
+            found = await asyncio.to_thread(
+                _search, locations, query_embedding, query=query)
+        section_ids, top_matches = found
+        yield {"matches": top_matches}
+
+        scope = _scope(locations)
+        cached = _cached_answer(scope, query_embedding, section_ids)
+        if cached is not None:
+            yield {"delta": cached}
+            return
+
+        with span("context"):
+            context = build_context(top_matches)
+        fragments = []
+        stream = stream_chat_completion_async(_system_prompt(scope), context, query)
+        # Only the time spent waiting for fragments counts as completion, not
+        # the time the consumer spends between them.
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    fragment = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                fragments.append(fragment)
+                yield {"delta": fragment}
+        except Overloaded as e:
+            # The chat slot is taken before the first fragment.
+            yield {"delta": _degraded_result(e, top_matches)["response"]}
+            return
+        finally:
+            record_stage("completion", elapsed)
+            await stream.aclose()
+
+        ai_response = "".join(fragments).strip()
+        _store_answer(scope, query_embedding, section_ids, ai_response)
+
+    except Overloaded:
+        raise
+    except Exception as e:
+        yield _error_result(e)
+
+
+def generate_matches_batch(queries: list[str], location: Locations) -> list[dict]:
+    """
+    Generate legal responses and references for many queries at once.
+
+    All queries are embedded with a single embeddings request and scored
+    against each jurisdiction with one matrix-matrix product; a chat
+    completion is then requested for each query.
+
+    Returns a list with one dictionary per query, in input order, each shaped
+    like the result of ``generate_matches``.
+    """
+    locations = _as_locations(location)
+    with request_trace(
+        "generate_matches_batch", locations=list(locations), queries=len(queries)
+    ):
+        invalid = _invalid_locations(locations)
+        if invalid:
+            return [_invalid_location_result(invalid[0]) for _ in queries]
+        if not queries:
+            return []
+
+        try:
+            with span("embedding"):
+                query_embeddings = get_embeddings(queries)
+            batch_matches = _search_batch(
+                locations, query_embeddings, queries=queries)
+        except Exception as e:
+            error = _error_result(e)
+            return [dict(error) for _ in queries]
+
+        scope = _scope(locations)
+        results = []
+        for query, query_embedding, (section_ids, top_matches) in zip(
+            queries, query_embeddings, batch_matches
+        ):
+            try:
+                ai_response = _answer(
+                    query, query_embedding, scope, section_ids, top_matches)
+                results.append({"response": ai_response, "matches": top_matches})
+            except Overloaded as e:
+                results.append(_degraded_result(e, top_matches))
+            except Exception as e:
+                results.append(_error_result(e))
+        return results
+
+
+def warm_up(num_matches: int = 3) -> dict[str, float]:
+    """
+    Prepares every jurisdiction for its first query.
+
+    Each configured corpus is loaded and searched once with a synthetic
+    query, so its engine is built and its memory-mapped pages are resident
+    before real traffic arrives; the prompt tokenizer is loaded too. As with
+    ``CorpusRegistry.load_all``, failures are logged rather than raised, so
+    one missing corpus does not keep the others from being served.
+
+    Parameters
+    ----------
+    num_matches : int, optional
+        The number of matches requested by the warm-up searches.
+
+    Returns
+    -------
+    dict[str, float]
+        Seconds spent loading and searching each location that warmed up.
+    """
+    rng = np.random.default_rng(0)
+    timings = {}
+    for location in corpus_registry.locations:
+        start = time.perf_counter()
+        try:
+            corpus = get_corpus(location)
+            query = rng.standard_normal(corpus.engine.dim).astype(np.float32)
+            corpus.search(query / np.linalg.norm(query), num_matches)
+        except Exception:
+            logger.exception(f"Failed to warm up {location}.")
+            continue
+        timings[location] = time.perf_counter() - start
+        logger.info(f"Warmed up {location} in {timings[location]:.2f}s.")
+    count_tokens("warm-up")
+    return timings
@@ -5,56 +5,325 @@ This module provides functionality to find the closest legal documents
 to a user query using cosine similarity on embedding vectors.
 """
 
-from typing import Any
+from typing import TYPE_CHECKING, Union
 
 import numpy as np
-import pandas as pd
-from scipy.spatial.distance import cdist
+
+from lexai.core.metadata_store import MatchRecord, MetadataStore
+
+if TYPE_CHECKING:
+    from lexai.core.segments import SegmentedMetadata
+
+# Tolerance used to decide whether a matrix is already L2-normalized.
+_UNIT_NORM_TOLERANCE = 1e-3
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Returns a float32 copy of ``matrix`` with every row scaled to unit length.
+
+    All-zero rows are left as zeros so that they score 0 against any query.
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        A 1-D vector or 2-D matrix of embeddings.
+
+    Returns
+    -------
+    np.ndarray
+        The L2-normalized float32 array.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores: np.ndarray, num_matches: int) -> np.ndarray:
+    """
+    Returns the positions of the ``num_matches`` highest scores, best first.
+
+    Uses ``np.argpartition`` for a linear-time selection and only sorts the
+    selected candidates.
+
+    Parameters
+    ----------
+    scores : np.ndarray
+        A 1-D array of similarity scores.
+    num_matches : int
+        The number of positions to return.
+
+    Returns
+    -------
+    np.ndarray
+        Indices into ``scores`` ordered by descending score.
+    """
+    num_matches = min(num_matches, scores.shape[0])
+    if num_matches <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if num_matches < scores.shape[0]:
+        candidates = np.argpartition(-scores, num_matches - 1)[:num_matches]
+    else:
+        candidates = np.arange(scores.shape[0])
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order]
+
+
+def top_k_indices_batch(scores: np.ndarray, num_matches: int) -> np.ndarray:
+    """
+    Row-wise ``top_k_indices`` for a 2-D matrix of scores.
+
+    Parameters
+    ----------
+    scores : np.ndarray
+        A (num_queries, num_embeddings) matrix of similarity scores.
+    num_matches : int
+        The number of positions to return per row.
+
+    Returns
+    -------
+    np.ndarray
+        A (num_queries, k) matrix of column indices, each row ordered by
+        descending score.
+    """
+    num_queries, num_candidates = scores.shape
+    num_matches = min(num_matches, num_candidates)
+    if num_matches <= 0:
+        return np.empty((num_queries, 0), dtype=np.intp)
+
+    if num_matches < num_candidates:
+        candidates = np.argpartition(-scores, num_matches - 1, axis=1)
+        candidates = candidates[:, :num_matches]
+    else:
+        candidates = np.broadcast_to(
+            np.arange(num_candidates), (num_queries, num_candidates)
+        )
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class ExactSearchEngine:
+    """
+    Brute-force cosine similarity search over a fixed set of embeddings.
+
+    The embeddings are L2-normalized to float32 once at construction, so each
+    query costs a single matrix-vector product plus a linear-time top-k
+    selection. Matrices that are already float32 and unit-normalized (such as
+    OpenAI embeddings in a memory-mapped corpus) are used without copying.
+    """
+
+    def __init__(self, embeddings: np.ndarray):
+        if embeddings.ndim != 2:
+            raise ValueError("Embeddings must be a 2-D matrix.")
+
+        if embeddings.dtype == np.float32 and is_unit_normalized(embeddings):
+            self.embeddings = embeddings
+        else:
+            self.embeddings = normalize_rows(embeddings)
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    @property
+    def dim(self) -> int:
+        """The dimensionality of the indexed embeddings."""
+        return self.embeddings.shape[1]
+
+    def scores(self, query_embedding: np.ndarray) -> np.ndarray:
+        """
+        Computes the cosine similarity between a query and every embedding.
+
+        Parameters
+        ----------
+        query_embedding : np.ndarray
+            A 1-D query vector.
+
+        Returns
+        -------
+        np.ndarray
+            One similarity score per indexed embedding.
+        """
+        _check_query(query_embedding, self.dim)
+        return self.embeddings @ normalize_rows(query_embedding)
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        num_matches: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the embeddings most similar to a query.
+
+        Parameters
+        ----------
+        query_embedding : np.ndarray
+            A 1-D query vector.
+        num_matches : int
+            The number of matches to return.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The indices of the best matches and their cosine similarities,
+            ordered from most to least similar.
+        """
+        scores = self.scores(query_embedding)
+        indices = top_k_indices(scores, num_matches)
+        return indices, scores[indices]
+
+    def search_batch(
+        self,
+        query_matrix: np.ndarray,
+        num_matches: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the best matches for many queries with one matrix-matrix product.
+
+        Parameters
+        ----------
+        query_matrix : np.ndarray
+            A (num_queries, dim) matrix of query vectors.
+        num_matches : int
+            The number of matches to return per query.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            (num_queries, k) matrices of match indices and cosine similarities,
+            each row ordered from most to least similar.
+        """
+        _check_query_matrix(query_matrix, self.dim)
+        scores = normalize_rows(query_matrix) @ self.embeddings.T
+        indices = top_k_indices_batch(scores, num_matches)
+        return indices, np.take_along_axis(scores, indices, axis=1)
+
+
+def is_unit_normalized(embeddings: np.ndarray) -> bool:
+    """
+    Returns True if every row of ``embeddings`` has (close to) unit L2 norm.
+    """
+    if embeddings.shape[0] == 0:
+        return True
+    norms = np.linalg.norm(embeddings, axis=1)
+    return bool(np.all(np.abs(norms - 1.0) < _UNIT_NORM_TOLERANCE))
+
+
+def _check_query(query_embedding: np.ndarray, dim: int) -> None:
+    if query_embedding.ndim != 1 or query_embedding.shape[0] != dim:
+        raise ValueError(
+            "Query embedding must match the dimensionality of the embeddings."
+        )
+
+
+def _check_query_matrix(query_matrix: np.ndarray, dim: int) -> None:
+    if query_matrix.ndim != 2 or query_matrix.shape[1] != dim:
+        raise ValueError(
+            "Query matrix must be 2-D and match the dimensionality of the "
+            "embeddings."
+        )
+
+
+def take_records(
+    jurisdiction_data: Union[MetadataStore, "SegmentedMetadata"],
+    indices: np.ndarray,
+) -> list[MatchRecord]:
+    """
+    Materializes the metadata rows at the given positions as match records.
+
+    Parameters
+    ----------
+    jurisdiction_data : MetadataStore | SegmentedMetadata
+        The jurisdiction metadata.
+    indices : np.ndarray
+        Row positions to materialize, in output order.
+
+    Returns
+    -------
+    list[MatchRecord]
+        One record per requested row.
+    """
+    return jurisdiction_data.take(indices)
 
 
 def find_top_matches(
     query_embedding: np.ndarray,
     embeddings: np.ndarray,
-    jurisdiction_data: pd.DataFrame,
+    jurisdiction_data: MetadataStore,
     num_matches: int = 3,
-) -> list[dict[str, Any]]:
+) -> list[MatchRecord]:
     """
     Finds the top N closest matches to a query embedding within a set of embeddings.
 
+    This is a convenience wrapper that builds a throwaway ``ExactSearchEngine``;
+    callers that search the same embeddings repeatedly should keep an engine.
+
     Parameters
     ----------
     query_embedding : np.ndarray
         The embedding of the user's query.
     embeddings : np.ndarray
         The array of embeddings from the legal jurisdiction data.
-    jurisdiction_data : pd.DataFrame
-        DataFrame containing the metadata (url, title, subtitle, content)
-        corresponding to the embeddings.
+    jurisdiction_data : MetadataStore
+        The metadata (url, title, subtitle, content) corresponding to the
+        embeddings.
     num_matches : int, optional
         The number of top matches to retrieve, by default 3.
 
     Returns
     -------
-    list[dict[str, Any]]
-        A list of dictionaries, where each dictionary represents a top match
-        and contains its 'url', 'title', 'subtitle', and 'content'.
+    list[MatchRecord]
+        The top matches, each with its 'url', 'title', 'subtitle', and
+        'content'.
     """
     if jurisdiction_data.empty or embeddings.shape[0] == 0:
         return []
 
-    if jurisdiction_data.shape[0] != embeddings.shape[0]:
+    if len(jurisdiction_data) != embeddings.shape[0]:
         raise ValueError(
             "Number of embeddings and metadata entries must match.")
 
-    if query_embedding.ndim != 1 or query_embedding.shape[0] != embeddings.shape[1]:
+    _check_query(query_embedding, embeddings.shape[1])
+
+    indices, _ = ExactSearchEngine(embeddings).search(query_embedding, num_matches)
+    return take_records(jurisdiction_data, indices)
+
+
+def find_top_matches_batch(
+    query_matrix: np.ndarray,
+    embeddings: np.ndarray,
+    jurisdiction_data: MetadataStore,
+    num_matches: int = 3,
+) -> list[list[MatchRecord]]:
+    """
+    Finds the top N closest matches for each row of a query matrix.
+
+    Parameters
+    ----------
+    query_matrix : np.ndarray
+        A (num_queries, dim) matrix of query embeddings.
+    embeddings : np.ndarray
+        The array of embeddings from the legal jurisdiction data.
+    jurisdiction_data : MetadataStore
+        Metadata (url, title, subtitle, content) corresponding to the embeddings.
+    num_matches : int, optional
+        The number of top matches to retrieve per query, by default 3.
+
+    Returns
+    -------
+    list[list[MatchRecord]]
+        One list of matches per query, in the same order as ``query_matrix``.
+    """
+    if jurisdiction_data.empty or embeddings.shape[0] == 0:
+        return [[] for _ in range(len(query_matrix))]
+
+    if len(jurisdiction_data) != embeddings.shape[0]:
         raise ValueError(
-            "Query embedding must match the dimensionality of the embeddings."
-        )
+            "Number of embeddings and metadata entries must match.")
 
-    distances = cdist(query_embedding.reshape(1, -1),
-                      embeddings, metric="cosine")[0]
-    safe_num_matches = min(num_matches, len(jurisdiction_data))
-    indices = np.argsort(distances)[:safe_num_matches]
-    subset = jurisdiction_data.iloc[indices]
+    _check_query_matrix(query_matrix, embeddings.shape[1])
 
-    return subset.to_dict("records")
+    indices, _ = ExactSearchEngine(embeddings).search_batch(query_matrix, num_matches)
+    return [take_records(jurisdiction_data, row) for row in indices]
@@ -0,0 +1,216 @@
+"""
+Columnar metadata storage for LexAI corpora.
+
+Section metadata (url, title, subtitle and content) is held column by column,
+each column as an array of byte offsets into one UTF-8 blob. The same layout
+backs memory-mapped corpus directories (see ``lexai.core.corpus_format``) and
+legacy .npz files loaded into memory, so retrieval never builds a DataFrame.
+Values are decoded only for the rows a search returns, as ``MatchRecord``
+objects.
+"""
+
+import hashlib
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+RECORD_FIELDS = ("url", "title", "subtitle", "content")
+
+
+def encode_column(values: Sequence[Any]) -> tuple[np.ndarray, bytes]:
+    """
+    Encodes values as an int64 offsets array and a UTF-8 blob.
+
+    Parameters
+    ----------
+    values : Sequence[Any]
+        The column values; each is converted with ``str``.
+
+    Returns
+    -------
+    tuple[np.ndarray, bytes]
+        ``len(values) + 1`` byte offsets and the concatenated encoded values.
+    """
+    encoded = [str(value).encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+class StringColumn:
+    """
+    A read-only column of strings backed by an offsets array and a UTF-8 blob.
+
+    Values are decoded on access, so only the rows that are actually read are
+    materialized as Python strings.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self._offsets = offsets
+        self._blob = blob
+
+    @classmethod
+    def from_values(cls, values: Sequence[Any]) -> "StringColumn":
+        """Builds an in-memory column from a sequence of values."""
+        offsets, blob = encode_column(values)
+        return cls(offsets, np.frombuffer(blob, dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def tolist(self) -> list[str]:
+        """Decodes every value in the column."""
+        return [self[i] for i in range(len(self))]
+
+
+class MatchRecord(Mapping):
+    """
+    One retrieved section.
+
+    Fields are plain attributes (``record.title``), and the record is also a
+    read-only mapping (``record["title"]``, ``record.get("title")``,
+    ``dict(record)``) so that it can stand in for the dictionaries matches
+    used to be. ``jurisdiction`` is only set, and only listed as a key, for
+    matches from a cross-jurisdiction search.
+    """
+
+    __slots__ = (*RECORD_FIELDS, "jurisdiction")
+
+    def __init__(
+        self,
+        url: str,
+        title: str,
+        subtitle: str,
+        content: str,
+        jurisdiction: Optional[str] = None,
+    ):
+        self.url = url
+        self.title = title
+        self.subtitle = subtitle
+        self.content = content
+        self.jurisdiction = jurisdiction
+
+    def __getitem__(self, key: str) -> str:
+        if key in MatchRecord.__slots__:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from RECORD_FIELDS
+        if self.jurisdiction is not None:
+            yield "jurisdiction"
+
+    def __len__(self) -> int:
+        return len(RECORD_FIELDS) + (self.jurisdiction is not None)
+
+    def __repr__(self) -> str:
+        return f"MatchRecord({dict(self)!r})"
+
+    def with_jurisdiction(self, jurisdiction: str) -> "MatchRecord":
+        """
+        Returns a copy of the record tagged with the jurisdiction it came from.
+        """
+        return MatchRecord(
+            self.url, self.title, self.subtitle, self.content, jurisdiction
+        )
+
+
+class MetadataStore:
+    """
+    Jurisdiction metadata stored as ``StringColumn`` columns.
+
+    Provides the small subset of the DataFrame interface used by the matcher
+    (``empty``, ``shape`` and ``len``) plus ``take`` to materialize rows.
+    """
+
+    def __init__(self, columns: dict[str, StringColumn]):
+        missing = [name for name in RECORD_FIELDS if name not in columns]
+        if missing:
+            raise KeyError(f"Missing metadata column '{missing[0]}'.")
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All metadata columns must have the same length.")
+
+        self.columns = columns
+        self._record_columns = [columns[name] for name in RECORD_FIELDS]
+        self._length = lengths.pop()
+        self._digest: Optional[str] = None
+
+    @classmethod
+    def from_columns(cls, columns: Mapping[str, Sequence[Any]]) -> "MetadataStore":
+        """
+        Builds an in-memory store from column values.
+
+        Parameters
+        ----------
+        columns : Mapping[str, Sequence[Any]]
+            Values keyed by column name, with at least the url, title,
+            subtitle and content columns.
+
+        Returns
+        -------
+        MetadataStore
+            The encoded store.
+        """
+        return cls({
+            name: StringColumn.from_values(values) for name, values in columns.items()
+        })
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def empty(self) -> bool:
+        return self._length == 0
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self._length, len(self.columns)
+
+    def digest(self) -> str:
+        """
+        Returns a hash of every section's url, title, subtitle and content.
+
+        Indexes built next to a corpus store it, so that an index left over
+        from a different version of the corpus is recognized even when the
+        number of sections is unchanged. Hashing reads every value, so it is
+        computed on first use only, and then remembered.
+        """
+        if self._digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+            for column in self._record_columns:
+                hasher.update(np.ascontiguousarray(column._offsets, dtype=np.int64))
+                hasher.update(np.ascontiguousarray(column._blob))
+            self._digest = hasher.hexdigest()
+        return self._digest
+
+    def to_columns(self) -> dict[str, list[str]]:
+        """Decodes every column, e.g. to rewrite the corpus."""
+        return {name: column.tolist() for name, column in self.columns.items()}
+
+    def take(self, indices: Iterable[int]) -> list[MatchRecord]:
+        """
+        Materializes the given rows as match records.
+
+        Parameters
+        ----------
+        indices : Iterable[int]
+            Row positions to read.
+
+        Returns
+        -------
+        list[MatchRecord]
+            One record per row, in the order requested.
+        """
+        columns = self._record_columns
+        return [
+            MatchRecord(*(column[index] for column in columns))
+            for index in map(int, indices)
+        ]
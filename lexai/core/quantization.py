@@ -0,0 +1,263 @@
+"""
+Quantized embedding search with exact rescoring.
+
+Instead of a full float32 copy of the normalized embeddings, a
+``QuantizedSearchEngine`` keeps only a compact matrix resident:
+
+- ``float16``: half-precision rows (2 bytes per dimension).
+- ``int8``: rows quantized with one scale per dimension (1 byte per
+  dimension), so that ``x[i, d] ~= codes[i, d] * scales[d]``.
+
+A query is first scored against the compact matrix, in row chunks so the
+upcast to float32 never materializes the whole matrix. The best
+``num_matches * rescore_factor`` candidates are then rescored exactly against
+the original vectors, which for a memory-mapped corpus stay on disk and are
+only paged in for those candidates.
+"""
+
+import logging
+from typing import Optional, Union
+
+import numpy as np
+
+from lexai.config import EMBEDDING_QUANTIZATION, RESCORE_FACTOR
+from lexai.core.matcher import (
+    ExactSearchEngine,
+    _check_query,
+    _check_query_matrix,
+    normalize_rows,
+    top_k_indices,
+    top_k_indices_batch,
+)
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+
+# Rows converted to float32 at a time while quantizing or scoring.
+_CHUNK_ROWS = 8192
+
+
+def quantize_float16(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Returns the L2-normalized rows of ``embeddings`` as float16.
+
+    Parameters
+    ----------
+    embeddings : np.ndarray
+        A 2-D embedding matrix of any float dtype (may be memory-mapped).
+
+    Returns
+    -------
+    np.ndarray
+        A float16 matrix of the same shape.
+    """
+    compact = np.empty(embeddings.shape, dtype=np.float16)
+    for start in range(0, embeddings.shape[0], _CHUNK_ROWS):
+        stop = start + _CHUNK_ROWS
+        compact[start:stop] = normalize_rows(embeddings[start:stop])
+    return compact
+
+
+def quantize_int8(embeddings: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Quantizes the L2-normalized rows of ``embeddings`` to int8.
+
+    Each dimension gets its own scale, chosen so that the largest absolute
+    value in that dimension maps to 127.
+
+    Parameters
+    ----------
+    embeddings : np.ndarray
+        A 2-D embedding matrix of any float dtype (may be memory-mapped).
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The int8 codes and the float32 per-dimension scales.
+    """
+    num_rows, dim = embeddings.shape
+    max_abs = np.zeros(dim, dtype=np.float32)
+    for start in range(0, num_rows, _CHUNK_ROWS):
+        chunk = normalize_rows(embeddings[start:start + _CHUNK_ROWS])
+        np.maximum(max_abs, np.abs(chunk).max(axis=0, initial=0.0), out=max_abs)
+
+    scales = max_abs / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.empty((num_rows, dim), dtype=np.int8)
+    for start in range(0, num_rows, _CHUNK_ROWS):
+        chunk = normalize_rows(embeddings[start:start + _CHUNK_ROWS])
+        codes[start:start + _CHUNK_ROWS] = np.clip(
+            np.rint(chunk / scales), -127, 127
+        )
+    return codes, scales
+
+
+class QuantizedSearchEngine:
+    """
+    Two-pass cosine similarity search over a quantized embedding matrix.
+
+    The first pass scores every row of the compact matrix; the second
+    rescores the top candidates against the full-precision ``embeddings``,
+    so the returned scores are exact cosine similarities.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        mode: str = "int8",
+        rescore_factor: int = RESCORE_FACTOR,
+    ):
+        if embeddings.ndim != 2:
+            raise ValueError("Embeddings must be a 2-D matrix.")
+        if mode not in ("float16", "int8"):
+            raise ValueError(f"Unsupported quantization mode: {mode}")
+
+        self.embeddings = embeddings
+        self.mode = mode
+        self.rescore_factor = max(1, rescore_factor)
+        if mode == "float16":
+            self.compact = quantize_float16(embeddings)
+            self.scales = np.ones(embeddings.shape[1], dtype=np.float32)
+        else:
+            self.compact, self.scales = quantize_int8(embeddings)
+
+    def __len__(self) -> int:
+        return self.compact.shape[0]
+
+    @property
+    def dim(self) -> int:
+        """The dimensionality of the indexed embeddings."""
+        return self.compact.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """The resident size of the compact matrix and scales."""
+        return self.compact.nbytes + self.scales.nbytes
+
+    def approximate_scores(self, query_matrix: np.ndarray) -> np.ndarray:
+        """
+        Scores normalized queries against the compact matrix.
+
+        Parameters
+        ----------
+        query_matrix : np.ndarray
+            A (num_queries, dim) matrix of unit-length queries.
+
+        Returns
+        -------
+        np.ndarray
+            A (num_queries, num_embeddings) matrix of approximate similarities.
+        """
+        scaled = (query_matrix * self.scales).T
+        scores = np.empty((query_matrix.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), _CHUNK_ROWS):
+            chunk = self.compact[start:start + _CHUNK_ROWS].astype(np.float32)
+            scores[:, start:start + _CHUNK_ROWS] = (chunk @ scaled).T
+        return scores
+
+    def _rescore(
+        self,
+        query: np.ndarray,
+        candidates: np.ndarray,
+        num_matches: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Sorted gathers keep memory-mapped reads sequential.
+        candidates = np.sort(candidates)
+        scores = normalize_rows(self.embeddings[candidates]) @ query
+        best = top_k_indices(scores, num_matches)
+        return candidates[best], scores[best]
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        num_matches: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the embeddings most similar to a query.
+
+        Parameters
+        ----------
+        query_embedding : np.ndarray
+            A 1-D query vector.
+        num_matches : int
+            The number of matches to return.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The indices of the best matches and their exact cosine
+            similarities, ordered from most to least similar.
+        """
+        _check_query(query_embedding, self.dim)
+        query = normalize_rows(query_embedding)
+        scores = self.approximate_scores(query[np.newaxis, :])[0]
+        candidates = top_k_indices(scores, num_matches * self.rescore_factor)
+        return self._rescore(query, candidates, num_matches)
+
+    def search_batch(
+        self,
+        query_matrix: np.ndarray,
+        num_matches: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Runs ``search`` for every row of a query matrix.
+
+        The first pass is a single product against the compact matrix;
+        rescoring is done per query.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            (num_queries, k) matrices of match indices and exact cosine
+            similarities, each row ordered from most to least similar.
+        """
+        _check_query_matrix(query_matrix, self.dim)
+        queries = normalize_rows(query_matrix)
+        candidates = top_k_indices_batch(
+            self.approximate_scores(queries), num_matches * self.rescore_factor
+        )
+        k = min(num_matches, len(self))
+        indices = np.empty((len(queries), k), dtype=np.intp)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for row, (query, row_candidates) in enumerate(zip(queries, candidates)):
+            indices[row], scores[row] = self._rescore(query, row_candidates, k)
+        return indices, scores
+
+
+def make_search_engine(
+    embeddings: np.ndarray,
+    quantization: Optional[str] = None,
+) -> Union[ExactSearchEngine, QuantizedSearchEngine]:
+    """
+    Builds the exact or quantized search engine for a corpus.
+
+    Parameters
+    ----------
+    embeddings : np.ndarray
+        The corpus embeddings, ideally memory-mapped when quantizing.
+    quantization : str, optional
+        "none", "float16" or "int8"; defaults to ``EMBEDDING_QUANTIZATION``.
+
+    Returns
+    -------
+    ExactSearchEngine | QuantizedSearchEngine
+        The engine to search the corpus with.
+
+    Raises
+    ------
+    ValueError
+        If the quantization mode is unknown.
+    """
+    mode = (quantization or EMBEDDING_QUANTIZATION).lower()
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unsupported quantization mode: {mode}")
+    if mode == "none":
+        return ExactSearchEngine(embeddings)
+
+    engine = QuantizedSearchEngine(embeddings, mode)
+    logger.info(
+        f"Quantized {len(engine)} embeddings to {mode} "
+        f"({engine.nbytes / 2**20:.1f} MiB resident)."
+    )
+    return engine
@@ -0,0 +1,517 @@
+"""
+Segment-based corpus storage with incremental updates.
+
+A segmented corpus is a directory holding one immutable base segment and an
+ordered list of small delta segments, each stored in the memory-mapped corpus
+format (see ``lexai.core.corpus_format``). A delta adds new sections and may
+tombstone existing ones by URL; a tombstone hides every matching section in
+the base and in earlier deltas, but not the sections added by the delta
+itself, so an amendment is a single delta that tombstones a URL and re-adds
+its new text.
+
+``segments.json`` lists the live segments and is replaced atomically on every
+update, so readers always see a consistent set of segments and never block:
+a reader that already opened a generation keeps using it until the registry
+notices the new manifest. ``compact`` folds the deltas back into a new base.
+
+Writers serialize their manifest updates on an exclusive lock file
+(``segments.lock``), so ``add_delta`` may run while ``compact`` folds the
+deltas: the compaction keeps any delta published in the meantime.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence
+
+import numpy as np
+
+from lexai.core.corpus_format import (
+    METADATA_COLUMNS,
+    open_corpus,
+    read_manifest,
+    write_corpus,
+)
+from lexai.core.data_loader import load_embeddings
+from lexai.core.ivf_index import IVFFlatIndex, ivf_index_path
+from lexai.core.matcher import top_k_indices_batch
+from lexai.core.metadata_store import MatchRecord, MetadataStore
+from lexai.core.quantization import make_search_engine
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS_FORMAT = "lexai-segments"
+SEGMENTS_MANIFEST_FILE = "segments.json"
+TOMBSTONES_FILE = "tombstones.json"
+LOCK_FILE = "segments.lock"
+LOCK_TIMEOUT = 60.0
+
+
+def is_segmented_dir(path: str) -> bool:
+    """
+    Returns True if ``path`` is a segmented corpus directory.
+    """
+    return os.path.isfile(os.path.join(path, SEGMENTS_MANIFEST_FILE))
+
+
+def read_segments_manifest(root: str) -> dict[str, Any]:
+    """
+    Reads the manifest of a segmented corpus.
+
+    Raises
+    ------
+    FileNotFoundError
+        If ``root`` has no segments manifest.
+    ValueError
+        If the manifest is not a LexAI segments manifest.
+    """
+    with open(os.path.join(root, SEGMENTS_MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SEGMENTS_FORMAT:
+        raise ValueError(f"Not a segmented LexAI corpus: {root}")
+    return manifest
+
+
+def _write_segments_manifest(root: str, manifest: dict[str, Any]) -> None:
+    path = os.path.join(root, SEGMENTS_MANIFEST_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+@contextmanager
+def _segments_lock(root: str, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
+    """
+    Holds the exclusive update lock of a segmented corpus.
+
+    Raises
+    ------
+    TimeoutError
+        If the lock could not be taken within ``timeout`` seconds.
+    """
+    path = os.path.join(root, LOCK_FILE)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Timed out waiting for {path}; if no update of the corpus "
+                    "is running, a crashed one left it behind and it can be "
+                    "removed."
+                ) from None
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        os.remove(path)
+
+
+def metadata_to_columns(metadata: Any) -> dict[str, list[str]]:
+    """
+    Converts a ``MetadataStore`` (or a mapping of columns) into column lists.
+    """
+    if isinstance(metadata, MetadataStore):
+        return {name: metadata.columns[name].tolist() for name in METADATA_COLUMNS}
+    return {name: list(metadata[name]) for name in METADATA_COLUMNS}
+
+
+def create_segmented_corpus(root: str, source_path: str) -> None:
+    """
+    Initializes a segmented corpus whose base segment is a copy of a corpus.
+
+    Parameters
+    ----------
+    root : str
+        The directory to create.
+    source_path : str
+        A .npz file or memory-mapped corpus directory to use as the base.
+    """
+    embeddings, metadata = load_embeddings(source_path)
+    os.makedirs(root, exist_ok=True)
+    write_corpus(os.path.join(root, "base-000001"), embeddings,
+                 metadata_to_columns(metadata))
+    _write_segments_manifest(root, {
+        "format": SEGMENTS_FORMAT,
+        "generation": 1,
+        "base": "base-000001",
+        "deltas": [],
+    })
+
+
+def add_delta(
+    root: str,
+    embeddings: np.ndarray,
+    columns: dict[str, Sequence[Any]],
+    tombstones: Sequence[str] = (),
+) -> str:
+    """
+    Appends a delta segment that adds sections and tombstones URLs.
+
+    Parameters
+    ----------
+    root : str
+        The segmented corpus directory.
+    embeddings : np.ndarray
+        Embeddings of the added sections; may be empty for a delete-only
+        update.
+    columns : dict[str, Sequence[Any]]
+        Metadata columns of the added sections.
+    tombstones : Sequence[str], optional
+        URLs whose existing sections should be hidden.
+
+    Returns
+    -------
+    str
+        The name of the new segment.
+
+    Raises
+    ------
+    ValueError
+        If the embeddings do not match the dimensionality of the base.
+    TimeoutError
+        If another update holds the corpus lock for too long.
+    """
+    with _segments_lock(root):
+        name = _add_delta(root, embeddings, columns, tombstones)
+    logger.info(
+        f"Added {name} to {root}: {len(embeddings)} sections, "
+        f"{len(set(tombstones))} tombstones."
+    )
+    return name
+
+
+def _add_delta(
+    root: str,
+    embeddings: np.ndarray,
+    columns: dict[str, Sequence[Any]],
+    tombstones: Sequence[str],
+) -> str:
+    manifest = read_segments_manifest(root)
+    dim = read_manifest(os.path.join(root, manifest["base"]))["dim"]
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.size == 0:
+        embeddings = embeddings.reshape(0, dim)
+    if embeddings.ndim != 2 or embeddings.shape[1] != dim:
+        raise ValueError(f"Delta embeddings must be a (n, {dim}) matrix.")
+    generation = manifest["generation"] + 1
+    name = f"delta-{generation:06d}"
+    segment_dir = os.path.join(root, name)
+
+    write_corpus(segment_dir, embeddings, columns)
+    with open(os.path.join(segment_dir, TOMBSTONES_FILE), "w", encoding="utf-8") as f:
+        json.dump(sorted(set(tombstones)), f)
+
+    manifest["generation"] = generation
+    manifest["deltas"] = manifest["deltas"] + [name]
+    _write_segments_manifest(root, manifest)
+    return name
+
+
+def _read_tombstones(segment_dir: str) -> set[str]:
+    path = os.path.join(segment_dir, TOMBSTONES_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return set(json.load(f))
+
+
+class Segment:
+    """
+    One opened segment: its embeddings, metadata, engine and dead-row mask.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        dead_urls: set[str],
+        quantization: Optional[str] = None,
+    ):
+        self.name = name
+        self.path = path
+        self.embeddings, self.metadata = open_corpus(path)
+        self.tombstones = _read_tombstones(path)
+
+        self.engine = None
+        index_path = ivf_index_path(path)
+        if os.path.exists(index_path):
+            try:
+                self.engine = IVFFlatIndex.load(
+                    index_path, self.embeddings, corpus_digest=self.metadata.digest()
+                )
+            except ValueError as e:
+                logger.warning(f"Ignoring stale IVF index for segment {name}: {e}")
+        self.engine = self.engine or make_search_engine(
+            self.embeddings, quantization
+        )
+
+        self.dead = np.zeros(len(self.metadata), dtype=bool)
+        if dead_urls and len(self.metadata):
+            urls = self.metadata.columns["url"]
+            self.dead = np.fromiter(
+                (urls[i] in dead_urls for i in range(len(urls))),
+                dtype=bool,
+                count=len(urls),
+            )
+        self.num_dead = int(self.dead.sum())
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+
+def open_segments(root: str, quantization: Optional[str] = None) -> list[Segment]:
+    """
+    Opens every live segment of a segmented corpus, base first.
+
+    Each segment's dead-row mask covers the tombstones of all later deltas.
+    Segments without an IVF index are searched with ``make_search_engine``
+    and the given quantization mode.
+    """
+    manifest = read_segments_manifest(root)
+    names = [manifest["base"], *manifest["deltas"]]
+    later_tombstones = [set() for _ in names]
+    for i in range(len(names) - 1, 0, -1):
+        later_tombstones[i - 1] = later_tombstones[i] | _read_tombstones(
+            os.path.join(root, names[i])
+        )
+    return [
+        Segment(name, os.path.join(root, name), dead, quantization)
+        for name, dead in zip(names, later_tombstones)
+    ]
+
+
+class SegmentedMetadata:
+    """
+    Metadata view over all segments, addressed by global row index.
+
+    Global indices number the rows of the base segment first, then each delta
+    in order; tombstoned rows keep their index but are never returned by
+    ``SegmentedEngine``.
+    """
+
+    def __init__(self, segments: list[Segment]):
+        self.segments = segments
+        self.offsets = np.cumsum([0] + [len(segment) for segment in segments])
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self), len(METADATA_COLUMNS)
+
+    def take(self, indices) -> list[MatchRecord]:
+        """
+        Materializes rows by global index.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        segment_ids = np.searchsorted(self.offsets, indices, side="right") - 1
+        return [
+            self.segments[s].metadata.take([int(i - self.offsets[s])])[0]
+            for i, s in zip(indices, segment_ids)
+        ]
+
+
+class SegmentedEngine:
+    """
+    Searches every segment and merges their top-k results.
+
+    Each segment is asked for ``k`` plus its number of dead rows, so that at
+    least ``k`` live candidates survive the tombstone filter.
+    """
+
+    def __init__(self, segments: list[Segment]):
+        self.segments = [segment for segment in segments if len(segment)]
+        self.offsets = SegmentedMetadata(segments).offsets
+        self._global_offsets = [
+            int(self.offsets[i]) for i, segment in enumerate(segments) if len(segment)
+        ]
+        self._dim = next(
+            (segment.engine.dim for segment in self.segments),
+            segments[0].embeddings.shape[1] if segments else 0,
+        )
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    @property
+    def dim(self) -> int:
+        """The dimensionality of the indexed embeddings."""
+        return self._dim
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        num_matches: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the live sections most similar to a query across all segments.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            Global indices of the best matches and their cosine similarities.
+        """
+        indices, scores = self.search_batch(query_embedding[np.newaxis, :], num_matches)
+        found = indices[0] >= 0
+        return indices[0][found], scores[0][found]
+
+    def search_batch(
+        self,
+        query_matrix: np.ndarray,
+        num_matches: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Runs ``search`` for every row of a query matrix.
+
+        Rows with fewer than ``num_matches`` live candidates are padded with
+        index -1 and score -inf.
+        """
+        if query_matrix.ndim != 2 or query_matrix.shape[1] != self.dim:
+            raise ValueError(
+                "Query matrix must be 2-D and match the dimensionality of the "
+                "embeddings."
+            )
+
+        all_indices, all_scores = [], []
+        for segment, offset in zip(self.segments, self._global_offsets):
+            fetch = min(len(segment), num_matches + segment.num_dead)
+            indices, scores = segment.engine.search_batch(query_matrix, fetch)
+            scores = np.where(indices >= 0, scores, -np.inf)
+            local = np.where(indices >= 0, indices, 0)
+            scores = np.where(segment.dead[local], -np.inf, scores)
+            all_indices.append(np.where(indices >= 0, indices + offset, -1))
+            all_scores.append(scores)
+
+        num_queries = query_matrix.shape[0]
+        if not all_indices:
+            empty = np.empty((num_queries, 0))
+            return empty.astype(np.intp), empty.astype(np.float32)
+
+        merged_indices = np.concatenate(all_indices, axis=1)
+        merged_scores = np.concatenate(all_scores, axis=1)
+        best = top_k_indices_batch(merged_scores, num_matches)
+        indices = np.take_along_axis(merged_indices, best, axis=1)
+        scores = np.take_along_axis(merged_scores, best, axis=1)
+        indices[np.isneginf(scores)] = -1
+        return indices, scores
+
+
+def load_segmented_corpus(
+    root: str,
+    quantization: Optional[str] = None,
+) -> tuple[SegmentedEngine, SegmentedMetadata]:
+    """
+    Opens a segmented corpus for searching.
+
+    Parameters
+    ----------
+    root : str
+        The segmented corpus directory.
+    quantization : str, optional
+        The quantization mode for segment engines (see
+        ``lexai.core.quantization``).
+
+    Returns
+    -------
+    tuple[SegmentedEngine, SegmentedMetadata]
+        An engine returning global indices and the matching metadata view.
+    """
+    segments = open_segments(root, quantization)
+    return SegmentedEngine(segments), SegmentedMetadata(segments)
+
+
+def compact(root: str, remove_old: bool = True) -> Optional[str]:
+    """
+    Folds every delta into a new base segment.
+
+    The new base is written alongside the old segments and published by
+    atomically replacing the manifest, so readers are never blocked. Old
+    segment directories are then removed; processes that still have them
+    memory-mapped keep reading the unlinked files until they reload. If the
+    old base had an IVF index, one with the same number of lists is rebuilt
+    for the new base before it is published.
+
+    The deltas are folded without holding the corpus lock. Deltas added in
+    the meantime are kept after the new base, and if another compaction
+    published first, this one is discarded.
+
+    Parameters
+    ----------
+    root : str
+        The segmented corpus directory.
+    remove_old : bool, optional
+        Whether to delete the superseded segment directories.
+
+    Returns
+    -------
+    str or None
+        The new base segment name, or None if there was nothing to compact.
+    """
+    with _segments_lock(root):
+        manifest = read_segments_manifest(root)
+        if not manifest["deltas"]:
+            return None
+        old = [manifest["base"], *manifest["deltas"]]
+        segments = open_segments(root)
+        # Reserve a generation, so a concurrent compaction names its base
+        # differently.
+        manifest["generation"] += 1
+        _write_segments_manifest(root, manifest)
+    live_embeddings = []
+    columns: dict[str, list[str]] = {name: [] for name in METADATA_COLUMNS}
+    for segment in segments:
+        keep = np.flatnonzero(~segment.dead)
+        live_embeddings.append(np.asarray(segment.embeddings[keep]))
+        for name in METADATA_COLUMNS:
+            column = segment.metadata.columns[name]
+            columns[name].extend(column[int(i)] for i in keep)
+
+    name = f"base-{manifest['generation']:06d}"
+    embeddings = np.concatenate(live_embeddings)
+    write_corpus(os.path.join(root, name), embeddings, columns)
+
+    old_index = segments[0].engine
+    if isinstance(old_index, IVFFlatIndex) and len(embeddings):
+        index = IVFFlatIndex.build(
+            embeddings,
+            old_index.nlist,
+            corpus_digest=MetadataStore.from_columns(columns).digest(),
+        )
+        index.save(ivf_index_path(os.path.join(root, name)))
+
+    del segments
+    with _segments_lock(root):
+        current = read_segments_manifest(root)
+        if current["base"] != manifest["base"]:
+            logger.info(f"{root} was compacted concurrently; discarding {name}.")
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            return None
+        added = current["deltas"][len(manifest["deltas"]):]
+        _write_segments_manifest(root, {
+            "format": SEGMENTS_FORMAT,
+            "generation": current["generation"] + 1,
+            "base": name,
+            "deltas": added,
+        })
+    if remove_old:
+        for segment_name in old:
+            shutil.rmtree(os.path.join(root, segment_name), ignore_errors=True)
+
+    logger.info(
+        f"Compacted {len(old)} segments of {root} into {name}, keeping "
+        f"{len(added)} deltas added meanwhile."
+    )
+    return name
@@ -0,0 +1,306 @@
+"""
+Corpora shared between the worker processes of ``lexai serve --workers N``.
+
+Memory-mapped corpus directories (see ``lexai.core.corpus_format``) are
+already shared: every process that maps the same read-only files uses the
+same physical pages. Before the workers start, ``stage_corpora`` makes sure
+every jurisdiction can be served that way:
+
+- A corpus directory whose embeddings are unit-normalized float32, and a
+  segmented corpus, are used in place.
+- Any other corpus is converted once, with normalized embeddings, into a
+  corpus directory under the staging directory. Examples are a legacy .npz
+  file, which each worker would otherwise load into its own heap, and
+  embeddings that the exact engine would normalize into a private copy.
+  The staging directory defaults to ``/dev/shm``, which is shared memory.
+  IVF and lexical index files next to the original are linked into the
+  staged copy.
+
+Workers then map the staged files read-only, so the memory taken by
+embeddings and metadata grows with the number of corpora, not with the
+number of workers. The IVF centroids, BM25 weights and quantized matrices
+derived from them are still built by each worker.
+
+Corpora used in place are hot-reloaded by each worker's ``CorpusRegistry``
+as usual. For staged copies, a ``CorpusStager`` in the supervisor watches
+the original files and re-stages a changed corpus into the same path,
+swapping the directory atomically; the workers' registries then see a new
+manifest and reload it.
+"""
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from lexai.config import CORPUS_CHECK_INTERVAL, SHARED_CORPUS_DIR
+from lexai.core.corpus_format import (
+    is_corpus_dir,
+    open_corpus,
+    replace_corpus_dir,
+    write_corpus,
+)
+from lexai.core.corpus_registry import file_fingerprint
+from lexai.core.data_loader import load_embeddings
+from lexai.core.ivf_index import ivf_index_path
+from lexai.core.lexical_index import lexical_index_path
+from lexai.core.matcher import ExactSearchEngine, is_unit_normalized
+from lexai.core.segments import is_segmented_dir
+
+logger = logging.getLogger(__name__)
+
+_SHARED_MEMORY_DIR = "/dev/shm"
+
+
+def is_shareable(path: str) -> bool:
+    """
+    Returns True if workers can map a corpus as is, without private copies.
+
+    Parameters
+    ----------
+    path : str
+        Path to a corpus file or directory.
+
+    Returns
+    -------
+    bool
+        True for segmented corpora and for corpus directories whose
+        embeddings are already unit-normalized.
+    """
+    if is_segmented_dir(path):
+        return True
+    if not is_corpus_dir(path):
+        return False
+    embeddings, _ = open_corpus(path)
+    return is_unit_normalized(embeddings)
+
+
+def staged_path(location: str, staging_dir: str) -> str:
+    """
+    Returns where the staged copy of a jurisdiction's corpus is written.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "-", location.lower()).strip("-") or "corpus"
+    return os.path.join(staging_dir, f"{slug}.corpus")
+
+
+def _copy_corpus(location: str, path: str, staged: str) -> None:
+    """
+    Writes a normalized copy of a corpus, with its indexes linked, to
+    ``staged``, replacing any previous copy atomically.
+    """
+    embeddings, metadata = load_embeddings(path)
+    # The copy and its index links are completed next to the staged path
+    # before it is swapped in, so a worker never reloads a copy without them.
+    build_dir = tempfile.mkdtemp(prefix=".stage.", dir=os.path.dirname(staged))
+    try:
+        new_copy = os.path.join(build_dir, "corpus")
+        # Normalized as the search engines do, so that vectors which already
+        # have unit length are copied bit for bit and IVF digests still match.
+        vectors = ExactSearchEngine(embeddings).embeddings
+        write_corpus(new_copy, vectors, metadata.to_columns())
+        for index_path in (ivf_index_path, lexical_index_path):
+            source = index_path(path)
+            if os.path.exists(source):
+                os.symlink(os.path.abspath(source), index_path(new_copy))
+        replace_corpus_dir(new_copy, staged)
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    size = sum(
+        os.path.getsize(os.path.join(staged, name)) for name in os.listdir(staged)
+    )
+    logger.info(
+        f"Staged the corpus for {location} in {staged} ({size / 2**20:.1f} MiB)."
+    )
+
+
+def stage_corpus(location: str, path: str, staging_dir: str) -> str:
+    """
+    Returns a path to the corpus that every worker can map and share.
+
+    Parameters
+    ----------
+    location : str
+        The jurisdiction the corpus belongs to.
+    path : str
+        Path to the configured corpus file or directory.
+    staging_dir : str
+        Directory to write converted corpora into.
+
+    Returns
+    -------
+    str
+        ``path`` itself if it is shareable, otherwise the staged copy.
+    """
+    if is_shareable(path):
+        logger.info(f"Sharing the corpus for {location} in place: {path}")
+        return path
+
+    staged = staged_path(location, staging_dir)
+    _copy_corpus(location, path, staged)
+    return staged
+
+
+def stage_corpora(
+    location_info: dict[str, dict[str, Any]],
+    staging_dir: str,
+) -> dict[str, str]:
+    """
+    Stages every configured jurisdiction's corpus for sharing.
+
+    As with ``CorpusRegistry.load_all``, failures are logged rather than
+    raised: a corpus that cannot be staged keeps its configured path, and
+    each worker reports the problem when it loads it.
+
+    Parameters
+    ----------
+    location_info : dict[str, dict[str, Any]]
+        The configured jurisdictions, as in ``LOCATION_INFO``.
+    staging_dir : str
+        Directory to write converted corpora into.
+
+    Returns
+    -------
+    dict[str, str]
+        The corpus path each location should be served from.
+    """
+    return CorpusStager(location_info, staging_dir).stage_all()
+
+
+@contextmanager
+def staging_directory(parent: Optional[str] = None) -> Iterator[str]:
+    """
+    Creates a private staging directory and removes it on exit.
+
+    Parameters
+    ----------
+    parent : str, optional
+        Where to create it; defaults to ``SHARED_CORPUS_DIR``, then
+        ``/dev/shm`` if it exists, then the system temporary directory.
+
+    Yields
+    ------
+    str
+        The path of the staging directory.
+    """
+    parent = parent or SHARED_CORPUS_DIR
+    if parent is None and os.path.isdir(_SHARED_MEMORY_DIR):
+        parent = _SHARED_MEMORY_DIR
+    path = tempfile.mkdtemp(prefix="lexai-corpora-", dir=parent)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class CorpusStager:
+    """
+    Stages corpora for the workers and keeps the staged copies up to date.
+
+    ``stage_all`` stages every jurisdiction as ``stage_corpora`` does. The
+    original of each staged copy is then re-checked by ``refresh``, and a
+    changed original is staged again into the same path, so hot reloading
+    keeps working when the workers are served from staged copies.
+
+    Parameters
+    ----------
+    location_info : dict[str, dict[str, Any]]
+        The configured jurisdictions, as in ``LOCATION_INFO``.
+    staging_dir : str
+        Directory to write converted corpora into.
+    check_interval : float, optional
+        Seconds between checks of the originals by the watcher thread.
+    """
+
+    def __init__(
+        self,
+        location_info: dict[str, dict[str, Any]],
+        staging_dir: str,
+        check_interval: float = CORPUS_CHECK_INTERVAL,
+    ):
+        self._location_info = location_info
+        self._staging_dir = staging_dir
+        self._check_interval = check_interval
+        # Fingerprint of the original of every staged copy, by location.
+        self._fingerprints: dict[str, tuple[int, int]] = {}
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def stage_all(self) -> dict[str, str]:
+        """
+        Stages every jurisdiction and returns the path each is served from.
+
+        Returns
+        -------
+        dict[str, str]
+            The corpus path each location should be served from.
+        """
+        paths = {}
+        for location, info in self._location_info.items():
+            source = info["npz_file"]
+            paths[location] = source
+            try:
+                fingerprint = file_fingerprint(source)
+                paths[location] = stage_corpus(location, source, self._staging_dir)
+            except Exception:
+                logger.exception(f"Failed to stage the corpus for {location}.")
+                continue
+            if paths[location] != source:
+                self._fingerprints[location] = fingerprint
+        return paths
+
+    def refresh(self) -> None:
+        """
+        Re-stages every staged corpus whose original has changed.
+
+        A corpus that fails to stage keeps its previous copy and is retried
+        on the next check.
+        """
+        for location, staged_fingerprint in list(self._fingerprints.items()):
+            source = self._location_info[location]["npz_file"]
+            try:
+                fingerprint = file_fingerprint(source)
+                if fingerprint == staged_fingerprint:
+                    continue
+                _copy_corpus(
+                    location, source, staged_path(location, self._staging_dir)
+                )
+            except Exception:
+                logger.exception(f"Failed to re-stage the corpus for {location}.")
+                continue
+            self._fingerprints[location] = fingerprint
+
+    def start_watcher(self, interval: Optional[float] = None) -> None:
+        """
+        Starts a daemon thread that periodically calls ``refresh``.
+
+        Parameters
+        ----------
+        interval : float, optional
+            Seconds between checks; defaults to the stager's check interval.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        interval = self._check_interval if interval is None else interval
+        self._stop_event.clear()
+
+        def watch():
+            while not self._stop_event.wait(interval):
+                self.refresh()
+
+        self._watcher = threading.Thread(
+            target=watch, name="lexai-corpus-stager", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        """Stops the background watcher thread, if running."""
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,350 @@
+"""
+Admission control for LexAI queries.
+
+Keeps latency stable under overload by bounding the work in flight instead
+of letting requests pile up behind the OpenAI rate limits:
+
+- ``admission`` admits at most ``ADMISSION_MAX_CONCURRENT`` queries at once.
+  Each jurisdiction is further limited to ``ADMISSION_JURISDICTION_LIMIT``
+  concurrent queries, so that one busy jurisdiction cannot take every slot.
+  Up to ``ADMISSION_MAX_QUEUE`` more queries wait for each of these pools,
+  each query for at most ``ADMISSION_QUEUE_TIMEOUT`` seconds in total, and
+  queries beyond that are rejected at once. A query takes its jurisdiction
+  slots before the global one, so queries waiting for a busy jurisdiction
+  hold no global slot.
+- ``upstream(name)`` limits the OpenAI requests in flight per upstream
+  ("embeddings" or "chat"), whichever request path they come from.
+
+A query that cannot be admitted in time raises ``Overloaded``. Queue depth,
+slots in use, waiting times and rejections are exported by
+``lexai.services.metrics`` under the ``lexai_admission_`` prefix.
+
+Limiters are shared by worker threads and event loops: a waiter is either a
+``threading.Event`` or a future of the waiting task's loop, and slots are
+handed directly from the releasing caller to the oldest waiter.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional, Sequence, Union
+
+from lexai.config import (
+    ADMISSION_JURISDICTION_LIMIT,
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    CHAT_MAX_CONCURRENT,
+    EMBEDDING_MAX_CONCURRENT,
+    LOCATION_INFO,
+    UPSTREAM_QUEUE_TIMEOUT,
+)
+from lexai.services.metrics import registry
+
+IN_FLIGHT = registry.gauge(
+    "lexai_admission_in_flight",
+    "Admitted requests currently holding a slot, by pool.",
+    ("pool",),
+)
+QUEUE_DEPTH = registry.gauge(
+    "lexai_admission_queue_depth",
+    "Requests waiting for a slot, by pool.",
+    ("pool",),
+)
+WAIT_DURATION = registry.histogram(
+    "lexai_admission_wait_seconds",
+    "Time admitted requests waited for a slot, by pool.",
+    ("pool",),
+)
+REJECTIONS = registry.counter(
+    "lexai_admission_rejections_total",
+    "Requests turned away because a pool was saturated, by pool and reason.",
+    ("pool", "reason"),
+)
+
+Waiter = Union[threading.Event, asyncio.Future]
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request cannot get a slot in a limiter.
+
+    Attributes
+    ----------
+    pool : str
+        The saturated pool, e.g. ``"requests"`` or ``"upstream:chat"``.
+    reason : str
+        ``"queue_full"`` if the request was turned away without waiting, or
+        ``"timeout"`` if it waited for longer than the limiter allows.
+    """
+
+    def __init__(self, pool: str, reason: str):
+        super().__init__(f"{pool} is saturated ({reason}).")
+        self.pool = pool
+        self.reason = reason
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class Limiter:
+    """
+    A counting semaphore with a bounded, time-limited wait queue.
+
+    Parameters
+    ----------
+    pool : str
+        The name of the limiter in metrics and errors.
+    limit : int
+        Slots available at once; 0 or less admits everything (slots in use
+        are still reported).
+    max_waiting : int, optional
+        Callers allowed to wait for a slot at once; further callers are
+        rejected immediately. Unbounded if omitted.
+    timeout : float, optional
+        Default number of seconds a caller waits for a slot.
+    """
+
+    def __init__(
+        self,
+        pool: str,
+        limit: int,
+        max_waiting: Optional[int] = None,
+        timeout: float = ADMISSION_QUEUE_TIMEOUT,
+    ):
+        self.pool = pool
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: deque[Waiter] = deque()
+
+    @property
+    def in_flight(self) -> int:
+        """Slots currently held."""
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        """Callers currently waiting for a slot."""
+        return len(self._waiters)
+
+    def _update_gauges(self) -> None:
+        IN_FLIGHT.set(self._in_flight, pool=self.pool)
+        QUEUE_DEPTH.set(len(self._waiters), pool=self.pool)
+
+    def _reject(self, reason: str) -> None:
+        REJECTIONS.inc(pool=self.pool, reason=reason)
+        raise Overloaded(self.pool, reason)
+
+    def _enter(self, new_waiter) -> Optional[Waiter]:
+        """
+        Takes a free slot and returns None, or queues and returns a waiter.
+        """
+        with self._lock:
+            if self.limit <= 0 or (
+                self._in_flight < self.limit and not self._waiters
+            ):
+                self._in_flight += 1
+                self._update_gauges()
+                return None
+            if self.max_waiting is not None and len(self._waiters) >= self.max_waiting:
+                self._reject("queue_full")
+            waiter = new_waiter()
+            self._waiters.append(waiter)
+            self._update_gauges()
+            return waiter
+
+    def _withdraw(self, waiter: Waiter) -> bool:
+        """
+        Removes a waiter that gave up; False if it had already got a slot.
+        """
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                return False
+            self._update_gauges()
+            return True
+
+    def try_acquire(self) -> bool:
+        """
+        Takes a slot only if one is free now; never waits or counts a rejection.
+        """
+        with self._lock:
+            if self.limit > 0 and (
+                self._in_flight >= self.limit or self._waiters
+            ):
+                return False
+            self._in_flight += 1
+            self._update_gauges()
+            return True
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        """
+        Takes a slot, blocking the calling thread for up to ``timeout``.
+
+        Raises
+        ------
+        Overloaded
+            If the wait queue is full or no slot frees up in time.
+        """
+        start = time.perf_counter()
+        waiter = self._enter(threading.Event)
+        if waiter is not None:
+            timeout = self.timeout if timeout is None else timeout
+            if not waiter.wait(timeout) and self._withdraw(waiter):
+                self._reject("timeout")
+        WAIT_DURATION.observe(time.perf_counter() - start, pool=self.pool)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> None:
+        """
+        Asynchronous variant of ``acquire``.
+        """
+        start = time.perf_counter()
+        waiter = self._enter(asyncio.get_running_loop().create_future)
+        if waiter is not None:
+            timeout = self.timeout if timeout is None else timeout
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            except asyncio.TimeoutError:
+                if self._withdraw(waiter):
+                    self._reject("timeout")
+            except asyncio.CancelledError:
+                if not self._withdraw(waiter):
+                    self.release()
+                raise
+        WAIT_DURATION.observe(time.perf_counter() - start, pool=self.pool)
+
+    def release(self) -> None:
+        """
+        Returns a slot, handing it to the oldest waiter if there is one.
+        """
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    break
+                try:
+                    waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+                    break
+                except RuntimeError:
+                    continue  # the waiter's event loop has closed
+            else:
+                self._in_flight -= 1
+            self._update_gauges()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Holds a slot for the duration of a ``with`` block.
+        """
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Holds a slot for the duration of an ``async with`` block.
+        """
+        await self.acquire_async(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class AdmissionController:
+    """
+    Admits queries subject to a global and a per-jurisdiction limit.
+
+    Parameters
+    ----------
+    max_concurrent : int, optional
+        Queries admitted at once.
+    max_queue : int, optional
+        Queries allowed to wait for the global pool, and for each
+        jurisdiction.
+    timeout : float, optional
+        Seconds a query may wait for admission in total.
+    jurisdiction_limit : int, optional
+        Queries admitted at once per jurisdiction.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        jurisdiction_limit: int = ADMISSION_JURISDICTION_LIMIT,
+    ):
+        self.timeout = timeout
+        self.requests = Limiter("requests", max_concurrent, max_queue, timeout)
+        # One limiter per configured jurisdiction; unknown locations are
+        # rejected by the match engine and need no slot.
+        self.jurisdictions = {
+            location: Limiter(
+                f"jurisdiction:{location}", jurisdiction_limit, max_queue, timeout
+            )
+            for location in LOCATION_INFO
+        }
+
+    @asynccontextmanager
+    async def admit(self, location: Union[str, Sequence[str]]) -> AsyncIterator[None]:
+        """
+        Holds the slots a query needs for the duration of an ``async with``.
+
+        One slot per jurisdiction is taken first, in a fixed order so that
+        fan-out queries cannot deadlock one another, and the global slot
+        last. A query held up by a saturated jurisdiction therefore does not
+        keep a global slot from queries for other jurisdictions.
+
+        Parameters
+        ----------
+        location : str or list of str
+            The jurisdictions the query searches.
+
+        Raises
+        ------
+        Overloaded
+            If the query cannot be admitted within ``timeout`` seconds.
+        """
+        locations = [location] if isinstance(location, str) else list(location)
+        limiters = [
+            self.jurisdictions[name]
+            for name in sorted(set(locations))
+            if name in self.jurisdictions
+        ] + [self.requests]
+        deadline = time.monotonic() + self.timeout
+        async with AsyncExitStack() as stack:
+            for limiter in limiters:
+                remaining = max(deadline - time.monotonic(), 0.0)
+                await stack.enter_async_context(limiter.slot_async(remaining))
+            yield
+
+
+admission = AdmissionController()
+
+_upstreams = {
+    name: Limiter(f"upstream:{name}", limit, timeout=UPSTREAM_QUEUE_TIMEOUT)
+    for name, limit in (
+        ("embeddings", EMBEDDING_MAX_CONCURRENT),
+        ("chat", CHAT_MAX_CONCURRENT),
+    )
+}
+
+
+def upstream(name: str) -> Limiter:
+    """
+    Returns the limiter for an OpenAI upstream, "embeddings" or "chat".
+    """
+    return _upstreams[name]
@@ -0,0 +1,118 @@
+"""
+Micro-batching coalescer for embedding requests.
+
+Queries that arrive within a short window (or until a maximum batch size is
+reached) are sent to the embeddings endpoint as a single batched request, and
+each vector is handed back to the caller that asked for it. Callers can wait
+synchronously from any thread or ``await`` from an event loop.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCoalescer:
+    """
+    Collects embedding requests from concurrent callers into batched calls.
+
+    A daemon thread waits for the first pending request, then keeps
+    collecting until ``window`` seconds have passed or ``max_batch_size``
+    requests are pending. The batch is handed to a small thread pool, so the
+    next batch can be collected while the previous request is in flight.
+    Identical texts within a batch are embedded once.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], np.ndarray],
+        window: float,
+        max_batch_size: int,
+        max_in_flight: int = 4,
+    ):
+        self._embed_batch = embed_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: queue.Queue[tuple[str, Future]] = queue.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="lexai-embed"
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queues ``text`` for embedding in the next batch.
+
+        Parameters
+        ----------
+        text : str
+            The input text to embed.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Resolves to the text's embedding vector.
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._pending.put((text, future))
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embeds ``text`` as part of a batch, blocking the calling thread.
+        """
+        return self.submit(text).result()
+
+    async def embed_async(self, text: str) -> np.ndarray:
+        """
+        Embeds ``text`` as part of a batch without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._collect, name="lexai-embed-coalescer", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: list[tuple[str, Future]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = self._embed_batch(texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            future.set_result(by_text[text])
+        logger.debug(f"Embedded {len(texts)} texts for {len(batch)} requests.")
@@ -0,0 +1,370 @@
+"""
+Query-embedding cache for LexAI.
+
+Embeddings are cached under the embedding model name plus the normalized
+query text in two tiers:
+
+- an in-process LRU with a bounded number of entries, and
+- an optional SQLite store on disk that every worker process can share.
+
+Both tiers support a time-to-live and keep hit/miss counters. The disk tier
+is best effort: a SQLite error (a locked database, a full or read-only disk)
+is logged and treated as a miss or a skipped write, never as a failed query.
+``get_async`` and ``put_async`` run the disk tier in a worker thread, so a
+slow disk does not stall the event loop.
+"""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+
+from lexai.config import (
+    EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDING_CACHE_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalizes query text for use as a cache key.
+
+    Leading/trailing whitespace is removed, internal runs of whitespace are
+    collapsed to a single space and the text is case-folded.
+
+    Parameters
+    ----------
+    text : str
+        The raw query text.
+
+    Returns
+    -------
+    str
+        The normalized text.
+    """
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(model: str, text: str) -> str:
+    """
+    Returns the cache key for an embedding of ``text`` produced by ``model``.
+
+    Parameters
+    ----------
+    model : str
+        The embedding model name.
+    text : str
+        The raw query text.
+
+    Returns
+    -------
+    str
+        A hex SHA-256 digest of the model name and normalized text.
+    """
+    payload = f"{model}\x00{normalize_query(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class CacheStats:
+    """
+    Hit and miss counters for a cache tier.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups that were hits, or 0.0 with no lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class LRUEmbeddingCache:
+    """
+    Thread-safe in-process LRU cache of embeddings with an optional TTL.
+    """
+
+    def __init__(self, max_size: int = EMBEDDING_CACHE_SIZE, ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Returns the cached embedding for ``key``, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def put(self, key: str, embedding: np.ndarray) -> None:
+        """
+        Stores an embedding, evicting the least recently used entries if full.
+        """
+        if self.max_size <= 0:
+            return
+
+        embedding = np.asarray(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        with self._lock:
+            self._entries[key] = (time.time(), embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """Removes every entry and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.stats = CacheStats()
+
+
+class SQLiteEmbeddingStore:
+    """
+    Persistent embedding cache backed by a SQLite database.
+
+    The database uses write-ahead logging so several worker processes can read
+    and write it concurrently. Each thread uses its own connection.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 0,
+        max_entries: int = EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._local = threading.local()
+        self._writes = 0
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_created ON embeddings (created)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Returns the stored embedding for ``key``, or None on a miss.
+
+        A database error is logged and counted as a miss.
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT vector, created FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            row = None
+
+        if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put(self, key: str, embedding: np.ndarray) -> None:
+        """
+        Stores an embedding, periodically purging expired and excess entries.
+
+        A database error is logged and the write is skipped.
+        """
+        vector = np.asarray(embedding, dtype=np.float32).tobytes()
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created) "
+                    "VALUES (?, ?, ?)",
+                    (key, vector, time.time()),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+            return
+
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        Deletes expired entries and the oldest entries beyond ``max_entries``.
+
+        A database error is logged and the eviction is left to the next run.
+        """
+        try:
+            with self._connection() as conn:
+                if self.ttl:
+                    cursor = conn.execute(
+                        "DELETE FROM embeddings WHERE created < ?",
+                        (time.time() - self.ttl,),
+                    )
+                    self.stats.evictions += cursor.rowcount
+                if self.max_entries > 0:
+                    cursor = conn.execute(
+                        "DELETE FROM embeddings WHERE key IN ("
+                        "SELECT key FROM embeddings ORDER BY created DESC "
+                        "LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    )
+                    self.stats.evictions += cursor.rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache eviction failed: {e}")
+
+    def clear(self) -> None:
+        """Removes every entry and resets the statistics."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM embeddings")
+        self.stats = CacheStats()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: an in-process LRU in front of an optional
+    persistent store. Disk hits are promoted into the LRU.
+    """
+
+    def __init__(
+        self,
+        memory: LRUEmbeddingCache,
+        disk: Optional[SQLiteEmbeddingStore] = None,
+    ):
+        self.memory = memory
+        self.disk = disk
+
+    @classmethod
+    def from_config(cls) -> "EmbeddingCache":
+        """
+        Builds a cache from the ``EMBEDDING_CACHE_*`` settings.
+        """
+        memory = LRUEmbeddingCache(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL)
+        disk = None
+        if EMBEDDING_CACHE_PATH:
+            disk = SQLiteEmbeddingStore(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_TTL)
+        return cls(memory, disk)
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """
+        Looks up the embedding of ``text`` produced by ``model``.
+
+        Parameters
+        ----------
+        model : str
+            The embedding model name.
+        text : str
+            The raw query text.
+
+        Returns
+        -------
+        np.ndarray or None
+            The cached embedding, or None if neither tier has it.
+        """
+        key = cache_key(model, text)
+        embedding = self.memory.get(key)
+        if embedding is None and self.disk is not None:
+            embedding = self.disk.get(key)
+            if embedding is not None:
+                self.memory.put(key, embedding)
+        return embedding
+
+    async def get_async(self, model: str, text: str) -> Optional[np.ndarray]:
+        """
+        Asynchronous variant of ``get``; the disk tier is read in a thread.
+        """
+        key = cache_key(model, text)
+        embedding = self.memory.get(key)
+        if embedding is None and self.disk is not None:
+            embedding = await asyncio.to_thread(self.disk.get, key)
+            if embedding is not None:
+                self.memory.put(key, embedding)
+        return embedding
+
+    def put(self, model: str, text: str, embedding: np.ndarray) -> None:
+        """
+        Stores the embedding of ``text`` produced by ``model`` in every tier.
+        """
+        key = cache_key(model, text)
+        self.memory.put(key, embedding)
+        if self.disk is not None:
+            self.disk.put(key, embedding)
+
+    async def put_async(self, model: str, text: str, embedding: np.ndarray) -> None:
+        """
+        Asynchronous variant of ``put``; the disk tier is written in a thread.
+        """
+        key = cache_key(model, text)
+        self.memory.put(key, embedding)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put, key, embedding)
+
+    def clear(self) -> None:
+        """Empties every tier and resets the statistics."""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns hit-rate statistics for each tier.
+
+        Returns
+        -------
+        dict[str, dict[str, Any]]
+            Counters keyed by tier name ("memory" and, if enabled, "disk").
+        """
+        stats = {"memory": self.memory.stats.as_dict()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats.as_dict()
+        return stats
@@ -2,10 +2,32 @@
 LexAI service layer for handling user queries.
 
 This module defines a service class that interfaces with the core match engine,
-processes the results, and formats them for display in the UI.
+processes the results, and formats them for display in the UI. The
+asynchronous handlers used by the web interface go through admission control
+first. Every handler answers with ``OVERLOADED_MESSAGE`` when a query is
+turned away, whether by admission control or for lack of an embeddings slot.
 """
 
-from lexai.core.match_engine import generate_matches
+from collections.abc import Mapping
+from contextlib import AsyncExitStack
+from typing import AsyncIterator
+
+from lexai.config import OVERLOADED_MESSAGE
+from lexai.core.match_engine import (
+    Locations,
+    generate_matches,
+    generate_matches_async,
+    generate_matches_batch,
+    stream_matches_async,
+)
+from lexai.services.admission import Overloaded, admission
+from lexai.services.metrics import (
+    bind_trace,
+    record_error,
+    request_trace,
+    span,
+    traced_stream,
+)
 from lexai.ui.formatters import format_legal_response, format_references
 
 
@@ -16,7 +38,7 @@ class LexAIService:
     """
 
     @staticmethod
-    def handle_query(query: str, location: str) -> str:
+    def handle_query(query: str, location: Locations) -> str:
         """
         Handles a user query and returns an HTML-formatted response.
 
@@ -30,23 +52,165 @@ class LexAIService:
         ----------
         query : str
             The legal question asked by the user.
-        location : str
-            The jurisdiction to search within.
+        location : str or list of str
+            The jurisdiction to search within, or several jurisdictions to
+            search together.
 
         Returns
         -------
         str
             A formatted HTML string with the AI response and relevant matches.
         """
-        result = generate_matches(query, location)
+        with request_trace("handle_query", location=location):
+            try:
+                result = generate_matches(query, location)
+            except Overloaded as e:
+                record_error(e)
+                return LexAIService.overloaded_response()
+            with span("format"):
+                return LexAIService.format_result(result)
+
+    @staticmethod
+    async def handle_query_async(query: str, location: Locations) -> str:
+        """
+        Asynchronous variant of ``handle_query``, subject to admission
+        control.
+
+        Parameters
+        ----------
+        query : str
+            The legal question asked by the user.
+        location : str or list of str
+            The jurisdiction to search within, or several jurisdictions to
+            search together.
+
+        Returns
+        -------
+        str
+            A formatted HTML string with the AI response and relevant matches.
+        """
+        with request_trace("handle_query", location=location):
+            try:
+                async with AsyncExitStack() as stack:
+                    with span("admission"):
+                        await stack.enter_async_context(admission.admit(location))
+                    result = await generate_matches_async(query, location)
+            except Overloaded as e:
+                record_error(e)
+                return LexAIService.overloaded_response()
+            with span("format"):
+                return LexAIService.format_result(result)
+
+    @staticmethod
+    async def stream_query_async(
+        query: str,
+        location: Locations,
+    ) -> AsyncIterator[str]:
+        """
+        Streams progressively more complete HTML for a user query.
+
+        The reference list is rendered as soon as retrieval finishes, before
+        the model produces its first token; each subsequent yield adds the
+        latest fragment of the response. The query holds its admission slots
+        until the stream ends, and is traced with the same stages as
+        ``handle_query_async``.
+
+        Parameters
+        ----------
+        query : str
+            The legal question asked by the user.
+        location : str or list of str
+            The jurisdiction to search within, or several jurisdictions to
+            search together.
+
+        Yields
+        ------
+        str
+            The full HTML to display at this point of the response.
+        """
+        references = ""
+        response_text = ""
+        with request_trace(
+            "stream_query", bind=False, location=location
+        ) as trace:
+            try:
+                async with AsyncExitStack() as stack:
+                    with bind_trace(trace), span("admission"):
+                        await stack.enter_async_context(admission.admit(location))
+                    events = traced_stream(stream_matches_async(query, location), trace)
+                    async for event in events:
+                        if "error_html" in event:
+                            with span("format", trace):
+                                html = LexAIService.format_result(event)
+                            yield html
+                            return
+                        with span("format", trace):
+                            if "matches" in event:
+                                references = format_references(event["matches"])
+                            response_text += event.get("delta", "")
+                            html = format_legal_response(response_text.strip())
+                        yield html + references
+            except Overloaded as e:
+                # Raised before the first event, by admission or the embeddings.
+                record_error(e, trace)
+                yield LexAIService.overloaded_response()
 
+    @staticmethod
+    def handle_query_batch(queries: list[str], location: Locations) -> list[str]:
+        """
+        Handles many queries for one location and returns one HTML string each.
+
+        Retrieval for the whole batch is performed with a single embeddings
+        request and a single matrix-matrix product (see
+        ``generate_matches_batch``).
+
+        Parameters
+        ----------
+        queries : list[str]
+            The legal questions asked by users.
+        location : str or list of str
+            The jurisdiction to search within, or several jurisdictions to
+            search together.
+
+        Returns
+        -------
+        list[str]
+            Formatted HTML strings, in the same order as ``queries``.
+        """
+        return [
+            LexAIService.format_result(result)
+            for result in generate_matches_batch(queries, location)
+        ]
+
+    @staticmethod
+    def overloaded_response() -> str:
+        """
+        Returns the HTML shown when a query is turned away for overload.
+        """
+        return format_legal_response(OVERLOADED_MESSAGE)
+
+    @staticmethod
+    def format_result(result: dict) -> str:
+        """
+        Formats a match engine result as HTML for display.
+
+        Parameters
+        ----------
+        result : dict
+            A result dictionary returned by the match engine.
+
+        Returns
+        -------
+        str
+            A formatted HTML string with the AI response and relevant matches.
+        """
         gpt_response = result.get("response", "").strip()
         matches = result.get("matches", [])
 
         if (
             not isinstance(matches, list)
             or not matches
-            or not isinstance(matches[0], dict)
+            or not isinstance(matches[0], Mapping)
         ):
             return format_legal_response(gpt_response or "No matches found.")
 
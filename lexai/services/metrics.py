@@ -0,0 +1,624 @@
+"""
+Request metrics for LexAI.
+
+Provides counters, gauges and histograms rendered in the Prometheus text exposition
+format, plus two context managers for instrumenting the request path:
+
+- ``request_trace`` wraps one user request. It records the request's
+  duration and outcome and, when ``JSON_LOGS`` is enabled, logs one JSON line
+  with the duration of every stage the request went through.
+- ``span`` times one stage of a request (embedding, search, completion, ...)
+  into ``lexai_stage_duration_seconds`` and the current trace, if any.
+
+The trace is held in a context variable, so it follows the request across
+``await`` points and into ``asyncio.to_thread`` workers. The steps of an
+async generator may each run in a different context, so streaming responses
+bind their trace around every step with ``traced_stream`` instead.
+
+Metrics are kept per process. Under ``lexai serve --workers N`` the registry
+is given a directory shared by the workers (``METRICS_DIR``): each worker
+writes a snapshot of its metrics there every ``METRICS_FLUSH_INTERVAL``
+seconds, and whichever worker answers a scrape of ``/metrics`` adds up every
+snapshot, so the endpoint reports the whole server. Counters and histograms
+of workers that have exited are kept; their gauges are dropped.
+"""
+
+import asyncio
+import atexit
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence, TypeVar, Union
+
+from lexai.config import JSON_LOGS, METRICS_DIR, METRICS_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], **extra) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count, optionally split by labels.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Adds ``amount`` to the count for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """Returns the current count for the given label values."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def snapshot(self) -> dict[tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self, values: Optional[dict] = None) -> list[str]:
+        values = self.snapshot() if values is None else values
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in sorted(values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down, such as a queue depth.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        """Sets the value for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Adds ``amount`` (which may be negative) to the value."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """Returns the current value for the given label values."""
+        return self._values.get(self._key(labels), 0.0)
+
+    snapshot = Counter.snapshot
+    render = Counter.render
+
+
+class Histogram(_Metric):
+    """
+    A distribution of observed values in cumulative buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Records one observation for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            # One count per bucket, followed by the sum of observations.
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        """Returns the number of observations for the given label values."""
+        series = self._series.get(self._key(labels))
+        return int(series[-2]) if series else 0
+
+    def snapshot(self) -> dict[tuple[str, ...], list[float]]:
+        with self._lock:
+            return {key: list(series) for key, series in self._series.items()}
+
+    def render(self, values: Optional[dict] = None) -> list[str]:
+        values = self.snapshot() if values is None else values
+        lines = self.header()
+        for key, series in sorted(values.items()):
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(self.labelnames, key, le=_format_value(bound))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(count)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-2])}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    A named collection of metrics rendered together.
+
+    Parameters
+    ----------
+    shared_dir : str, optional
+        A directory shared with the registries of other worker processes.
+        When given, ``render`` reports the sum over every process that has
+        written a snapshot there (see ``write_snapshot``).
+    """
+
+    def __init__(self, shared_dir: Optional[str] = None):
+        self.shared_dir = shared_dir
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        """Returns the counter called ``name``, creating it if needed."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        """Returns the gauge called ``name``, creating it if needed."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames=(),
+        buckets=DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Returns the histogram called ``name``, creating it if needed."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.shared_dir, f"{pid}.json")
+
+    def write_snapshot(self) -> None:
+        """
+        Writes this process's metrics to ``shared_dir`` for the other workers.
+
+        The file is replaced atomically, so readers never see a partial one.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {
+            metric.name: [[list(key), v] for key, v in metric.snapshot().items()]
+            for metric in metrics
+        }
+        path = self._snapshot_path(os.getpid())
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _read_snapshots(self) -> Iterator[tuple[bool, dict[str, list]]]:
+        """
+        Yields whether each other worker is alive, and its last snapshot.
+        """
+        for name in os.listdir(self.shared_dir):
+            pid, ext = os.path.splitext(name)
+            if ext != ".json" or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                with open(os.path.join(self.shared_dir, name), encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {name}: {e}")
+                continue
+            yield _is_alive(int(pid)), snapshot
+
+    def _merged(self, metrics: list[_Metric]) -> dict[str, dict]:
+        merged = {metric.name: metric.snapshot() for metric in metrics}
+        for alive, snapshot in self._read_snapshots():
+            for metric in metrics:
+                if metric.kind == "gauge" and not alive:
+                    continue
+                values = merged[metric.name]
+                for key, value in snapshot.get(metric.name, []):
+                    key = tuple(key)
+                    if metric.kind == "histogram":
+                        series = values.setdefault(key, [0.0] * len(value))
+                        values[key] = [a + b for a, b in zip(series, value)]
+                    else:
+                        values[key] = values.get(key, 0.0) + value
+        return merged
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        With a ``shared_dir``, the values are summed over every worker.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        merged = self._merged(metrics) if self.shared_dir else {}
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(merged.get(metric.name)))
+        return "\n".join(lines) + "\n"
+
+    def start_flusher(self, interval: float = METRICS_FLUSH_INTERVAL) -> None:
+        """
+        Starts a daemon thread that calls ``write_snapshot`` periodically.
+
+        Does nothing without a ``shared_dir``. A last snapshot is written when
+        the process exits.
+        """
+        if self.shared_dir is None or self._flusher is not None:
+            return
+
+        def flush():
+            while True:
+                try:
+                    self.write_snapshot()
+                except OSError as e:
+                    logger.warning(f"Failed to write a metrics snapshot: {e}")
+                time.sleep(interval)
+
+        self._flusher = threading.Thread(
+            target=flush, name="lexai-metrics-flusher", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.write_snapshot)
+
+
+def _is_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # Signal 0 is CTRL_C_EVENT on Windows, not a liveness probe.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+registry = MetricsRegistry(shared_dir=METRICS_DIR)
+
+REQUEST_DURATION = registry.histogram(
+    "lexai_request_duration_seconds",
+    "End-to-end duration of a LexAI request.",
+    ("operation", "outcome"),
+)
+STAGE_DURATION = registry.histogram(
+    "lexai_stage_duration_seconds",
+    "Duration of each stage of a LexAI request.",
+    ("stage",),
+)
+CACHE_EVENTS = registry.counter(
+    "lexai_cache_events_total",
+    "Embedding and answer cache lookups by result.",
+    ("cache", "result"),
+)
+TOKENS = registry.counter(
+    "lexai_openai_tokens_total",
+    "Tokens reported by the OpenAI API in completion responses.",
+    ("kind",),
+)
+RETRIEVALS = registry.counter(
+    "lexai_retrievals_total",
+    "Searches by retrieval mode: vector, hybrid or lexical only.",
+    ("mode",),
+)
+DEGRADED = registry.counter(
+    "lexai_degraded_responses_total",
+    "Queries answered with references only, by the saturated pool.",
+    ("pool",),
+)
+ERRORS = registry.counter(
+    "lexai_errors_total",
+    "Errors raised while answering queries, by exception class.",
+    ("error",),
+)
+
+_current_trace: contextvars.ContextVar[Optional[dict[str, Any]]] = (
+    contextvars.ContextVar("lexai_trace", default=None)
+)
+
+
+@contextmanager
+def request_trace(
+    operation: str,
+    bind: bool = True,
+    **fields,
+) -> Iterator[dict[str, Any]]:
+    """
+    Traces one request, recording its duration, outcome and stage timings.
+
+    The yielded dictionary is logged as JSON when ``JSON_LOGS`` is enabled;
+    callers may add fields to it, and set ``"outcome"`` to something other
+    than ``"ok"`` (e.g. ``"error"``) for requests that fail without raising.
+    A trace opened while another one is active joins the outer trace.
+
+    Parameters
+    ----------
+    operation : str
+        The name of the traced operation, e.g. ``"generate_matches"``.
+    bind : bool, optional
+        Whether to make this the current trace for ``span`` calls. Async
+        generators should pass False, because their steps may run in
+        different contexts, and bind the trace around each step with
+        ``traced_stream``.
+    **fields
+        Extra fields for the JSON log line (e.g. the location).
+    """
+    outer = _current_trace.get()
+    if outer is not None:
+        yield outer
+        return
+
+    trace = {
+        "event": "request",
+        "operation": operation,
+        "request_id": uuid.uuid4().hex,
+        "outcome": "ok",
+        "stages_ms": {},
+        **fields,
+    }
+    token = _current_trace.set(trace) if bind else None
+    start = time.perf_counter()
+    try:
+        yield trace
+    except (GeneratorExit, asyncio.CancelledError):
+        trace["outcome"] = "cancelled"
+        raise
+    except BaseException:
+        trace["outcome"] = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if token is not None:
+            _current_trace.reset(token)
+        REQUEST_DURATION.observe(elapsed, operation=operation, outcome=trace["outcome"])
+        trace["duration_ms"] = round(elapsed * 1000, 3)
+        if JSON_LOGS:
+            logger.info(json.dumps(trace, default=str))
+
+
+@contextmanager
+def bind_trace(trace: dict[str, Any]) -> Iterator[None]:
+    """
+    Makes ``trace`` the current trace for the duration of a ``with`` block.
+
+    The previous trace is restored by value rather than with a context
+    variable token, so the block may be entered and left in each step of an
+    async generator, whichever context that step runs in.
+    """
+    previous = _current_trace.get()
+    _current_trace.set(trace)
+    try:
+        yield
+    finally:
+        _current_trace.set(previous)
+
+
+async def traced_stream(
+    stream: AsyncIterator[T],
+    trace: dict[str, Any],
+) -> AsyncIterator[T]:
+    """
+    Iterates over an async generator with ``trace`` bound during every step.
+
+    Spans, token usage and errors recorded while the generator computes its
+    next item, including in ``asyncio.to_thread`` workers, reach ``trace``,
+    while the consumer's context is left untouched between items.
+
+    Parameters
+    ----------
+    stream : AsyncIterator
+        The async generator to iterate over.
+    trace : dict
+        The trace to bind, e.g. the one yielded by ``request_trace``.
+    """
+    try:
+        while True:
+            with bind_trace(trace):
+                try:
+                    item = await stream.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield item
+    finally:
+        with bind_trace(trace):
+            await stream.aclose()
+
+
+@contextmanager
+def span(stage: str, trace: Optional[dict[str, Any]] = None) -> Iterator[None]:
+    """
+    Times one stage of the current request.
+
+    Parameters
+    ----------
+    stage : str
+        The stage name, e.g. ``"embedding"`` or ``"search"``.
+    trace : dict, optional
+        The trace to record into; defaults to the current trace.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start, trace)
+
+
+def record_stage(
+    stage: str,
+    seconds: float,
+    trace: Optional[dict[str, Any]] = None,
+) -> None:
+    """
+    Records time spent in one stage of the current request.
+
+    ``span`` times a block with it; a stage interrupted by ``yield``, such as
+    a streamed completion, adds up its own time and records it once.
+
+    Parameters
+    ----------
+    stage : str
+        The stage name, e.g. ``"completion"``.
+    seconds : float
+        The time spent in the stage.
+    trace : dict, optional
+        The trace to record into; defaults to the current trace.
+    """
+    STAGE_DURATION.observe(seconds, stage=stage)
+    trace = trace if trace is not None else _current_trace.get()
+    if trace is not None:
+        stages = trace["stages_ms"]
+        stages[stage] = round(stages.get(stage, 0.0) + seconds * 1000, 3)
+
+
+def record_cache_lookup(
+    cache: str,
+    hit: bool,
+    trace: Optional[dict[str, Any]] = None,
+) -> None:
+    """
+    Counts one cache lookup and notes the result in the current trace.
+    """
+    CACHE_EVENTS.inc(cache=cache, result="hit" if hit else "miss")
+    trace = trace if trace is not None else _current_trace.get()
+    if trace is not None:
+        trace[f"{cache}_cache"] = "hit" if hit else "miss"
+
+
+def record_retrieval(mode: str, trace: Optional[dict[str, Any]] = None) -> None:
+    """
+    Counts one search by retrieval mode and notes it in the current trace.
+    """
+    RETRIEVALS.inc(mode=mode)
+    trace = trace if trace is not None else _current_trace.get()
+    if trace is not None:
+        trace["retrieval"] = mode
+
+
+def _token_count(usage: Any, field: str) -> int:
+    value = getattr(usage, field, None)
+    return value if isinstance(value, int) else 0
+
+
+def record_usage(usage: Any) -> None:
+    """
+    Counts the token usage reported by a completion response, if any.
+    """
+    if usage is None:
+        return
+    prompt = _token_count(usage, "prompt_tokens")
+    completion = _token_count(usage, "completion_tokens")
+    TOKENS.inc(prompt, kind="prompt")
+    TOKENS.inc(completion, kind="completion")
+    trace = _current_trace.get()
+    if trace is not None:
+        trace["prompt_tokens"] = trace.get("prompt_tokens", 0) + prompt
+        trace["completion_tokens"] = trace.get("completion_tokens", 0) + completion
+
+
+def record_error(
+    error: Union[BaseException, str],
+    trace: Optional[dict[str, Any]] = None,
+) -> None:
+    """
+    Counts an error by class and marks the current trace as failed.
+
+    Parameters
+    ----------
+    error : BaseException or str
+        The exception, or an error class name for failures without one.
+    trace : dict, optional
+        The trace to mark; defaults to the current trace.
+    """
+    name = error if isinstance(error, str) else type(error).__name__
+    ERRORS.inc(error=name)
+    trace = trace if trace is not None else _current_trace.get()
+    if trace is not None:
+        trace["outcome"] = "error"
+        trace["error"] = name
+
+
+def record_degraded(pool: str, trace: Optional[dict[str, Any]] = None) -> None:
+    """
+    Counts a degraded response and marks the current trace as degraded.
+
+    Parameters
+    ----------
+    pool : str
+        The saturated pool that caused the degradation, e.g. "upstream:chat".
+    trace : dict, optional
+        The trace to mark; defaults to the current trace.
+    """
+    DEGRADED.inc(pool=pool)
+    trace = trace if trace is not None else _current_trace.get()
+    if trace is not None:
+        trace["outcome"] = "degraded"
+        trace["degraded"] = pool
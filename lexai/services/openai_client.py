@@ -2,17 +2,36 @@
 OpenAI client interface for LexAI.
 
 This module provides helper functions to interact with the OpenAI API,
-including embedding generation and GPT-4 chat completions.
+including embedding generation and GPT-4 chat completions. Query embeddings
+are served from ``embedding_cache`` when possible, and cache misses from
+concurrent callers are coalesced into batched embeddings requests when
+``EMBEDDING_COALESCE_WINDOW_MS`` is positive. Every call has an ``_async``
+counterpart backed by ``AsyncOpenAI`` for the asyncio request path.
+
+Requests go through ``lexai.services.transport``, which pools connections
+and applies per-call deadlines, retries and (for embeddings, when
+``EMBEDDING_HEDGE`` is set) hedging; the SDK's own retries are disabled.
+Each request first takes a slot from its upstream's limiter in
+``lexai.services.admission`` and raises ``Overloaded`` if none frees up in
+time.
+
+The clients are built on first use by ``get_client`` and
+``get_async_client`` (or ahead of time by ``warm_up``), so importing this
+module does not import the OpenAI SDK. Tests may replace ``client`` and
+``async_client`` directly.
 """
 
 import os
+import threading
+from typing import TYPE_CHECKING, AsyncIterator, Optional, Union
 
 import numpy as np
-from openai import OpenAI
-from openai.types.chat import ChatCompletion
-from openai.types.embedding import Embedding
 
 from lexai.config import (
+    EMBEDDING_COALESCE_MAX_BATCH_SIZE,
+    EMBEDDING_COALESCE_WINDOW_MS,
+    EMBEDDING_HEDGE,
+    EMBEDDING_MAX_BATCH_SIZE,
     EMBEDDING_MODEL,
     GPT4_FREQUENCY_PENALTY,
     GPT4_MAX_TOKENS,
@@ -20,10 +39,141 @@ from lexai.config import (
     GPT4_PRESENCE_PENALTY,
     GPT4_TEMPERATURE,
     GPT4_TOP_P,
+    OPENAI_BASE_URL,
 )
+from lexai.services.admission import upstream
+from lexai.services.embedding_batcher import EmbeddingCoalescer
+from lexai.services.embedding_cache import EmbeddingCache
+from lexai.services.metrics import record_cache_lookup, record_usage
+from lexai.services.transport import (
+    CHAT_DEADLINES,
+    EMBEDDING_DEADLINES,
+    LatencyTracker,
+    create_async_http_client,
+    create_http_client,
+    request,
+    request_async,
+)
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+    from openai.types.chat import ChatCompletion
+    from openai.types.embedding import Embedding
 
 API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=API_KEY)
+client: Optional["OpenAI"] = None
+async_client: Optional["AsyncOpenAI"] = None
+_client_lock = threading.Lock()
+embedding_cache = EmbeddingCache.from_config()
+embedding_latency = LatencyTracker()
+
+_coalescer: Optional[EmbeddingCoalescer] = None
+_coalescer_lock = threading.Lock()
+
+
+def get_client() -> "OpenAI":
+    """
+    Returns the shared synchronous OpenAI client, building it on first use.
+    """
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from openai import OpenAI
+
+                client = OpenAI(
+                    api_key=API_KEY,
+                    base_url=OPENAI_BASE_URL,
+                    http_client=create_http_client(),
+                    max_retries=0,
+                )
+    return client
+
+
+def get_async_client() -> "AsyncOpenAI":
+    """
+    Returns the shared asynchronous OpenAI client, building it on first use.
+    """
+    global async_client
+    if async_client is None:
+        with _client_lock:
+            if async_client is None:
+                from openai import AsyncOpenAI
+
+                async_client = AsyncOpenAI(
+                    api_key=API_KEY,
+                    base_url=OPENAI_BASE_URL,
+                    http_client=create_async_http_client(),
+                    max_retries=0,
+                )
+    return async_client
+
+
+def warm_up() -> None:
+    """
+    Builds both OpenAI clients ahead of the first request.
+    """
+    get_client()
+    get_async_client()
+
+
+def create_embeddings(texts: list[str]) -> np.ndarray:
+    """
+    Embeds a list of texts with a single embeddings request, bypassing caches.
+    """
+    response = _create_embeddings(texts)
+    ordered = sorted(response.data, key=lambda item: item.index)
+    return np.array([item.embedding for item in ordered])
+
+
+def _embedding_hedge() -> Optional[LatencyTracker]:
+    return embedding_latency if EMBEDDING_HEDGE else None
+
+
+def _create_embeddings(texts: Union[str, list[str]]):
+    slots = upstream("embeddings")
+    with slots.slot():
+        return request(
+            lambda timeout: get_client().embeddings.create(
+                input=texts, model=EMBEDDING_MODEL, timeout=timeout
+            ),
+            EMBEDDING_DEADLINES,
+            "embeddings",
+            hedge=_embedding_hedge(),
+            hedge_slots=slots,
+        )
+
+
+async def _create_embeddings_async(texts: Union[str, list[str]]):
+    slots = upstream("embeddings")
+    async with slots.slot_async():
+        return await request_async(
+            lambda timeout: get_async_client().embeddings.create(
+                input=texts, model=EMBEDDING_MODEL, timeout=timeout
+            ),
+            EMBEDDING_DEADLINES,
+            "embeddings",
+            hedge=_embedding_hedge(),
+            hedge_slots=slots,
+        )
+
+
+def get_coalescer() -> Optional[EmbeddingCoalescer]:
+    """
+    Returns the shared embedding coalescer, or None if coalescing is disabled.
+    """
+    global _coalescer
+    if EMBEDDING_COALESCE_WINDOW_MS <= 0:
+        return None
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = EmbeddingCoalescer(
+                    create_embeddings,
+                    window=EMBEDDING_COALESCE_WINDOW_MS / 1000,
+                    max_batch_size=EMBEDDING_COALESCE_MAX_BATCH_SIZE,
+                )
+    return _coalescer
 
 
 def get_embedding(text: str) -> np.ndarray:
@@ -40,11 +190,102 @@ def get_embedding(text: str) -> np.ndarray:
     np.ndarray
         The embedding vector as a NumPy array.
     """
-    response: Embedding = client.embeddings.create(
-        input=text,
-        model=EMBEDDING_MODEL
-    )
-    return np.array(response.data[0].embedding)
+    cached = embedding_cache.get(EMBEDDING_MODEL, text)
+    record_cache_lookup("embedding", cached is not None)
+    if cached is not None:
+        return cached
+
+    coalescer = get_coalescer()
+    if coalescer is not None:
+        embedding = coalescer.embed(text)
+    else:
+        response: "Embedding" = _create_embeddings(text)
+        embedding = np.array(response.data[0].embedding)
+    embedding_cache.put(EMBEDDING_MODEL, text, embedding)
+    return embedding
+
+
+async def get_embedding_async(text: str) -> np.ndarray:
+    """
+    Asynchronous variant of ``get_embedding``. The disk tier of the
+    embedding cache is read and written in a worker thread.
+
+    Parameters
+    ----------
+    text : str
+        The input text to embed.
+
+    Returns
+    -------
+    np.ndarray
+        The embedding vector as a NumPy array.
+    """
+    cached = await embedding_cache.get_async(EMBEDDING_MODEL, text)
+    record_cache_lookup("embedding", cached is not None)
+    if cached is not None:
+        return cached
+
+    coalescer = get_coalescer()
+    if coalescer is not None:
+        embedding = await coalescer.embed_async(text)
+    else:
+        response: "Embedding" = await _create_embeddings_async(text)
+        embedding = np.array(response.data[0].embedding)
+    await embedding_cache.put_async(EMBEDDING_MODEL, text, embedding)
+    return embedding
+
+
+def get_embeddings(texts: list[str]) -> np.ndarray:
+    """
+    Generates embeddings for many texts using as few API calls as possible.
+
+    Cached embeddings are reused; the remaining inputs are sent in chunks of
+    up to ``EMBEDDING_MAX_BATCH_SIZE`` texts per embeddings request.
+
+    Parameters
+    ----------
+    texts : list[str]
+        The input texts to embed.
+
+    Returns
+    -------
+    np.ndarray
+        A (len(texts), dim) matrix with one embedding per input, in order.
+    """
+    vectors = [embedding_cache.get(EMBEDDING_MODEL, text) for text in texts]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    for vector in vectors:
+        record_cache_lookup("embedding", vector is not None)
+
+    for start in range(0, len(missing), EMBEDDING_MAX_BATCH_SIZE):
+        positions = missing[start:start + EMBEDDING_MAX_BATCH_SIZE]
+        embeddings = create_embeddings([texts[i] for i in positions])
+        for position, embedding in zip(positions, embeddings):
+            vectors[position] = embedding
+            embedding_cache.put(EMBEDDING_MODEL, texts[position], vectors[position])
+
+    return np.array(vectors)
+
+
+def _chat_request(
+    role_description: str,
+    context_summary: str,
+    query: str,
+) -> dict:
+    return {
+        "model": GPT4_MODEL,
+        "messages": [
+            {"role": "system", "content": role_description.strip()},
+            {"role": "system", "content": context_summary.strip()},
+            {"role": "user", "content": query.strip()},
+            {"role": "assistant", "content": ""},
+        ],
+        "temperature": GPT4_TEMPERATURE,
+        "max_tokens": GPT4_MAX_TOKENS,
+        "top_p": GPT4_TOP_P,
+        "frequency_penalty": GPT4_FREQUENCY_PENALTY,
+        "presence_penalty": GPT4_PRESENCE_PENALTY,
+    }
 
 
 def get_chat_completion(
@@ -69,18 +310,93 @@ def get_chat_completion(
     str
         The assistant's response.
     """
-    response: ChatCompletion = client.chat.completions.create(
-        model=GPT4_MODEL,
-        messages=[
-            {"role": "system", "content": role_description.strip()},
-            {"role": "system", "content": context_summary.strip()},
-            {"role": "user", "content": query.strip()},
-            {"role": "assistant", "content": ""},
-        ],
-        temperature=GPT4_TEMPERATURE,
-        max_tokens=GPT4_MAX_TOKENS,
-        top_p=GPT4_TOP_P,
-        frequency_penalty=GPT4_FREQUENCY_PENALTY,
-        presence_penalty=GPT4_PRESENCE_PENALTY,
-    )
+    with upstream("chat").slot():
+        response: "ChatCompletion" = request(
+            lambda timeout: get_client().chat.completions.create(
+                **_chat_request(role_description, context_summary, query),
+                timeout=timeout,
+            ),
+            CHAT_DEADLINES,
+            "chat",
+        )
+    record_usage(getattr(response, "usage", None))
     return response.choices[0].message.content.strip()
+
+
+async def get_chat_completion_async(
+    role_description: str,
+    context_summary: str,
+    query: str,
+) -> str:
+    """
+    Asynchronous variant of ``get_chat_completion``.
+
+    Parameters
+    ----------
+    role_description : str
+        Describes the assistant's role and intended tone or expertise.
+    context_summary : str
+        A stringified summary of relevant legal documents or search results.
+    query : str
+        The user's legal question.
+
+    Returns
+    -------
+    str
+        The assistant's response.
+    """
+    async with upstream("chat").slot_async():
+        response: "ChatCompletion" = await request_async(
+            lambda timeout: get_async_client().chat.completions.create(
+                **_chat_request(role_description, context_summary, query),
+                timeout=timeout,
+            ),
+            CHAT_DEADLINES,
+            "chat",
+        )
+    record_usage(getattr(response, "usage", None))
+    return response.choices[0].message.content.strip()
+
+
+async def stream_chat_completion_async(
+    role_description: str,
+    context_summary: str,
+    query: str,
+) -> AsyncIterator[str]:
+    """
+    Streams a GPT-4 response as it is generated, using ``stream=True``.
+
+    Parameters
+    ----------
+    role_description : str
+        Describes the assistant's role and intended tone or expertise.
+    context_summary : str
+        A stringified summary of relevant legal documents or search results.
+    query : str
+        The user's legal question.
+
+    Yields
+    ------
+    str
+        Successive fragments of the assistant's response.
+    """
+    # Retries and the total deadline cover opening the stream; after that,
+    # the read timeout bounds each wait for the next chunk. The upstream slot
+    # is held until the stream ends.
+    async with upstream("chat").slot_async():
+        stream = await request_async(
+            lambda timeout: get_async_client().chat.completions.create(
+                **_chat_request(role_description, context_summary, query),
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=timeout,
+            ),
+            CHAT_DEADLINES,
+            "chat",
+        )
+        async for chunk in stream:
+            # With include_usage, the last chunk carries the token counts and
+            # no choices.
+            record_usage(getattr(chunk, "usage", None))
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
@@ -0,0 +1,475 @@
+"""
+HTTP transport for OpenAI calls: pooling, deadlines, retries and hedging.
+
+The OpenAI clients share one pooled ``httpx`` client per flavour (sync and
+async), sized by ``OPENAI_MAX_CONNECTIONS`` and ``OPENAI_MAX_KEEPALIVE``,
+and have the SDK's own retries turned off. Each call goes through
+``request`` (or ``request_async``) instead, which:
+
+- gives every attempt connect and read timeouts, capped by what is left of
+  the call's total deadline, so a stalled connection cannot hold a worker;
+- retries 429s, 5xx responses, timeouts and connection errors with
+  full-jitter exponential backoff, honouring ``Retry-After``, for as long as
+  the total deadline allows;
+- optionally hedges the call: when it outlives a quantile of recent
+  latencies, a duplicate request is sent and the first answer wins. The
+  duplicate needs a free slot of its own in the upstream limiter, so hedging
+  never takes more than the configured number of requests in flight.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional, TypeVar
+
+import numpy as np
+
+from lexai.config import (
+    CHAT_CONNECT_TIMEOUT,
+    CHAT_READ_TIMEOUT,
+    CHAT_TOTAL_TIMEOUT,
+    EMBEDDING_CONNECT_TIMEOUT,
+    EMBEDDING_HEDGE_MIN_SAMPLES,
+    EMBEDDING_HEDGE_QUANTILE,
+    EMBEDDING_READ_TIMEOUT,
+    EMBEDDING_TOTAL_TIMEOUT,
+    OPENAI_KEEPALIVE_EXPIRY,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE,
+    OPENAI_MAX_RETRIES,
+    OPENAI_RETRY_BASE_DELAY,
+    OPENAI_RETRY_MAX_DELAY,
+)
+from lexai.services.metrics import registry
+
+# httpx and the OpenAI SDK are imported where they are first needed, to keep
+# them off the import path of tools that never call the API.
+if TYPE_CHECKING:
+    import httpx
+
+    from lexai.services.admission import Limiter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRIES = registry.counter(
+    "lexai_openai_retries_total",
+    "Retried OpenAI requests by call and reason.",
+    ("call", "reason"),
+)
+HEDGES = registry.counter(
+    "lexai_openai_hedges_total",
+    "Hedged OpenAI requests sent, won, or skipped for lack of a free slot.",
+    ("call", "result"),
+)
+
+_MIN_TIMEOUT = 0.001
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="lexai-hedge")
+
+
+class Deadlines:
+    """
+    Connect, read and total deadlines for one kind of call, in seconds.
+
+    The connect and read timeouts apply to every attempt; the total deadline
+    covers all attempts of a call, including backoff.
+    """
+
+    def __init__(self, connect: float, read: float, total: float):
+        self.connect = connect
+        self.read = read
+        self.total = total
+
+    def timeout(self, remaining: float) -> "httpx.Timeout":
+        """
+        Returns the timeouts for an attempt with ``remaining`` seconds left.
+        """
+        import httpx
+
+        remaining = max(remaining, _MIN_TIMEOUT)
+        return httpx.Timeout(
+            connect=min(self.connect, remaining),
+            read=min(self.read, remaining),
+            write=min(self.read, remaining),
+            pool=remaining,
+        )
+
+
+EMBEDDING_DEADLINES = Deadlines(
+    EMBEDDING_CONNECT_TIMEOUT, EMBEDDING_READ_TIMEOUT, EMBEDDING_TOTAL_TIMEOUT
+)
+CHAT_DEADLINES = Deadlines(CHAT_CONNECT_TIMEOUT, CHAT_READ_TIMEOUT, CHAT_TOTAL_TIMEOUT)
+
+
+class RetryPolicy:
+    """
+    How often, and after how long, failed requests are retried.
+
+    Parameters
+    ----------
+    max_retries : int, optional
+        Retries after the first attempt.
+    base_delay : float, optional
+        Backoff cap for the first retry, doubled for each further retry.
+    max_delay : float, optional
+        Upper bound on any single delay, including ``Retry-After``.
+    rng : random.Random, optional
+        Source of jitter.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = OPENAI_MAX_RETRIES,
+        base_delay: float = OPENAI_RETRY_BASE_DELAY,
+        max_delay: float = OPENAI_RETRY_MAX_DELAY,
+        rng: Optional[random.Random] = None,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int, error: BaseException) -> float:
+        """
+        Returns the delay before retry number ``attempt + 1``.
+
+        A ``Retry-After`` header on the error is honoured (plus a little
+        jitter); otherwise the delay is drawn uniformly from zero to the
+        exponential backoff cap ("full jitter"), which keeps callers that
+        failed together from retrying together.
+        """
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = retry_after + self._rng.uniform(0, self.base_delay)
+        else:
+            delay = self._rng.uniform(0, self.base_delay * 2 ** attempt)
+        return min(delay, self.max_delay)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return max(0.0, float(response.headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_reason(error: BaseException) -> Optional[str]:
+    """
+    Classifies a failed request, returning None if it should not be retried.
+    """
+    import openai
+
+    if isinstance(error, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(error, openai.APIConnectionError):
+        return "connection"
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code == 429:
+            return "429"
+        if error.status_code >= 500:
+            return "5xx"
+    return None
+
+
+def _next_delay(
+    error: BaseException,
+    attempt: int,
+    policy: RetryPolicy,
+    deadline: float,
+    name: str,
+) -> Optional[float]:
+    reason = retry_reason(error)
+    if reason is None or attempt >= policy.max_retries:
+        return None
+    delay = policy.delay(attempt, error)
+    if time.monotonic() + delay >= deadline:
+        logger.warning(f"Not retrying {name} ({reason}): deadline reached.")
+        return None
+    RETRIES.inc(call=name, reason=reason)
+    logger.warning(
+        f"Retrying {name} in {delay:.2f}s after {reason} "
+        f"({attempt + 1}/{policy.max_retries})."
+    )
+    return delay
+
+
+default_retry_policy = RetryPolicy()
+
+
+class LatencyTracker:
+    """
+    Recent latencies of successful requests, for hedging decisions.
+
+    Parameters
+    ----------
+    window : int, optional
+        How many recent latencies to keep.
+    min_samples : int, optional
+        How many latencies are needed before ``quantile`` returns a value.
+    """
+
+    def __init__(
+        self,
+        window: int = 256,
+        min_samples: int = EMBEDDING_HEDGE_MIN_SAMPLES,
+    ):
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Adds one latency, in seconds."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Returns the ``q`` quantile of recent latencies, or None if too few
+        have been recorded.
+        """
+        with self._lock:
+            samples = list(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return float(np.quantile(samples, q))
+
+
+def _timed(call: Callable[[], T], tracker: LatencyTracker) -> T:
+    start = time.perf_counter()
+    result = call()
+    tracker.record(time.perf_counter() - start)
+    return result
+
+
+async def _timed_async(
+    call: Callable[[], Awaitable[T]],
+    tracker: LatencyTracker,
+) -> T:
+    start = time.perf_counter()
+    result = await call()
+    tracker.record(time.perf_counter() - start)
+    return result
+
+
+def hedged(
+    call: Callable[[], T],
+    tracker: LatencyTracker,
+    name: str,
+    quantile: float = EMBEDDING_HEDGE_QUANTILE,
+    slots: Optional["Limiter"] = None,
+) -> T:
+    """
+    Runs ``call``, sending a duplicate if it outlives recent latencies.
+
+    The first successful answer is returned; the other request is left to
+    finish in the background, since a blocking HTTP call cannot be
+    cancelled. Until ``tracker`` has enough samples, ``call`` runs alone.
+    If ``slots`` is given, the duplicate is only sent when it can take a free
+    slot there, which it holds until it finishes.
+    """
+    delay = tracker.quantile(quantile)
+    if delay is None:
+        return _timed(call, tracker)
+
+    primary = _hedge_executor.submit(_timed, call, tracker)
+    try:
+        return primary.result(timeout=delay)
+    except concurrent.futures.TimeoutError:
+        pass
+
+    if slots is not None and not slots.try_acquire():
+        HEDGES.inc(call=name, result="skipped")
+        return primary.result()
+    HEDGES.inc(call=name, result="sent")
+    duplicate = _hedge_executor.submit(_timed, call, tracker)
+    if slots is not None:
+        duplicate.add_done_callback(lambda _: slots.release())
+    pending = {primary, duplicate}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is duplicate:
+                    HEDGES.inc(call=name, result="won")
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def hedged_async(
+    call: Callable[[], Awaitable[T]],
+    tracker: LatencyTracker,
+    name: str,
+    quantile: float = EMBEDDING_HEDGE_QUANTILE,
+    slots: Optional["Limiter"] = None,
+) -> T:
+    """
+    Asynchronous variant of ``hedged``; the losing request is cancelled.
+    """
+    delay = tracker.quantile(quantile)
+    if delay is None:
+        return await _timed_async(call, tracker)
+
+    tasks = [asyncio.ensure_future(_timed_async(call, tracker))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return tasks[0].result()
+
+        if slots is not None and not slots.try_acquire():
+            HEDGES.inc(call=name, result="skipped")
+            return await tasks[0]
+        HEDGES.inc(call=name, result="sent")
+        tasks.append(asyncio.ensure_future(_timed_async(call, tracker)))
+        if slots is not None:
+            tasks[1].add_done_callback(lambda _: slots.release())
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    if task is tasks[1]:
+                        HEDGES.inc(call=name, result="won")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def request(
+    call: Callable[["httpx.Timeout"], T],
+    deadlines: Deadlines,
+    name: str,
+    hedge: Optional[LatencyTracker] = None,
+    policy: Optional[RetryPolicy] = None,
+    hedge_slots: Optional["Limiter"] = None,
+) -> T:
+    """
+    Makes an OpenAI request with deadlines, retries and optional hedging.
+
+    Parameters
+    ----------
+    call : Callable[[httpx.Timeout], T]
+        Sends one attempt with the given timeouts.
+    deadlines : Deadlines
+        The call's connect, read and total deadlines.
+    name : str
+        The call's name in logs and metrics, e.g. ``"embeddings"``.
+    hedge : LatencyTracker, optional
+        Hedge each attempt against these latencies; no hedging if omitted.
+    policy : RetryPolicy, optional
+        Defaults to ``default_retry_policy``.
+    hedge_slots : Limiter, optional
+        The upstream limiter a duplicate request must take a slot in.
+
+    Returns
+    -------
+    T
+        The result of the first successful attempt.
+
+    Raises
+    ------
+    openai.OpenAIError
+        The last error, once it is not retryable, the retries are exhausted
+        or the total deadline would be exceeded.
+    """
+    policy = policy or default_retry_policy
+    deadline = time.monotonic() + deadlines.total
+    attempt = 0
+    while True:
+        timeout = deadlines.timeout(deadline - time.monotonic())
+        try:
+            if hedge is not None:
+                return hedged(
+                    lambda: call(timeout), hedge, name, slots=hedge_slots
+                )
+            return call(timeout)
+        except Exception as error:
+            delay = _next_delay(error, attempt, policy, deadline, name)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        attempt += 1
+
+
+async def request_async(
+    call: Callable[["httpx.Timeout"], Awaitable[T]],
+    deadlines: Deadlines,
+    name: str,
+    hedge: Optional[LatencyTracker] = None,
+    policy: Optional[RetryPolicy] = None,
+    hedge_slots: Optional["Limiter"] = None,
+) -> T:
+    """
+    Asynchronous variant of ``request``.
+
+    Each attempt is additionally cancelled when the total deadline passes,
+    raising ``asyncio.TimeoutError``.
+    """
+    policy = policy or default_retry_policy
+    deadline = time.monotonic() + deadlines.total
+    attempt = 0
+    while True:
+        remaining = max(deadline - time.monotonic(), _MIN_TIMEOUT)
+        timeout = deadlines.timeout(remaining)
+        try:
+            if hedge is not None:
+                attempt_call = hedged_async(
+                    lambda: call(timeout), hedge, name, slots=hedge_slots
+                )
+            else:
+                attempt_call = call(timeout)
+            return await asyncio.wait_for(attempt_call, remaining)
+        except Exception as error:
+            delay = _next_delay(error, attempt, policy, deadline, name)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def _pool_limits() -> "httpx.Limits":
+    import httpx
+
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def create_http_client() -> "httpx.Client":
+    """
+    Returns a pooled ``httpx`` client for the synchronous OpenAI client.
+    """
+    import openai
+
+    return openai.DefaultHttpxClient(
+        limits=_pool_limits(), timeout=CHAT_DEADLINES.timeout(CHAT_TOTAL_TIMEOUT)
+    )
+
+
+def create_async_http_client() -> "httpx.AsyncClient":
+    """
+    Returns a pooled ``httpx`` client for the asynchronous OpenAI client.
+    """
+    import openai
+
+    return openai.DefaultAsyncHttpxClient(
+        limits=_pool_limits(), timeout=CHAT_DEADLINES.timeout(CHAT_TOTAL_TIMEOUT)
+    )
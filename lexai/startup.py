@@ -0,0 +1,101 @@
+"""
+Startup timing for LexAI.
+
+``StartupTimer`` records how long each phase of startup takes (importing the
+web stack, warming up corpora, building the interface, ...) and logs them as
+one report before the server starts accepting requests, so cold-start
+regressions show up in the logs of every deployment. On Linux the report
+also includes the time from process start to the first phase, which covers
+interpreter start-up and the imports of ``lexai.__main__``.
+
+For a per-module breakdown of import time, see
+``python -m lexai.tools.import_report``.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from lexai.config import JSON_LOGS
+
+logger = logging.getLogger(__name__)
+
+
+def process_age() -> Optional[float]:
+    """
+    Returns the seconds since this process started, or None if unknown.
+    """
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            # The command name may contain spaces; fields resume after ")".
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/stat", encoding="ascii") as f:
+            boot_time = next(
+                int(line.split()[1]) for line in f if line.startswith("btime")
+            )
+    except (OSError, IndexError, StopIteration, ValueError):
+        return None
+    start_ticks = int(fields[19])
+    return time.time() - (boot_time + start_ticks / os.sysconf("SC_CLK_TCK"))
+
+
+class StartupTimer:
+    """
+    Times the phases of startup and reports them together.
+
+    Phases may run concurrently in different threads; each is reported with
+    its own wall-clock duration.
+    """
+
+    def __init__(self):
+        self._created = time.perf_counter()
+        self._pre_start = process_age()
+        self._lock = threading.Lock()
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times one named phase of startup.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = time.perf_counter() - start
+
+    def report(self) -> dict[str, Optional[float]]:
+        """
+        Returns the phase durations and totals, in seconds.
+
+        ``before_main`` is the time from process start to the creation of
+        the timer (None where it cannot be measured), and ``total`` the time
+        from process start (or timer creation) to now.
+        """
+        with self._lock:
+            phases = dict(self.phases)
+        elapsed = time.perf_counter() - self._created
+        return {
+            "before_main": self._pre_start,
+            **phases,
+            "total": elapsed + (self._pre_start or 0.0),
+        }
+
+    def log(self) -> None:
+        """
+        Logs the report as a table, and as one JSON line with ``JSON_LOGS``.
+        """
+        report = self.report()
+        lines = [
+            f"  {name:<24} {seconds:8.3f}s"
+            for name, seconds in report.items()
+            if seconds is not None
+        ]
+        logger.info("Startup report:\n" + "\n".join(lines))
+        if JSON_LOGS:
+            logger.info(json.dumps({"event": "startup", "seconds": report}))
@@ -0,0 +1,373 @@
+"""
+Headless bulk queries for LexAI: JSONL in, JSONL out.
+
+Each input line is a record such as ``{"query": "...", "location": "Boulder"}``
+(``location`` may also be a list of jurisdictions), answered through the same
+retrieval and completion path as the web application. Usage::
+
+    lexai batch questions.jsonl answers.jsonl --concurrency 16 --max-rate 5
+
+The input is streamed through a bounded queue to a fixed pool of workers, so
+memory does not grow with the size of the input. Each result is appended to
+the output as soon as its query finishes, so output lines are in completion
+order; their ``line`` field gives the input line they answer. Rate-limited
+and failed OpenAI calls are retried by the transport layer; ``--max-rate``
+additionally caps how many queries are started per second.
+
+The output doubles as the checkpoint: when a job is restarted, lines already
+present in the output are skipped, and a partial record left by a crash is
+truncated first. Records that failed for good (an invalid record, or an
+error that retrying cannot fix) are written with an ``"error"`` and are not
+retried on restart. Transient failures (a query turned away by admission
+control, or an OpenAI call still rate-limited or failing once its retries
+ran out) are left out of the output, so a restart answers them again.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from html import unescape
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, Sequence
+
+from lexai.config import BATCH_CONCURRENCY, BATCH_MAX_RATE
+from lexai.services.metrics import request_trace
+
+if TYPE_CHECKING:
+    from lexai.core.match_engine import Locations
+
+logger = logging.getLogger(__name__)
+
+AnswerFn = Callable[[str, "Locations"], Awaitable[dict]]
+
+PROGRESS_INTERVAL = 1000
+
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+class CompletedLines:
+    """
+    The input line numbers that already have a result in the output.
+
+    Stored as a watermark, below which every line is complete, plus the lines
+    above it that finished out of order. Results are written in roughly input
+    order (at most ``concurrency`` queries are in flight), so the set stays
+    small however long the input is.
+    """
+
+    def __init__(self):
+        self.watermark = 1
+        self._above: set[int] = set()
+        self.count = 0
+
+    def add(self, line: int) -> None:
+        """Marks an input line as complete."""
+        if line in self:
+            return
+        self.count += 1
+        self._above.add(line)
+        while self.watermark in self._above:
+            self._above.remove(self.watermark)
+            self.watermark += 1
+
+    def __contains__(self, line: int) -> bool:
+        return line < self.watermark or line in self._above
+
+
+class RateLimiter:
+    """
+    Spaces the starts of queries at least ``1 / rate`` seconds apart.
+
+    Parameters
+    ----------
+    rate : float
+        Starts per second; zero or less disables the limit.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_start = 0.0
+
+    async def wait(self) -> None:
+        """Waits for the next free start slot."""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def read_completed_lines(output_path: str) -> CompletedLines:
+    """
+    Reads the input lines already answered in an existing output file.
+
+    A final record without a trailing newline, left by an interrupted write,
+    is truncated from the file so that the job can append after it.
+
+    Parameters
+    ----------
+    output_path : str
+        The output of a previous run; it need not exist.
+
+    Returns
+    -------
+    CompletedLines
+        The completed input lines.
+
+    Raises
+    ------
+    ValueError
+        If a complete line of the output is not a batch result.
+    """
+    completed = CompletedLines()
+    if not os.path.exists(output_path):
+        return completed
+
+    valid_end = 0
+    with open(output_path, "rb") as f:
+        for number, raw in enumerate(f, start=1):
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                completed.add(int(json.loads(raw)["line"]))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(
+                    f"Line {number} of {output_path} is not a batch result: {e}"
+                ) from e
+            valid_end += len(raw)
+        size = f.seek(0, os.SEEK_END)
+
+    if valid_end < size:
+        logger.warning(f"Truncating a partial record at the end of {output_path}.")
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_end)
+    return completed
+
+
+def _parse_record(text: str) -> tuple[str, Any]:
+    """
+    Returns the query and location of one input line.
+
+    Raises
+    ------
+    ValueError
+        If the line is not a JSON object with a query and a location.
+    """
+    try:
+        record = json.loads(text)
+        query, location = record["query"], record["location"]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"expected an object with query and location ({e})") from e
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("query must be a non-empty string")
+    if not isinstance(location, str) and not (
+        isinstance(location, list) and all(isinstance(item, str) for item in location)
+    ):
+        raise ValueError("location must be a string or a list of strings")
+    return query, location
+
+
+def _plain_text(html: str) -> str:
+    return unescape(_TAG_PATTERN.sub("", html)).strip()
+
+
+def _is_transient(error: Exception) -> bool:
+    from lexai.services.admission import Overloaded
+    from lexai.services.transport import retry_reason
+
+    return isinstance(error, Overloaded) or retry_reason(error) is not None
+
+
+async def answer_line(line: int, text: str, answer_fn: AnswerFn) -> dict:
+    """
+    Answers one input line and returns its output record.
+
+    Parameters
+    ----------
+    line : int
+        The 1-based input line number.
+    text : str
+        The raw input line.
+    answer_fn : AnswerFn
+        Answers a query for a location, e.g. ``generate_matches_async``.
+
+    Returns
+    -------
+    dict
+        ``line``, ``query`` and ``location``, then either ``response`` and
+        ``references`` (and ``degraded``, if the model was too busy to
+        answer) or ``error`` (and ``retryable``, if the failure was
+        transient), and the ``stages_ms`` and ``duration_ms`` timings of the
+        query.
+    """
+    row: dict[str, Any] = {"line": line}
+    try:
+        query, location = _parse_record(text)
+    except ValueError as e:
+        row["error"] = f"Invalid record: {e}"
+        return row
+    row["query"] = query
+    row["location"] = location
+
+    with request_trace("batch_query", line=line) as trace:
+        try:
+            result = await answer_fn(query, location)
+        except Exception as e:
+            logger.error(f"Line {line} failed: {e}")
+            result = {"error_html": str(e), "retryable": _is_transient(e)}
+        if "error_html" in result:
+            trace["outcome"] = "error"
+
+    if "error_html" in result:
+        row["error"] = _plain_text(result["error_html"])
+        if result.get("retryable"):
+            row["retryable"] = True
+    else:
+        row["response"] = result["response"]
+        row["references"] = [dict(match) for match in result["matches"]]
+        if result.get("degraded"):
+            row["degraded"] = True
+    row["stages_ms"] = trace["stages_ms"]
+    row["duration_ms"] = trace["duration_ms"]
+    return row
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = BATCH_CONCURRENCY,
+    max_rate: float = BATCH_MAX_RATE,
+    answer_fn: Optional[AnswerFn] = None,
+) -> dict[str, int]:
+    """
+    Answers every line of a JSONL file, resuming from an existing output.
+
+    Parameters
+    ----------
+    input_path : str
+        JSONL records with a ``query`` and a ``location``.
+    output_path : str
+        The JSONL file results are appended to.
+    concurrency : int, optional
+        Queries in flight at once.
+    max_rate : float, optional
+        Maximum queries started per second; zero for no limit.
+    answer_fn : AnswerFn, optional
+        Answers one query; defaults to ``generate_matches_async``. Tests can
+        pass a local stand-in.
+
+    Returns
+    -------
+    dict[str, int]
+        How many lines were ``answered``, ``failed``, ``skipped`` (blank,
+        or already in the output) and ``deferred`` (failed transiently and
+        left out of the output, to be answered on restart).
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1.")
+    if answer_fn is None:
+        from lexai.core.match_engine import generate_matches_async as answer_fn
+
+    completed = read_completed_lines(output_path)
+    if completed.count:
+        logger.info(f"Resuming: {completed.count} lines already answered.")
+
+    counts = {"answered": 0, "failed": 0, "skipped": 0, "deferred": 0}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2 * concurrency)
+    limiter = RateLimiter(max_rate)
+
+    with open(output_path, "a", encoding="utf-8") as output:
+
+        async def produce() -> None:
+            with open(input_path, encoding="utf-8") as f:
+                for line, text in enumerate(f, start=1):
+                    if not text.strip() or line in completed:
+                        counts["skipped"] += 1
+                        continue
+                    await queue.put((line, text))
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def work() -> None:
+            while (item := await queue.get()) is not None:
+                await limiter.wait()
+                row = await answer_line(*item, answer_fn)
+                if row.get("retryable"):
+                    counts["deferred"] += 1
+                    continue
+                output.write(json.dumps(row, ensure_ascii=False) + "\n")
+                output.flush()
+                counts["failed" if "error" in row else "answered"] += 1
+                done = counts["answered"] + counts["failed"]
+                if done % PROGRESS_INTERVAL == 0:
+                    logger.info(f"Answered {done} lines ({counts['failed']} failed).")
+
+        tasks = [asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(work()) for _ in range(concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    logger.info(
+        f"Batch finished: {counts['answered']} answered, {counts['failed']} "
+        f"failed, {counts['skipped']} skipped."
+    )
+    if counts["deferred"]:
+        logger.warning(
+            f"{counts['deferred']} lines failed transiently and were not "
+            "written; rerun the same command to answer them."
+        )
+    return counts
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Command-line entry point for ``lexai batch``.
+    """
+    parser = argparse.ArgumentParser(
+        prog="lexai batch",
+        description="Answer a JSONL file of queries without the web interface.",
+    )
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the batch options to an argument parser.
+    """
+    parser.add_argument("input", help="JSONL file of {query, location} records.")
+    parser.add_argument("output", help="JSONL file to append results to.")
+    parser.add_argument(
+        "--concurrency", type=int, default=BATCH_CONCURRENCY,
+        help="Queries in flight at once.",
+    )
+    parser.add_argument(
+        "--max-rate", type=float, default=BATCH_MAX_RATE,
+        help="Maximum queries started per second (0 for no limit).",
+    )
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    Runs a batch from parsed command-line arguments.
+    """
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(run_batch(
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        max_rate=args.max_rate,
+    ))
+
+
+if __name__ == "__main__":
+    main()
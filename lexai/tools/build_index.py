@@ -0,0 +1,113 @@
+"""
+Builds search indexes next to a corpus.
+
+Usage::
+
+    python -m lexai.tools.build_index lexai/data/denver_embeddings.corpus
+    python -m lexai.tools.build_index denver.npz --nlist 2048
+    python -m lexai.tools.build_index denver.npz --lexical
+
+By default an IVF approximate nearest-neighbour index is written to
+``ivf_index_path(corpus)``; use ``LEXAI_IVF_NPROBE`` to tune recall. With
+``--lexical``, a BM25 index for hybrid retrieval is written to
+``lexical_index_path(corpus)`` instead. Either is picked up by the corpus
+registry on the next (re)load.
+"""
+
+import argparse
+import logging
+from typing import Optional, Sequence
+
+from lexai.core.data_loader import load_embeddings
+from lexai.core.ivf_index import IVFFlatIndex, ivf_index_path
+from lexai.core.lexical_index import LexicalIndex, lexical_index_path, section_texts
+
+logger = logging.getLogger(__name__)
+
+
+def build_index(
+    corpus_path: str,
+    nlist: Optional[int] = None,
+    num_iterations: int = 20,
+) -> str:
+    """
+    Builds and saves an IVF index for the corpus at ``corpus_path``.
+
+    Parameters
+    ----------
+    corpus_path : str
+        Path to a .npz corpus file or memory-mapped corpus directory.
+    nlist : int, optional
+        The number of inverted lists; defaults to roughly ``sqrt(N)``.
+    num_iterations : int, optional
+        k-means iterations, by default 20.
+
+    Returns
+    -------
+    str
+        The path the index was written to.
+    """
+    embeddings, metadata = load_embeddings(corpus_path)
+    index = IVFFlatIndex.build(
+        embeddings,
+        nlist,
+        corpus_digest=metadata.digest(),
+        num_iterations=num_iterations,
+    )
+    index_path = ivf_index_path(corpus_path)
+    index.save(index_path)
+    logger.info(f"Saved IVF index ({index.nlist} lists) to {index_path}.")
+    return index_path
+
+
+def build_lexical_index(corpus_path: str) -> str:
+    """
+    Builds and saves a BM25 lexical index for the corpus at ``corpus_path``.
+
+    Parameters
+    ----------
+    corpus_path : str
+        Path to a .npz corpus file or memory-mapped corpus directory.
+
+    Returns
+    -------
+    str
+        The path the index was written to.
+    """
+    _, metadata = load_embeddings(corpus_path)
+    index = LexicalIndex.build(section_texts(metadata), corpus_digest=metadata.digest())
+    index_path = lexical_index_path(corpus_path)
+    index.save(index_path)
+    logger.info(f"Saved lexical index ({len(index.terms)} terms) to {index_path}.")
+    return index_path
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Command-line entry point for the index builder.
+    """
+    parser = argparse.ArgumentParser(
+        description="Build an IVF or lexical (BM25) search index for a corpus."
+    )
+    parser.add_argument("corpus", help="Path to a .npz file or corpus directory.")
+    parser.add_argument(
+        "--nlist", type=int, help="Number of inverted lists (default: sqrt(N))."
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=20, help="k-means iterations."
+    )
+    parser.add_argument(
+        "--lexical", action="store_true",
+        help="Build a BM25 index for hybrid retrieval instead of an IVF index.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.lexical:
+        build_lexical_index(args.corpus)
+    else:
+        build_index(args.corpus, args.nlist, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Converter from legacy .npz embedding files to the memory-mapped corpus format.
+
+Usage::
+
+    python -m lexai.tools.convert lexai/data/boulder_embeddings.npz
+    python -m lexai.tools.convert input.npz output_dir
+
+When no output directory is given, the corpus is written next to the input
+file with the ``.npz`` suffix replaced by ``.corpus``.
+"""
+
+import argparse
+import logging
+import os
+from typing import Optional, Sequence
+
+from lexai.core.corpus_format import write_corpus
+from lexai.core.data_loader import load_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def default_output_path(npz_file_path: str) -> str:
+    """
+    Returns the default corpus directory for a legacy .npz file.
+
+    Parameters
+    ----------
+    npz_file_path : str
+        Path to the .npz file.
+
+    Returns
+    -------
+    str
+        The input path with its extension replaced by ``.corpus``.
+    """
+    root, _ = os.path.splitext(npz_file_path)
+    return f"{root}.corpus"
+
+
+def convert_npz(npz_file_path: str, output_dir: Optional[str] = None) -> str:
+    """
+    Converts a legacy .npz embedding file to the memory-mapped corpus format.
+
+    Parameters
+    ----------
+    npz_file_path : str
+        Path to the .npz file to convert.
+    output_dir : str, optional
+        Destination corpus directory; see ``default_output_path``.
+
+    Returns
+    -------
+    str
+        The directory the corpus was written to.
+    """
+    output_dir = output_dir or default_output_path(npz_file_path)
+    embeddings, metadata = load_embeddings(npz_file_path)
+    columns = metadata.to_columns()
+    write_corpus(output_dir, embeddings, columns)
+    logger.info(
+        f"Converted {npz_file_path} ({embeddings.shape[0]} sections) "
+        f"to {output_dir}."
+    )
+    return output_dir
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Command-line entry point for the converter.
+    """
+    parser = argparse.ArgumentParser(
+        description="Convert a LexAI .npz embedding file to the mmap corpus format."
+    )
+    parser.add_argument("input", help="Path to the .npz file to convert.")
+    parser.add_argument(
+        "output", nargs="?", help="Output corpus directory (default: <input>.corpus)."
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    convert_npz(args.input, args.output)
+
+
+if __name__ == "__main__":
+    main()
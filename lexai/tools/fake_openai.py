@@ -0,0 +1,366 @@
+"""
+Local OpenAI-compatible stand-in server for load testing.
+
+Implements ``POST /v1/embeddings`` and ``POST /v1/chat/completions``
+(including ``stream=True``) with deterministic embeddings and answers, so
+LexAI can be load-tested without API costs or OpenAI rate limits. Latency is
+drawn from a configurable distribution per endpoint, and a fraction of the
+requests can be failed with 500s or rejected with 429s. Usage::
+
+    python -m lexai.tools.fake_openai --port 8100 \\
+        --chat-latency lognormal:0.8:0.4 --error-rate 0.01 --rate-limit-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 python -m lexai
+
+Latency specs are ``constant:S``, ``uniform:LOW:HIGH``, ``normal:MEAN:STD``
+or ``lognormal:MEDIAN:SIGMA``, all in seconds.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import math
+import random
+import time
+import uuid
+import zlib
+from typing import Any, AsyncIterator, Optional, Sequence
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+_WORDS = (
+    "the", "code", "section", "permit", "zoning", "district", "requires",
+    "property", "owner", "city", "residential", "use", "may", "shall", "not",
+    "within", "feet", "of", "a", "building", "approval", "under", "ordinance",
+)
+
+
+def fake_embedding(text: str, dim: int) -> np.ndarray:
+    """
+    Returns a deterministic unit-length embedding for ``text``.
+    """
+    rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+    vector = rng.standard_normal(dim, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def fake_answer(prompt: str, num_words: int) -> list[str]:
+    """
+    Returns a deterministic answer to ``prompt`` as a list of words.
+    """
+    rng = random.Random(zlib.crc32(prompt.encode("utf-8")))
+    return [rng.choice(_WORDS) for _ in range(num_words)]
+
+
+class LatencyDistribution:
+    """
+    A distribution of simulated response times, parsed from a spec string.
+
+    Parameters
+    ----------
+    spec : str
+        ``constant:S``, ``uniform:LOW:HIGH``, ``normal:MEAN:STD`` or
+        ``lognormal:MEDIAN:SIGMA``, in seconds.
+
+    Raises
+    ------
+    ValueError
+        If the spec is malformed.
+    """
+
+    KINDS = {"constant": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        if kind not in self.KINDS or len(params) != self.KINDS[kind]:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+        try:
+            self.params = [float(p) for p in params]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec: {spec!r}") from None
+        self.kind = kind
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        """Draws one latency, in seconds, never negative."""
+        if self.kind == "constant":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(median), sigma) if median > 0 else 0
+        return max(0.0, value)
+
+
+def _error(status: int, message: str, error_type: str, headers=None) -> JSONResponse:
+    body = {"error": {"message": message, "type": error_type, "code": None}}
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+def _delta(delta: dict[str, str], finish_reason: Optional[str] = None) -> dict:
+    return {"index": 0, "delta": delta, "finish_reason": finish_reason}
+
+
+def _count_tokens(text: str) -> int:
+    return len(text.split())
+
+
+class FakeOpenAIServer:
+    """
+    Configuration and state of the fake OpenAI server.
+
+    Parameters
+    ----------
+    dim : int, optional
+        Dimensionality of the returned embeddings, by default 1536.
+    embedding_latency, chat_latency : str, optional
+        Latency specs for each endpoint; for streamed completions
+        ``chat_latency`` is the time to the first token.
+    token_interval : float, optional
+        Seconds between streamed chunks.
+    answer_words : int, optional
+        Length of every answer, in words (one word per streamed chunk).
+    error_rate : float, optional
+        Fraction of requests failed with a 500.
+    rate_limit_rate : float, optional
+        Fraction of requests rejected with a 429.
+    max_concurrency : int, optional
+        Requests beyond this many in flight are rejected with a 429; 0 means
+        unlimited.
+    retry_after : float, optional
+        Value of the ``Retry-After`` header sent with 429s.
+    seed : int, optional
+        Seed for latencies and fault injection.
+    """
+
+    def __init__(
+        self,
+        dim: int = 1536,
+        embedding_latency: str = "constant:0",
+        chat_latency: str = "constant:0",
+        token_interval: float = 0.0,
+        answer_words: int = 48,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        max_concurrency: int = 0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ):
+        self.dim = dim
+        self.embedding_latency = LatencyDistribution(embedding_latency)
+        self.chat_latency = LatencyDistribution(chat_latency)
+        self.token_interval = token_interval
+        self.answer_words = answer_words
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.in_flight = 0
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+    def _fault(self) -> Optional[JSONResponse]:
+        self.stats["requests"] += 1
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            return self._rate_limited("Too many concurrent requests.")
+        if self.rng.random() < self.rate_limit_rate:
+            return self._rate_limited("Rate limit reached.")
+        if self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return _error(500, "Injected server error.", "server_error")
+        return None
+
+    def _rate_limited(self, message: str) -> JSONResponse:
+        self.stats["rate_limited"] += 1
+        headers = {"retry-after": f"{self.retry_after:g}"}
+        return _error(429, message, "rate_limit_exceeded", headers)
+
+    async def embeddings(self, body: dict[str, Any]) -> JSONResponse:
+        """Handles one ``/v1/embeddings`` request."""
+        texts = body.get("input")
+        texts = [texts] if isinstance(texts, str) else texts
+        if not texts or not all(isinstance(text, str) for text in texts):
+            return _error(
+                400,
+                "'input' must be a string or a list of strings.",
+                "invalid_request_error",
+            )
+
+        await asyncio.sleep(self.embedding_latency.sample(self.rng))
+        dim = body.get("dimensions") or self.dim
+        base64_encoded = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(texts):
+            vector = fake_embedding(text, dim)
+            embedding = (
+                base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+                if base64_encoded
+                else vector.tolist()
+            )
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(_count_tokens(text) for text in texts)
+        return JSONResponse({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", ""),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    async def chat_completions(self, body: dict[str, Any]):
+        """Handles one ``/v1/chat/completions`` request."""
+        messages = body.get("messages")
+        if not messages:
+            return _error(400, "'messages' is required.", "invalid_request_error")
+
+        prompt = "\n".join(str(m.get("content") or "") for m in messages)
+        words = fake_answer(prompt, self.answer_words)
+        usage = {
+            "prompt_tokens": _count_tokens(prompt),
+            "completion_tokens": len(words),
+            "total_tokens": _count_tokens(prompt) + len(words),
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "")
+
+        await asyncio.sleep(self.chat_latency.sample(self.rng))
+        if body.get("stream"):
+            if not (body.get("stream_options") or {}).get("include_usage"):
+                usage = None
+            return StreamingResponse(
+                self._stream(completion_id, model, words, usage),
+                media_type="text/event-stream",
+            )
+
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    async def _stream(
+        self,
+        completion_id: str,
+        model: str,
+        words: list[str],
+        usage: Optional[dict[str, int]],
+    ) -> AsyncIterator[str]:
+        def event(choices: list[dict], **extra) -> str:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        # A streamed request stays in flight until its last chunk is sent.
+        self.in_flight += 1
+        try:
+            yield event([_delta({"role": "assistant"})])
+            for i, word in enumerate(words):
+                if i and self.token_interval > 0:
+                    await asyncio.sleep(self.token_interval)
+                yield event([_delta({"content": word if i == 0 else f" {word}"})])
+            yield event([_delta({}, finish_reason="stop")])
+            if usage is not None:
+                yield event([], usage=usage)
+            yield "data: [DONE]\n\n"
+        finally:
+            self.in_flight -= 1
+
+    def create_app(self) -> FastAPI:
+        """
+        Builds the ASGI application serving this fake.
+        """
+        app = FastAPI(title="Fake OpenAI")
+        server = self
+
+        async def handle(request: Request, handler):
+            fault = server._fault()
+            if fault is not None:
+                return fault
+            try:
+                body = await request.json()
+            except ValueError:
+                return _error(400, "Invalid JSON body.", "invalid_request_error")
+            server.in_flight += 1
+            try:
+                return await handler(body)
+            finally:
+                server.in_flight -= 1
+
+        @app.post("/v1/embeddings")
+        async def embeddings(request: Request):
+            return await handle(request, server.embeddings)
+
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            return await handle(request, server.chat_completions)
+
+        @app.get("/stats")
+        async def stats():
+            return {**server.stats, "in_flight": server.in_flight}
+
+        return app
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Runs the fake OpenAI server from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve a local, OpenAI-compatible fake for load testing."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--dim", type=int, default=1536,
+                        help="Embedding dimensionality; must match the corpora.")
+    parser.add_argument("--embedding-latency", default="lognormal:0.15:0.3")
+    parser.add_argument("--chat-latency", default="lognormal:0.8:0.4",
+                        help="Latency, or time to first token when streaming.")
+    parser.add_argument("--token-interval", type=float, default=0.02)
+    parser.add_argument("--answer-words", type=int, default=48)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeOpenAIServer(
+        dim=args.dim,
+        embedding_latency=args.embedding_latency,
+        chat_latency=args.chat_latency,
+        token_interval=args.token_interval,
+        answer_words=args.answer_words,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        max_concurrency=args.max_concurrency,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    logger.info(f"Serving fake OpenAI API on http://{args.host}:{args.port}/v1")
+    uvicorn.run(server.create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Reports where import time goes for LexAI's entry points.
+
+Each module is imported in a fresh interpreter with ``python -X importtime``,
+and the report lists its total import time, the top-level packages that
+cost the most (summing their modules' own time) and the slowest individual
+imports. Usage::
+
+    python -m lexai.tools.import_report
+    python -m lexai.tools.import_report lexai.core.match_engine --top 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Optional, Sequence
+
+DEFAULT_MODULES = (
+    "lexai.__main__",
+    "lexai.core.match_engine",
+    "lexai.ui.server",
+)
+
+
+class ImportRecord:
+    """
+    One line of ``-X importtime`` output, with times in seconds.
+    """
+
+    __slots__ = ("module", "self_time", "cumulative")
+
+    def __init__(self, module: str, self_time: float, cumulative: float):
+        self.module = module
+        self.self_time = self_time
+        self.cumulative = cumulative
+
+    @property
+    def package(self) -> str:
+        """The top-level package of the module."""
+        return self.module.split(".", 1)[0]
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    """
+    Parses the stderr of ``python -X importtime``.
+
+    Parameters
+    ----------
+    output : str
+        Lines of the form ``import time: SELF | CUMULATIVE | MODULE``, with
+        times in microseconds; other lines are ignored.
+
+    Returns
+    -------
+    list[ImportRecord]
+        One record per imported module, in import-completion order.
+    """
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            self_us, cumulative_us, module = line[len("import time:"):].split("|")
+            records.append(ImportRecord(
+                module.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6
+            ))
+        except ValueError:
+            continue  # the header line
+    return records
+
+
+def measure_imports(module: str) -> list[ImportRecord]:
+    """
+    Imports ``module`` in a fresh interpreter and returns its import times.
+
+    Raises
+    ------
+    RuntimeError
+        If the import fails.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def summarize(records: list[ImportRecord], module: str, top: int) -> str:
+    """
+    Formats the import report for one entry module.
+    """
+    total = next(
+        (r.cumulative for r in records if r.module == module),
+        sum(r.self_time for r in records),
+    )
+    by_package: dict[str, float] = defaultdict(float)
+    for record in records:
+        by_package[record.package] += record.self_time
+
+    lines = [f"{module}: {total:.3f}s", "  slowest packages (own time):"]
+    for package, seconds in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"    {package:<40} {seconds:8.3f}s  {seconds / total:6.1%}")
+    lines.append("  slowest imports (cumulative):")
+    slowest = sorted(
+        (r for r in records if r.module != module), key=lambda r: -r.cumulative
+    )
+    for record in slowest[:top]:
+        lines.append(f"    {record.module:<40} {record.cumulative:8.3f}s")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Prints an import-time report for each requested module.
+    """
+    parser = argparse.ArgumentParser(
+        description="Report import time for LexAI entry points."
+    )
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES))
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        print(summarize(measure_imports(module), module, args.top))
+        print()
+
+
+if __name__ == "__main__":
+    main()
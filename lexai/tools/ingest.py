@@ -0,0 +1,498 @@
+"""
+Offline corpus ingestion for LexAI.
+
+Reads raw jurisdiction documents, splits them into chunks, embeds the chunks
+in large batches and writes a corpus that ``load_embeddings`` and
+``LOCATION_INFO`` can serve.
+
+Supported inputs:
+
+- a JSONL file (or directory of ``.jsonl`` files) with one section per line,
+  with ``url``, ``title``, ``subtitle`` and ``content`` fields;
+- a directory of ``.html`` / ``.htm`` dumps, one section per file.
+
+Batches are embedded by a bounded thread pool with rate-limit-aware backoff.
+Every finished batch is checkpointed in ``<output>.ingest/``, so rerunning
+the same command after a crash only embeds the batches that are missing.
+
+Usage::
+
+    lexai ingest sections.jsonl lexai/data/arvada.corpus
+    lexai ingest html_dump/ arvada.corpus --batch-size 512 --workers 8
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+import numpy as np
+import openai
+
+from lexai.config import EMBEDDING_MODEL
+from lexai.core.corpus_format import METADATA_COLUMNS, write_corpus
+from lexai.services.openai_client import create_embeddings
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[list[str]], np.ndarray]
+
+DEFAULT_CHUNK_CHARS = 4000
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_RETRIES = 8
+
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class _SectionHTMLParser(HTMLParser):
+    """Extracts the title, first heading, canonical URL and body text."""
+
+    _SKIPPED_TAGS = {"script", "style", "noscript", "head"}
+
+    def __init__(self):
+        super().__init__()
+        self.title = ""
+        self.heading = ""
+        self.canonical_url = ""
+        self.text: list[str] = []
+        self._stack: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag == "link" and attributes.get("rel") == "canonical":
+            self.canonical_url = attributes.get("href") or ""
+        if tag not in {"link", "meta", "br", "img", "hr", "input"}:
+            self._stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._stack:
+            while self._stack and self._stack.pop() != tag:
+                pass
+        if tag in {"p", "div", "li", "h1", "h2", "h3", "h4", "tr", "section"}:
+            self.text.append("\n\n")
+
+    def handle_data(self, data):
+        if "title" in self._stack:
+            self.title += data
+        elif any(tag in self._SKIPPED_TAGS for tag in self._stack):
+            return
+        elif not self.heading and self._stack and self._stack[-1] in {"h1", "h2"}:
+            self.heading = data.strip()
+            self.text.append(data)
+        else:
+            self.text.append(data)
+
+
+def parse_html(path: str) -> dict[str, str]:
+    """
+    Extracts a section from an HTML dump.
+
+    Parameters
+    ----------
+    path : str
+        Path to the HTML file.
+
+    Returns
+    -------
+    dict[str, str]
+        A section with 'url', 'title', 'subtitle' and 'content'. The URL is
+        the page's canonical link if present, otherwise a file URI.
+    """
+    parser = _SectionHTMLParser()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        parser.feed(f.read())
+
+    paragraphs = [" ".join(part.split()) for part in "".join(parser.text).split("\n\n")]
+    return {
+        "url": parser.canonical_url or f"file://{os.path.abspath(path)}",
+        "title": " ".join(parser.title.split()) or parser.heading,
+        "subtitle": parser.heading,
+        "content": "\n\n".join(p for p in paragraphs if p),
+    }
+
+
+def read_documents(path: str) -> Iterator[dict[str, str]]:
+    """
+    Yields raw sections from a JSONL file or a directory of JSONL/HTML files.
+
+    Parameters
+    ----------
+    path : str
+        Input file or directory.
+
+    Yields
+    ------
+    dict[str, str]
+        Sections with 'url', 'title', 'subtitle' and 'content' fields.
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    else:
+        files = [path]
+
+    for file_path in files:
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in {".html", ".htm"}:
+            yield parse_html(file_path)
+        elif extension in {".jsonl", ".json"} or file_path == path:
+            with open(file_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        yield {
+                            name: str(record.get(name) or "")
+                            for name in METADATA_COLUMNS
+                        }
+
+
+def chunk_text(text: str, max_chars: int = DEFAULT_CHUNK_CHARS) -> list[str]:
+    """
+    Splits text into chunks of at most ``max_chars`` characters.
+
+    Paragraphs are packed greedily; a paragraph longer than ``max_chars`` is
+    split on whitespace.
+
+    Parameters
+    ----------
+    text : str
+        The text to split.
+    max_chars : int, optional
+        The maximum chunk length.
+
+    Returns
+    -------
+    list[str]
+        The chunks, or a single empty string for empty text.
+    """
+    pieces = []
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    chunks: list[str] = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + 2 + len(piece) <= max_chars:
+            chunks[-1] = f"{chunks[-1]}\n\n{piece}"
+        else:
+            chunks.append(piece)
+    return chunks or [""]
+
+
+def chunk_documents(
+    documents: Iterator[dict[str, str]],
+    max_chars: int = DEFAULT_CHUNK_CHARS,
+) -> Iterator[dict[str, str]]:
+    """
+    Splits each section's content into chunks that share its metadata.
+    """
+    for document in documents:
+        for chunk in chunk_text(document["content"], max_chars):
+            yield {**document, "content": chunk}
+
+
+def embedding_input(chunk: dict[str, str]) -> str:
+    """
+    Returns the text that is embedded for a chunk.
+    """
+    heading = ": ".join(part for part in (chunk["title"], chunk["subtitle"]) if part)
+    return f"{heading}\n{chunk['content']}" if heading else chunk["content"]
+
+
+def with_backoff(
+    fn: Callable[[], Any],
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Any:
+    """
+    Calls ``fn``, retrying rate-limit and transient API errors.
+
+    Delays grow exponentially with full jitter. A ``Retry-After`` header on
+    the error response, when present, is used as the minimum delay.
+
+    Parameters
+    ----------
+    fn : Callable[[], Any]
+        The call to make.
+    max_retries : int, optional
+        Retries before the last error is re-raised.
+    base_delay, max_delay : float, optional
+        Bounds of the exponential backoff, in seconds.
+    sleep : Callable[[float], None], optional
+        Sleep function, replaceable in tests.
+
+    Returns
+    -------
+    Any
+        The result of ``fn``.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except _RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+            response = getattr(e, "response", None)
+            retry_after = (
+                response.headers.get("retry-after") if response is not None else None
+            )
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            logger.warning(f"{type(e).__name__}; retrying in {delay:.1f}s.")
+            sleep(delay)
+
+
+def _openai_embedder(base_url: Optional[str] = None) -> EmbedFn:
+    if not base_url:
+        return create_embeddings
+    client = openai.OpenAI(base_url=base_url)
+
+    def embed(texts: list[str]) -> np.ndarray:
+        response = client.embeddings.create(input=texts, model=EMBEDDING_MODEL)
+        ordered = sorted(response.data, key=lambda item: item.index)
+        return np.array([item.embedding for item in ordered])
+
+    return embed
+
+
+def _input_fingerprint(path: str, max_chars: int) -> str:
+    digest = hashlib.sha256(f"{max_chars}\x00{EMBEDDING_MODEL}".encode())
+    paths = [path] if not os.path.isdir(path) else sorted(
+        os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+    )
+    for file_path in paths:
+        stat = os.stat(file_path)
+        digest.update(f"{file_path}\x00{stat.st_size}\x00{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def _save_batch(path: str, vectors: np.ndarray) -> None:
+    with open(f"{path}.tmp", "wb") as f:
+        np.save(f, np.asarray(vectors, dtype=np.float32))
+    os.replace(f"{path}.tmp", path)
+
+
+def ingest(
+    input_path: str,
+    output_path: str,
+    embed_fn: Optional[EmbedFn] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: int = DEFAULT_WORKERS,
+    max_chars: int = DEFAULT_CHUNK_CHARS,
+    output_format: str = "corpus",
+) -> str:
+    """
+    Builds a corpus from raw documents, resuming from any existing checkpoint.
+
+    Parameters
+    ----------
+    input_path : str
+        A JSONL file or a directory of JSONL/HTML files.
+    output_path : str
+        The corpus directory (or .npz file) to write.
+    embed_fn : EmbedFn, optional
+        Embeds a list of texts; defaults to the OpenAI embeddings endpoint.
+        Tests and load tests can pass a local stand-in.
+    batch_size : int, optional
+        Chunks per embeddings request.
+    max_workers : int, optional
+        Embeddings requests in flight at once.
+    max_chars : int, optional
+        The maximum chunk length in characters.
+    output_format : str, optional
+        "corpus" for the memory-mapped format or "npz" for a legacy file.
+
+    Returns
+    -------
+    str
+        The path of the written corpus.
+    """
+    embed_fn = embed_fn or _openai_embedder()
+    checkpoint_dir = f"{output_path.rstrip(os.sep)}.ingest"
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    state_path = os.path.join(checkpoint_dir, "state.json")
+    chunks_path = os.path.join(checkpoint_dir, "chunks.jsonl")
+    fingerprint = _input_fingerprint(input_path, max_chars)
+
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    if state.get("fingerprint") != fingerprint or state.get("batch_size") != batch_size:
+        for name in os.listdir(checkpoint_dir):
+            os.remove(os.path.join(checkpoint_dir, name))
+        count, position, batch_offsets = 0, 0, []
+        with open(chunks_path, "wb") as f:
+            for chunk in chunk_documents(read_documents(input_path), max_chars):
+                if count % batch_size == 0:
+                    batch_offsets.append(position)
+                line = (json.dumps(chunk, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                position += len(line)
+                count += 1
+        state = {
+            "fingerprint": fingerprint,
+            "batch_size": batch_size,
+            "count": count,
+            "batch_offsets": batch_offsets,
+        }
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    count = state["count"]
+    num_batches = (count + batch_size - 1) // batch_size
+
+    def batch_path(number: int) -> str:
+        return os.path.join(checkpoint_dir, f"batch_{number:06d}.npy")
+
+    pending = [n for n in range(num_batches) if not os.path.exists(batch_path(n))]
+    logger.info(
+        f"Ingesting {count} chunks in {num_batches} batches "
+        f"({num_batches - len(pending)} already done)."
+    )
+
+    def read_batch_inputs(number: int) -> list[str]:
+        size = min(batch_size, count - number * batch_size)
+        with open(chunks_path, "rb") as f:
+            f.seek(state["batch_offsets"][number])
+            return [embedding_input(json.loads(f.readline())) for _ in range(size)]
+
+    def embed_batch(number: int) -> None:
+        texts = read_batch_inputs(number)
+        vectors = with_backoff(lambda: embed_fn(texts))
+        if len(vectors) != len(texts):
+            raise ValueError(
+                f"Embedder returned {len(vectors)} vectors for {len(texts)} inputs."
+            )
+        _save_batch(batch_path(number), vectors)
+        logger.info(f"Embedded batch {number + 1}/{num_batches}.")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for future in [executor.submit(embed_batch, n) for n in pending]:
+            future.result()
+
+    return _write_output(
+        output_path, output_format, chunks_path, count, num_batches, batch_path
+    )
+
+
+def _write_output(
+    output_path: str,
+    output_format: str,
+    chunks_path: str,
+    count: int,
+    num_batches: int,
+    batch_path: Callable[[int], str],
+) -> str:
+    columns: dict[str, list[str]] = {name: [] for name in METADATA_COLUMNS}
+    with open(chunks_path, encoding="utf-8") as f:
+        for line in f:
+            chunk = json.loads(line)
+            for name in METADATA_COLUMNS:
+                columns[name].append(chunk[name])
+
+    if count == 0:
+        raise ValueError("No sections found to ingest.")
+
+    dim = np.load(batch_path(0), mmap_mode="r").shape[1]
+    embeddings_path = os.path.join(os.path.dirname(chunks_path), "embeddings.tmp")
+    embeddings = np.memmap(embeddings_path, dtype=np.float32, mode="w+",
+                           shape=(count, dim))
+    row = 0
+    for number in range(num_batches):
+        batch = np.load(batch_path(number))
+        embeddings[row:row + len(batch)] = batch
+        row += len(batch)
+    embeddings.flush()
+
+    if output_format == "npz":
+        np.savez(
+            output_path,
+            embeddings=embeddings,
+            urls=np.array(columns["url"], dtype=object),
+            titles=np.array(columns["title"], dtype=object),
+            subtitles=np.array(columns["subtitle"], dtype=object),
+            contents=np.array(columns["content"], dtype=object),
+        )
+    else:
+        write_corpus(output_path, embeddings, columns)
+
+    del embeddings
+    os.remove(embeddings_path)
+    logger.info(f"Wrote {count} sections to {output_path}.")
+    return output_path
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Command-line entry point for ``lexai ingest``.
+    """
+    parser = argparse.ArgumentParser(
+        prog="lexai ingest",
+        description="Chunk, embed and package raw jurisdiction documents.",
+    )
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the ingest options to an argument parser.
+    """
+    parser.add_argument("input", help="JSONL file or directory of JSONL/HTML files.")
+    parser.add_argument("output", help="Output corpus directory or .npz file.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_CHUNK_CHARS)
+    parser.add_argument("--format", choices=["corpus", "npz"], default="corpus")
+    parser.add_argument(
+        "--base-url", help="OpenAI-compatible API base URL (e.g. a local stand-in)."
+    )
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    Runs an ingest from parsed command-line arguments.
+    """
+    logging.basicConfig(level=logging.INFO)
+    ingest(
+        args.input,
+        args.output,
+        embed_fn=_openai_embedder(args.base_url),
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        max_chars=args.max_chars,
+        output_format=args.format,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Incremental updates for segmented corpora.
+
+Usage::
+
+    # Turn an existing corpus into a segmented one.
+    python -m lexai.tools.update_corpus init denver.segments denver.corpus
+
+    # Publish amendments: embed the changed sections with ``lexai ingest``,
+    # then add them as a delta that also tombstones the old versions.
+    lexai ingest amendments.jsonl amendments.corpus
+    python -m lexai.tools.update_corpus add denver.segments \\
+        --corpus amendments.corpus --replace
+
+    # Fold the deltas into a new base, once or periodically.
+    python -m lexai.tools.update_corpus compact denver.segments
+    python -m lexai.tools.update_corpus compact denver.segments \\
+        --watch 600 --min-deltas 8
+
+Point ``LOCATION_INFO`` at the segmented directory; the corpus registry
+reloads it whenever the segments manifest changes.
+"""
+
+import argparse
+import logging
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+
+from lexai.core.corpus_format import METADATA_COLUMNS
+from lexai.core.data_loader import load_embeddings
+from lexai.core.segments import (
+    add_delta,
+    compact,
+    create_segmented_corpus,
+    metadata_to_columns,
+    read_segments_manifest,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def add_update(
+    root: str,
+    corpus_path: Optional[str] = None,
+    delete_urls: Sequence[str] = (),
+    replace: bool = False,
+) -> str:
+    """
+    Adds a delta built from a corpus of new sections and a list of deletions.
+
+    Parameters
+    ----------
+    root : str
+        The segmented corpus directory.
+    corpus_path : str, optional
+        A .npz file or corpus directory with the added sections.
+    delete_urls : Sequence[str], optional
+        URLs whose existing sections should be removed.
+    replace : bool, optional
+        Whether to also tombstone every URL present in ``corpus_path``, so
+        the added sections replace the previous versions.
+
+    Returns
+    -------
+    str
+        The name of the new delta segment.
+    """
+    tombstones = set(delete_urls)
+    if corpus_path is None:
+        return add_delta(root, np.empty(0, dtype=np.float32), {
+            name: [] for name in METADATA_COLUMNS
+        }, tombstones)
+
+    embeddings, metadata = load_embeddings(corpus_path)
+    columns = metadata_to_columns(metadata)
+    if replace:
+        tombstones.update(columns["url"])
+    return add_delta(root, embeddings, columns, tombstones)
+
+
+def compact_periodically(root: str, interval: float, min_deltas: int) -> None:
+    """
+    Compacts ``root`` every ``interval`` seconds once it has enough deltas.
+    """
+    while True:
+        if len(read_segments_manifest(root)["deltas"]) >= min_deltas:
+            compact(root)
+        time.sleep(interval)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Command-line entry point for segmented corpus updates.
+    """
+    parser = argparse.ArgumentParser(
+        description="Create, update and compact segmented LexAI corpora."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="Create a segmented corpus.")
+    init.add_argument("root", help="Segmented corpus directory to create.")
+    init.add_argument("source", help="A .npz file or corpus directory.")
+
+    add = commands.add_parser("add", help="Add a delta segment.")
+    add.add_argument("root", help="Segmented corpus directory.")
+    add.add_argument("--corpus", help="A .npz file or corpus directory to add.")
+    add.add_argument(
+        "--delete", nargs="*", default=[], metavar="URL",
+        help="URLs whose sections should be removed.",
+    )
+    add.add_argument(
+        "--replace", action="store_true",
+        help="Remove existing sections with the same URLs as the added ones.",
+    )
+
+    comp = commands.add_parser("compact", help="Fold deltas into a new base.")
+    comp.add_argument("root", help="Segmented corpus directory.")
+    comp.add_argument(
+        "--watch", type=float, metavar="SECONDS",
+        help="Keep running and check for deltas every SECONDS.",
+    )
+    comp.add_argument(
+        "--min-deltas", type=int, default=1,
+        help="Only compact once this many deltas exist (with --watch).",
+    )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "init":
+        create_segmented_corpus(args.root, args.source)
+    elif args.command == "add":
+        add_update(args.root, args.corpus, args.delete, args.replace)
+    elif args.watch:
+        compact_periodically(args.root, args.watch, args.min_deltas)
+    else:
+        compact(args.root)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ into HTML snippets for display in the user interface.
 """
 
 from html import escape
+from typing import Any, Mapping, Sequence
 
 
 def format_legal_response(response_text: str) -> str:
@@ -28,14 +29,15 @@ def format_legal_response(response_text: str) -> str:
     )
 
 
-def format_references(matches: list[dict]) -> str:
+def format_references(matches: Sequence[Mapping[str, Any]]) -> str:
     """
     Format a list of top document matches into an HTML reference list.
 
     Parameters
     ----------
-    matches : list of dict
-        List of matched legal documents, each containing 'url', 'title', and 'subtitle'.
+    matches : sequence of MatchRecord or dict
+        Matched legal documents, each containing 'url', 'title', and 'subtitle'.
+        Matches from a cross-jurisdiction search also carry a 'jurisdiction'.
 
     Returns
     -------
@@ -50,8 +52,10 @@ def format_references(matches: list[dict]) -> str:
         url = escape(match.get("url", "#"))
         title = escape(match.get("title", "Untitled"))
         subtitle = escape(match.get("subtitle", ""))
+        jurisdiction = escape(match.get("jurisdiction", ""))
+        label = f"<strong>{jurisdiction}</strong> — " if jurisdiction else ""
         html += (
-            "<li>"
+            f"<li>{label}"
             f"<a href=\"{url}\" target=\"_blank\" rel=\"noopener noreferrer\">"
             f"{title}: {subtitle}</a></li>"
         )
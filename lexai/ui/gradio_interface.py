@@ -9,7 +9,7 @@ import logging
 
 import gradio as gr
 
-from lexai.config import LOCATION_INFO
+from lexai.config import LOCATION_INFO, STREAM_RESPONSES
 from lexai.services.lexai_service import LexAIService
 
 logger = logging.getLogger(__name__)
@@ -38,21 +38,32 @@ DISCLAIMER_TEXT = (
 )
 
 EXAMPLE_QUERIES = [
-    ["Can I build a backyard fire pit at my home?", "Denver"],
-    ["What permits are required to build an accessory dwelling unit (ADU)?", "Boulder"],
-    ["Are there restrictions on short-term rentals (e.g., Airbnb)?", "Denver"],
-    ["What are the setback requirements for residential construction?", "Boulder"],
-    ["Is a fence over 6 feet allowed without a permit?", "Denver"],
-    ["Can I run a home-based business from my residence?", "Boulder"],
+    ["Can I build a backyard fire pit at my home?", ["Denver"]],
+    [
+        "What permits are required to build an accessory dwelling unit (ADU)?",
+        ["Boulder"],
+    ],
+    ["Are there restrictions on short-term rentals (e.g., Airbnb)?", ["Denver"]],
+    ["What are the setback requirements for residential construction?", ["Boulder"]],
+    ["Is a fence over 6 feet allowed without a permit?", ["Denver"]],
+    ["Can I run a home-based business from my residence?", ["Boulder"]],
 ]
 
 
-def build_interface():
+def build_interface(queue: bool = True):
     """
     Constructs and returns the Gradio Blocks interface for LexAI.
 
     This includes input fields for the user's legal query and location,
     a response display area, and sample example queries.
+
+    Parameters
+    ----------
+    queue : bool, optional
+        Whether queries go through Gradio's queue. Its state lives in one
+        process, so multi-process serving turns it off: each query is then a
+        single request that any worker can answer, and responses are not
+        streamed.
     """
     with gr.Blocks(title="LexAI") as iface:
         gr.Markdown("<div style='text-align: center'><h1>LexAI</h1></div>")
@@ -68,7 +79,9 @@ def build_interface():
                 location_input = gr.Dropdown(
                     choices=list(LOCATION_INFO.keys()),
                     label="Location",
-                    value=list(LOCATION_INFO.keys())[0]
+                    value=[list(LOCATION_INFO.keys())[0]],
+                    multiselect=True,
+                    info="Select several jurisdictions to search them together."
                 )
                 with gr.Row():
                     clear_btn = gr.Button("Clear", variant="secondary")
@@ -81,20 +94,31 @@ def build_interface():
                 )
                 gr.Button("Flag", variant="secondary")
 
-        def handle_submit(query, location):
-            return gr.update(value=LexAIService.handle_query(query, location))
+        async def handle_submit(query, location):
+            response = await LexAIService.handle_query_async(query, location)
+            return gr.update(value=response)
+
+        async def handle_submit_stream(query, location):
+            async for response in LexAIService.stream_query_async(query, location):
+                yield gr.update(value=response)
 
         def handle_clear():
             return gr.update(value="Response will appear here.")
 
+        # The handler is async, so many queries can be in flight on the event
+        # loop at once without tying up a worker thread each. Admission
+        # control in LexAIService bounds how many are answered at once.
         submit_btn.click(
-            fn=handle_submit,
+            fn=handle_submit_stream if STREAM_RESPONSES and queue else handle_submit,
             inputs=[query_input, location_input],
-            outputs=[response_output]
+            outputs=[response_output],
+            queue=queue,
+            concurrency_limit=None,
         )
         clear_btn.click(
             fn=handle_clear,
-            outputs=[response_output]
+            outputs=[response_output],
+            queue=queue,
         )
 
         gr.Examples(
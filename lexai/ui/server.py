@@ -0,0 +1,102 @@
+"""
+ASGI application serving the LexAI interface and its metrics.
+
+The Gradio interface is mounted at ``/`` on a FastAPI application, which
+also exposes ``/metrics`` in the Prometheus text exposition format and a JSON
+query endpoint, ``POST /api/query``, for scripts and load tests. Queries to
+the endpoint go through admission control, and a query that is turned away
+gets a 503 response with a ``Retry-After`` header.
+
+``create_worker_app`` is the application factory for the worker processes
+of ``lexai serve --workers N``.
+"""
+
+import logging
+from typing import Union
+
+import gradio as gr
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+
+from lexai.core.corpus_registry import corpus_registry
+from lexai.core.match_engine import generate_matches_async, warm_up
+from lexai.services import openai_client
+from lexai.services.admission import Overloaded, admission
+from lexai.services.metrics import record_error, registry
+from lexai.ui.gradio_interface import build_interface
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+RETRY_AFTER_SECONDS = 1
+
+
+class QueryRequest(BaseModel):
+    """Body of a ``POST /api/query`` request."""
+
+    query: str
+    location: Union[str, list[str]]
+
+
+def create_app(interface: gr.Blocks = None) -> FastAPI:
+    """
+    Builds the ASGI application for LexAI.
+
+    Parameters
+    ----------
+    interface : gr.Blocks, optional
+        The Gradio interface to mount; built with ``build_interface`` if
+        omitted.
+
+    Returns
+    -------
+    FastAPI
+        An application serving the interface at ``/``, the request metrics
+        at ``/metrics`` and the JSON query endpoint at ``/api/query``.
+    """
+    app = FastAPI(title="LexAI")
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics() -> PlainTextResponse:
+        return PlainTextResponse(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+    @app.post("/api/query", response_model=None)
+    async def query(request: QueryRequest) -> Union[dict, JSONResponse]:
+        try:
+            async with admission.admit(request.location):
+                result = await generate_matches_async(request.query, request.location)
+        except Overloaded as e:
+            record_error(e)
+            return JSONResponse(
+                {"error": str(e)},
+                status_code=503,
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+        if "matches" in result:
+            result["matches"] = [dict(match) for match in result["matches"]]
+        return result
+
+    return gr.mount_gradio_app(app, interface or build_interface(), path="/")
+
+
+def create_worker_app() -> FastAPI:
+    """
+    Builds the application in one worker process of ``lexai serve --workers N``.
+
+    The worker maps and warms up every corpus (staged for sharing by the
+    supervisor, see ``lexai.core.shared_corpus``) before it starts accepting
+    connections. The interface is built without Gradio's queue, so that
+    consecutive requests of one query may be served by different workers.
+    The worker also starts sharing its metrics with the other workers.
+
+    Returns
+    -------
+    FastAPI
+        The worker's application.
+    """
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    warm_up()
+    openai_client.warm_up()
+    corpus_registry.start_watcher()
+    registry.start_flusher()
+    return create_app(build_interface(queue=False))
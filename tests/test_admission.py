@@ -0,0 +1,160 @@
+"""
+Tests for admission control in lexai.services.admission.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from lexai.services.admission import (
+    IN_FLIGHT,
+    QUEUE_DEPTH,
+    REJECTIONS,
+    AdmissionController,
+    Limiter,
+    Overloaded,
+)
+
+
+def test_limiter_rejects_when_the_queue_is_full():
+    limiter = Limiter("test_full", limit=1, max_waiting=0, timeout=1)
+    limiter.acquire()
+
+    with pytest.raises(Overloaded) as excinfo:
+        limiter.acquire()
+
+    assert excinfo.value.reason == "queue_full"
+    assert REJECTIONS.value(pool="test_full", reason="queue_full") == 1
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+def test_limiter_times_out_waiting_threads():
+    limiter = Limiter("test_timeout", limit=1, timeout=0.01)
+    limiter.acquire()
+
+    start = time.monotonic()
+    with pytest.raises(Overloaded, match="timeout"):
+        limiter.acquire()
+
+    assert time.monotonic() - start >= 0.01
+    assert limiter.waiting == 0
+
+
+def test_limiter_hands_slots_to_waiting_threads_in_order():
+    limiter = Limiter("test_threads", limit=1, timeout=5)
+    limiter.acquire()
+    order = []
+
+    def worker(name):
+        with limiter.slot():
+            order.append(name)
+
+    threads = []
+    for name in ("first", "second"):
+        threads.append(threading.Thread(target=worker, args=(name,)))
+        threads[-1].start()
+        while limiter.waiting < len(threads):
+            time.sleep(0.001)
+    assert QUEUE_DEPTH.value(pool="test_threads") == 2
+
+    limiter.release()
+    for thread in threads:
+        thread.join()
+
+    assert order == ["first", "second"]
+    assert limiter.in_flight == 0
+    assert IN_FLIGHT.value(pool="test_threads") == 0
+
+
+def test_limiter_bounds_concurrent_tasks():
+    limiter = Limiter("test_tasks", limit=2, timeout=5)
+    active = peak = 0
+
+    async def task():
+        nonlocal active, peak
+        async with limiter.slot_async():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.001)
+            active -= 1
+
+    async def run():
+        await asyncio.gather(*(task() for _ in range(10)))
+
+    asyncio.run(run())
+
+    assert peak == 2
+    assert limiter.in_flight == 0 and limiter.waiting == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    limiter = Limiter("test_cancel", limit=1, timeout=5)
+
+    async def run():
+        await limiter.acquire_async()
+        waiter = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+
+    asyncio.run(run())
+
+    assert limiter.in_flight == 0 and limiter.waiting == 0
+
+
+def test_zero_limit_admits_everything():
+    limiter = Limiter("test_unlimited", limit=0, max_waiting=0)
+    for _ in range(5):
+        limiter.acquire()
+
+    assert limiter.in_flight == 5
+
+
+def test_admission_limits_each_jurisdiction():
+    controller = AdmissionController(
+        max_concurrent=10, max_queue=10, timeout=0.01, jurisdiction_limit=1
+    )
+
+    async def run():
+        async with controller.admit("Denver"):
+            async with controller.admit(["Boulder", "Unknown"]):
+                assert controller.requests.in_flight == 2
+            with pytest.raises(Overloaded) as excinfo:
+                async with controller.admit(["Boulder", "Denver"]):
+                    pass
+            return excinfo.value
+
+    error = asyncio.run(run())
+
+    assert error.pool == "jurisdiction:Denver"
+    assert controller.requests.in_flight == 0
+    assert controller.jurisdictions["Boulder"].in_flight == 0
+
+
+def test_saturated_jurisdiction_does_not_block_others():
+    controller = AdmissionController(
+        max_concurrent=2, max_queue=10, timeout=5, jurisdiction_limit=1
+    )
+
+    async def run():
+        async with controller.admit("Denver"):
+            waiting = asyncio.create_task(controller.admit("Denver").__aenter__())
+            await asyncio.sleep(0)
+            assert controller.jurisdictions["Denver"].waiting == 1
+            # The waiting Denver query holds no global slot, so Boulder gets one.
+            async with controller.admit("Boulder"):
+                assert controller.requests.in_flight == 2
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+
+    asyncio.run(run())
+
+    assert controller.requests.in_flight == 0
+    assert controller.jurisdictions["Denver"].in_flight == 0
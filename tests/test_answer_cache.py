@@ -0,0 +1,57 @@
+"""
+Tests for the semantic answer cache in lexai.core.answer_cache.
+"""
+
+import numpy as np
+
+from lexai.core.answer_cache import SemanticAnswerCache
+
+
+def test_similar_query_with_same_sections_hits():
+    cache = SemanticAnswerCache(capacity=4, threshold=0.95)
+    cache.store("Denver", np.array([1.0, 0.0]), (1, 2, 3), "Answer")
+
+    assert cache.lookup("Denver", np.array([1.0, 0.05]), (1, 2, 3)) == "Answer"
+    assert cache.stats.hits == 1
+
+
+def test_dissimilar_query_or_different_sections_misses():
+    cache = SemanticAnswerCache(capacity=4, threshold=0.95)
+    cache.store("Denver", np.array([1.0, 0.0]), (1, 2, 3), "Answer")
+
+    assert cache.lookup("Denver", np.array([1.0, 1.0]), (1, 2, 3)) is None
+    assert cache.lookup("Denver", np.array([1.0, 0.0]), (1, 2, 4)) is None
+    assert cache.lookup("Boulder", np.array([1.0, 0.0]), (1, 2, 3)) is None
+    assert cache.stats.misses == 3
+
+
+def test_capacity_evicts_least_recently_used():
+    cache = SemanticAnswerCache(capacity=2, threshold=0.95)
+    cache.store("Denver", np.array([1.0, 0.0]), (1,), "A")
+    cache.store("Denver", np.array([0.0, 1.0]), (2,), "B")
+    cache.lookup("Denver", np.array([1.0, 0.0]), (1,))
+    cache.store("Denver", np.array([1.0, 1.0]), (3,), "C")
+
+    assert len(cache) == 2
+    assert cache.lookup("Denver", np.array([0.0, 1.0]), (2,)) is None
+    assert cache.lookup("Denver", np.array([1.0, 0.0]), (1,)) == "A"
+
+
+def test_invalidate_drops_only_that_location():
+    cache = SemanticAnswerCache(capacity=4, threshold=0.95)
+    cache.store("Denver", np.array([1.0, 0.0]), (1,), "D")
+    cache.store("Boulder", np.array([1.0, 0.0]), (1,), "B")
+
+    cache.invalidate("Denver")
+
+    assert cache.lookup("Denver", np.array([1.0, 0.0]), (1,)) is None
+    assert cache.lookup("Boulder", np.array([1.0, 0.0]), (1,)) == "B"
+
+
+def test_invalidate_drops_fan_out_entries_involving_location():
+    cache = SemanticAnswerCache(capacity=4, threshold=0.95)
+    cache.store(("Boulder", "Denver"), np.array([1.0, 0.0]), (1,), "BD")
+
+    cache.invalidate("Denver")
+
+    assert cache.lookup(("Boulder", "Denver"), np.array([1.0, 0.0]), (1,)) is None
@@ -0,0 +1,195 @@
+"""
+Tests for the headless bulk query runner in lexai.tools.batch.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import openai
+import pytest
+
+from lexai.core.metadata_store import MatchRecord
+from lexai.services.admission import Overloaded
+from lexai.services.metrics import span
+from lexai.tools.batch import (
+    CompletedLines,
+    RateLimiter,
+    read_completed_lines,
+    run_batch,
+)
+
+
+class FakeAnswerer:
+    """Local stand-in for generate_matches_async that tracks concurrency."""
+
+    def __init__(self, fail_on=None):
+        self.queries = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_on = fail_on
+
+    async def __call__(self, query, location):
+        self.queries.append(query)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            with span("completion"):
+                await asyncio.sleep(0.001)
+            if query == self.fail_on:
+                return {"error_html": "<p><strong>Error:</strong> A &amp; B</p>"}
+            return {
+                "response": f"Answer to {query}",
+                "matches": [MatchRecord("u", "Sec. 1", "Zoning", "Text")],
+            }
+        finally:
+            self.in_flight -= 1
+
+
+def write_input(path: Path, records: list) -> Path:
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(record if isinstance(record, str) else json.dumps(record))
+            f.write("\n")
+    return path
+
+
+def read_output(path: Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_run_batch_writes_results_references_and_timings(tmp_path: Path):
+    records = [{"query": f"Q{i}?", "location": "Boulder"} for i in range(20)]
+    input_path = write_input(tmp_path / "in.jsonl", records)
+    output_path = tmp_path / "out.jsonl"
+    answerer = FakeAnswerer()
+
+    counts = asyncio.run(run_batch(
+        str(input_path), str(output_path), concurrency=4, answer_fn=answerer
+    ))
+
+    assert counts == {"answered": 20, "failed": 0, "skipped": 0, "deferred": 0}
+    assert answerer.max_in_flight <= 4
+    rows = sorted(read_output(output_path), key=lambda row: row["line"])
+    assert [row["line"] for row in rows] == list(range(1, 21))
+    first = rows[0]
+    assert first["query"] == "Q0?" and first["location"] == "Boulder"
+    assert first["response"] == "Answer to Q0?"
+    assert first["references"] == [
+        {"url": "u", "title": "Sec. 1", "subtitle": "Zoning", "content": "Text"}
+    ]
+    assert "completion" in first["stages_ms"]
+    assert first["duration_ms"] >= first["stages_ms"]["completion"]
+
+
+def test_run_batch_records_invalid_lines_and_failures(tmp_path: Path):
+    input_path = write_input(tmp_path / "in.jsonl", [
+        {"query": "ok?", "location": ["Boulder", "Denver"]},
+        "not json",
+        {"query": "", "location": "Boulder"},
+        "",
+        {"query": "bad?", "location": "Boulder"},
+    ])
+    output_path = tmp_path / "out.jsonl"
+
+    counts = asyncio.run(run_batch(
+        str(input_path), str(output_path), answer_fn=FakeAnswerer(fail_on="bad?")
+    ))
+
+    assert counts == {"answered": 1, "failed": 3, "skipped": 1, "deferred": 0}
+    rows = {row["line"]: row for row in read_output(output_path)}
+    assert rows[1]["location"] == ["Boulder", "Denver"]
+    assert rows[2]["error"].startswith("Invalid record")
+    assert rows[3]["error"].startswith("Invalid record")
+    assert 4 not in rows
+    assert rows[5]["error"] == "Error: A & B"
+
+
+def test_run_batch_resumes_after_a_crash(tmp_path: Path):
+    records = [{"query": f"Q{i}?", "location": "Boulder"} for i in range(6)]
+    input_path = write_input(tmp_path / "in.jsonl", records)
+    output_path = tmp_path / "out.jsonl"
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"line": 2, "response": "earlier"}) + "\n")
+        f.write(json.dumps({"line": 1, "response": "earlier"}) + "\n")
+        f.write('{"line": 3, "resp')  # interrupted write
+    answerer = FakeAnswerer()
+
+    counts = asyncio.run(run_batch(
+        str(input_path), str(output_path), answer_fn=answerer
+    ))
+
+    assert counts == {"answered": 4, "failed": 0, "skipped": 2, "deferred": 0}
+    assert sorted(answerer.queries) == ["Q2?", "Q3?", "Q4?", "Q5?"]
+    rows = read_output(output_path)
+    assert sorted(row["line"] for row in rows) == [1, 2, 3, 4, 5, 6]
+
+
+def test_run_batch_leaves_transient_failures_for_the_restart(tmp_path: Path):
+    records = [{"query": f"Q{i}?", "location": "Boulder"} for i in range(4)]
+    input_path = write_input(tmp_path / "in.jsonl", records)
+    output_path = tmp_path / "out.jsonl"
+    answerer = FakeAnswerer()
+    rate_limited = openai.RateLimitError(
+        "slow down", response=MagicMock(status_code=429, headers={}), body=None
+    )
+
+    async def flaky(query, location):
+        if query == "Q1?":
+            raise Overloaded("requests", "timeout")
+        if query == "Q2?":
+            raise rate_limited
+        if query == "Q3?":
+            return {"error_html": "<p>Busy</p>", "retryable": True}
+        return await answerer(query, location)
+
+    counts = asyncio.run(run_batch(
+        str(input_path), str(output_path), answer_fn=flaky
+    ))
+    assert counts == {"answered": 1, "failed": 0, "skipped": 0, "deferred": 3}
+    assert [row["line"] for row in read_output(output_path)] == [1]
+
+    counts = asyncio.run(run_batch(
+        str(input_path), str(output_path), answer_fn=answerer
+    ))
+    assert counts == {"answered": 3, "failed": 0, "skipped": 1, "deferred": 0}
+    rows = read_output(output_path)
+    assert sorted(row["line"] for row in rows) == [1, 2, 3, 4]
+    assert not any("error" in row for row in rows)
+
+
+def test_read_completed_lines_rejects_foreign_output(tmp_path: Path):
+    output_path = tmp_path / "out.jsonl"
+    output_path.write_text('{"answer": 1}\n', encoding="utf-8")
+
+    with pytest.raises(ValueError, match="not a batch result"):
+        read_completed_lines(str(output_path))
+
+
+def test_completed_lines_keeps_only_out_of_order_lines():
+    completed = CompletedLines()
+    for line in (3, 1, 5, 2):
+        completed.add(line)
+
+    assert completed.watermark == 4
+    assert completed._above == {5}
+    assert completed.count == 4
+    assert all(line in completed for line in (1, 2, 3, 5))
+    assert 4 not in completed and 6 not in completed
+
+
+def test_rate_limiter_spaces_starts():
+    async def starts():
+        limiter = RateLimiter(rate=200)
+        loop = asyncio.get_running_loop()
+        times = []
+        for _ in range(5):
+            await limiter.wait()
+            times.append(loop.time())
+        return times
+
+    times = asyncio.run(starts())
+
+    assert times[-1] - times[0] >= 4 / 200 * 0.9
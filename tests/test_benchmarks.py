@@ -0,0 +1,95 @@
+"""
+Tests for the benchmark harness in benchmarks/.
+"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.load import run_level, run_sweep
+from benchmarks.report import compare_results, summarize_latencies
+from benchmarks.run import STAGES, run_benchmarks
+
+
+def test_summarize_latencies_reports_percentiles_in_ms():
+    summary = summarize_latencies([0.001 * i for i in range(1, 101)])
+    assert summary["count"] == 100
+    assert summary["p50_ms"] == pytest.approx(50.5)
+    assert summary["p99_ms"] == pytest.approx(99.01)
+    assert summarize_latencies([]) == {"count": 0}
+
+
+def test_compare_results_flags_direction_aware_regressions():
+    baseline = {"results": {"1000": {"search": {
+        "p95_ms": 10.0, "throughput_per_s": 100.0, "mean_ms": 1.0, "count": 5,
+    }}}}
+    current = {"results": {"1000": {"search": {
+        "p95_ms": 12.0, "throughput_per_s": 80.0, "mean_ms": 5.0, "count": 50,
+    }}}}
+
+    regressions = compare_results(current, baseline, tolerance=0.1)
+
+    assert len(regressions) == 2
+    assert any("p95_ms" in line for line in regressions)
+    assert any("throughput_per_s" in line for line in regressions)
+    assert compare_results(current, baseline, tolerance=0.5) == []
+
+
+def test_compare_results_ignores_sub_threshold_latency_noise():
+    baseline = {"results": {"1": {"load": {"p50_ms": 0.2}}}}
+    current = {"results": {"1": {"load": {"p50_ms": 0.4}}}}
+    assert compare_results(current, baseline) == []
+
+
+def test_run_benchmarks_small_corpus(tmp_path):
+    results = run_benchmarks(
+        [50],
+        dim=16,
+        queries=4,
+        load_repeats=1,
+        batch_size=2,
+        concurrency=2,
+        embedding_latency=0,
+        chat_latency=0,
+        data_dir=str(tmp_path),
+        isolate=False,
+    )
+
+    stages = results["results"]["50"]
+    assert list(stages) == list(STAGES)
+    assert stages["corpus_search"]["count"] == 4
+    assert stages["e2e"]["concurrent_throughput_per_s"] > 0
+    assert results["meta"]["dim"] == 16
+
+
+def test_run_level_paces_requests_and_counts_errors():
+    calls = []
+
+    async def send(query):
+        calls.append(query)
+        ok = len(calls) % 4 != 0
+        await asyncio.sleep(0.001)
+        return ok
+
+    level = asyncio.run(
+        run_level(send, ["a", "b"], qps=200, duration=0.1, poisson=False)
+    )
+
+    assert level["sent"] == 20
+    assert level["errors"] == 5
+    assert level["error_rate"] == pytest.approx(0.25)
+    assert calls[:2] == ["a", "b"]
+
+
+def test_run_sweep_stops_at_first_saturated_level():
+    async def send(query):
+        await asyncio.sleep(0.03)
+        return True
+
+    results = asyncio.run(
+        run_sweep(send, ["q"], [20, 40, 80], duration=0.1, slo_ms=20)
+    )
+
+    assert len(results["levels"]) == 1
+    assert results["levels"][0]["saturated"]
+    assert results["max_sustainable_qps"] == 0
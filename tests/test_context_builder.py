@@ -0,0 +1,53 @@
+"""
+Tests for the token-budgeted context builder in lexai.core.context_builder.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from lexai.core.context_builder import build_context, count_tokens
+
+
+@pytest.fixture(autouse=True)
+def approximate_tokens():
+    """Use the deterministic fallback tokenizer regardless of tiktoken."""
+    with patch("lexai.core.context_builder._get_encoding", return_value=None):
+        yield
+
+
+def make_match(title, content):
+    return {
+        "url": f"https://example.com/{title}",
+        "title": title,
+        "subtitle": "Sub",
+        "content": content,
+    }
+
+
+def test_renders_compact_blocks_without_urls():
+    context = build_context([make_match("A", "alpha  text"), make_match("B", "beta")])
+    assert context == "[1] A: Sub\nalpha text\n\n[2] B: Sub\nbeta"
+    assert "https://" not in context
+
+
+def test_truncates_first_section_that_does_not_fit_and_drops_the_rest():
+    long_content = " ".join(f"word{i}" for i in range(500))
+    matches = [make_match("A", "short"), make_match("B", long_content),
+               make_match("C", "never included")]
+
+    context = build_context(matches, token_budget=60)
+
+    assert count_tokens(context) <= 60
+    assert context.startswith("[1] A: Sub\nshort\n\n[2] B: Sub\nword0 word1")
+    assert context.endswith("…")
+    assert "[3]" not in context
+
+
+def test_empty_budget_yields_empty_context():
+    assert build_context([make_match("A", "alpha")], token_budget=0) == ""
+
+
+def test_heading_includes_jurisdiction_for_fan_out_matches():
+    match = {**make_match("A", "alpha"), "jurisdiction": "Boulder"}
+    assert build_context([match]) == "[1] (Boulder) A: Sub\nalpha"
@@ -0,0 +1,109 @@
+"""
+Tests for the memory-mapped corpus format and the .npz converter.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from lexai.core.corpus_format import open_corpus, write_corpus
+from lexai.core.data_loader import load_embeddings
+from lexai.core.matcher import find_top_matches
+from lexai.core.metadata_store import MetadataStore
+from lexai.tools.convert import convert_npz
+
+
+@pytest.fixture
+def npz_file(tmp_path: Path) -> Path:
+    file_path = tmp_path / "test_data.npz"
+    np.savez(
+        file_path,
+        embeddings=np.eye(4, 8),
+        urls=["https://a.com", "https://b.com", "https://c.com", "https://d.com"],
+        titles=["A", "B", "C", "D"],
+        subtitles=["a", "b", "c", "d"],
+        contents=["alpha", "béta", "", "delta § 9-7-5"],
+    )
+    return file_path
+
+
+def test_convert_round_trip(npz_file, tmp_path):
+    """Converted corpora preserve embeddings and every metadata value."""
+    output_dir = convert_npz(str(npz_file), str(tmp_path / "test.corpus"))
+    embeddings, metadata = open_corpus(output_dir)
+
+    assert isinstance(embeddings, np.memmap)
+    assert embeddings.dtype == np.float32
+    np.testing.assert_array_equal(embeddings, np.eye(4, 8))
+    assert isinstance(metadata, MetadataStore)
+    assert metadata.shape == (4, 4)
+    assert metadata.columns["content"].tolist() == [
+        "alpha", "béta", "", "delta § 9-7-5"
+    ]
+
+
+def test_default_output_path(npz_file):
+    output_dir = convert_npz(str(npz_file))
+    assert output_dir.endswith("test_data.corpus")
+    assert Path(output_dir, "corpus.json").exists()
+
+
+def test_load_embeddings_dispatches_to_corpus_dir(npz_file, tmp_path):
+    output_dir = convert_npz(str(npz_file), str(tmp_path / "test.corpus"))
+    embeddings, metadata = load_embeddings(output_dir)
+    assert embeddings.shape == (4, 8)
+    assert len(metadata) == 4
+
+
+def test_find_top_matches_on_mapped_corpus(npz_file, tmp_path):
+    output_dir = convert_npz(str(npz_file), str(tmp_path / "test.corpus"))
+    embeddings, metadata = open_corpus(output_dir)
+    query = np.zeros(8, dtype=np.float32)
+    query[1] = 1.0
+
+    matches = find_top_matches(query, embeddings, metadata, num_matches=1)
+    assert matches == [
+        {"url": "https://b.com", "title": "B", "subtitle": "b", "content": "béta"}
+    ]
+
+
+def test_empty_corpus(tmp_path):
+    output_dir = tmp_path / "empty.corpus"
+    columns = {name: [] for name in ("url", "title", "subtitle", "content")}
+    write_corpus(str(output_dir), np.empty((0, 8)), columns)
+
+    embeddings, metadata = open_corpus(str(output_dir))
+    assert embeddings.shape == (0, 8)
+    assert metadata.empty
+
+
+def test_write_rejects_mismatched_columns(tmp_path):
+    with pytest.raises(ValueError, match="Column 'url'"):
+        write_corpus(str(tmp_path / "bad"), np.zeros((2, 4)), {"url": ["x"]})
+
+
+def test_rewrite_leaves_mapped_readers_intact(tmp_path):
+    def columns(count, text):
+        fields = ("url", "title", "subtitle", "content")
+        return {name: [text] * count for name in fields}
+
+    output_dir = str(tmp_path / "c.corpus")
+    write_corpus(output_dir, np.ones((2, 4)), columns(2, "old"))
+    mapped, metadata = open_corpus(output_dir)
+
+    write_corpus(output_dir, np.zeros((3, 4)), columns(3, "new"))
+
+    np.testing.assert_array_equal(mapped, np.ones((2, 4)))
+    assert metadata.columns["content"].tolist() == ["old", "old"]
+    embeddings, _ = open_corpus(output_dir)
+    assert embeddings.shape == (3, 4)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["c.corpus"]
+
+
+def test_write_refuses_to_replace_other_directories(tmp_path):
+    (tmp_path / "notes.txt").write_text("keep me")
+
+    with pytest.raises(FileExistsError):
+        write_corpus(str(tmp_path), np.zeros((1, 4)), {"url": ["x"]})
+    assert (tmp_path / "notes.txt").exists()
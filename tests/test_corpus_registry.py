@@ -0,0 +1,97 @@
+"""
+Tests for the resident corpus registry in lexai.core.corpus_registry.
+"""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from lexai.core.corpus_registry import Corpus, CorpusRegistry
+from lexai.core.metadata_store import MetadataStore
+
+
+def write_corpus(path: Path, num_rows: int) -> None:
+    np.savez(
+        path,
+        embeddings=np.random.rand(num_rows, 8),
+        urls=[f"https://example.com/{i}" for i in range(num_rows)],
+        titles=[f"Title {i}" for i in range(num_rows)],
+        subtitles=[f"Subtitle {i}" for i in range(num_rows)],
+        contents=[f"Content {i}" for i in range(num_rows)],
+    )
+
+
+@pytest.fixture
+def corpus_file(tmp_path: Path) -> Path:
+    file_path = tmp_path / "corpus.npz"
+    write_corpus(file_path, 3)
+    return file_path
+
+
+@pytest.fixture
+def registry(corpus_file: Path) -> CorpusRegistry:
+    return CorpusRegistry({"Test": {"npz_file": str(corpus_file)}}, check_interval=0)
+
+
+def test_get_returns_same_instance_when_unchanged(registry):
+    """The corpus is loaded once and reused while the file is unchanged."""
+    first = registry.get("Test")
+    second = registry.get("Test")
+    assert first is second
+    assert len(first) == 3
+
+
+def test_get_reloads_when_file_changes(registry, corpus_file):
+    """A modified corpus file is swapped in and listeners are notified."""
+    reloaded = []
+    registry.add_reload_listener(reloaded.append)
+    first = registry.get("Test")
+
+    write_corpus(corpus_file, 5)
+    stat = os.stat(corpus_file)
+    os.utime(corpus_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    second = registry.get("Test")
+    assert second is not first
+    assert len(second) == 5
+    assert len(first) == 3
+    assert reloaded == [first, second]
+
+
+def test_load_without_index_files_does_not_hash_the_corpus(corpus_file):
+    with patch.object(MetadataStore, "digest") as digest:
+        Corpus.load("Test", str(corpus_file))
+
+    digest.assert_not_called()
+
+
+def test_keeps_resident_copy_when_file_disappears(registry, corpus_file):
+    """A deleted corpus file does not evict the resident copy."""
+    first = registry.get("Test")
+    corpus_file.unlink()
+    assert registry.get("Test") is first
+
+
+def test_keeps_resident_copy_when_reload_fails(registry, corpus_file):
+    """A half-written corpus file does not fail requests."""
+    first = registry.get("Test")
+    corpus_file.write_bytes(b"PK\x03\x04 truncated")
+
+    assert registry.get("Test") is first
+
+    write_corpus(corpus_file, 5)
+    assert len(registry.get("Test")) == 5
+
+
+def test_unknown_location_raises(registry):
+    with pytest.raises(KeyError):
+        registry.get("Nowhere")
+
+
+def test_missing_file_raises(tmp_path):
+    registry = CorpusRegistry({"Test": {"npz_file": str(tmp_path / "missing.npz")}})
+    with pytest.raises(FileNotFoundError):
+        registry.get("Test")
@@ -1,10 +1,10 @@
 from pathlib import Path
 
 import numpy as np
-import pandas as pd
 import pytest
 
 from lexai.core.data_loader import load_embeddings
+from lexai.core.metadata_store import MatchRecord, MetadataStore
 
 
 @pytest.fixture
@@ -41,9 +41,15 @@ def test_load_embeddings_success(temp_npz_file):
     embeddings, metadata = load_embeddings(temp_npz_file)
     assert isinstance(embeddings, np.ndarray)
     assert embeddings.shape == (4, 768)
-    assert isinstance(metadata, pd.DataFrame)
+    assert isinstance(metadata, MetadataStore)
     assert list(metadata.columns) == ["url", "title", "subtitle", "content"]
     assert metadata.shape == (4, 4)
+    [record] = metadata.take([1])
+    assert isinstance(record, MatchRecord)
+    assert record.url == "https://b.com"
+    assert dict(record) == {
+        "url": "https://b.com", "title": "B", "subtitle": "b", "content": "beta"
+    }
 
 
 def test_load_embeddings_missing_key(broken_npz_missing_embeddings):
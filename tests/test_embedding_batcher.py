@@ -0,0 +1,72 @@
+"""
+Tests for the embedding request coalescer in lexai.services.embedding_batcher.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from lexai.services.embedding_batcher import EmbeddingCoalescer
+
+
+class RecordingEmbedder:
+    """Returns one-hot-ish vectors and records every batch it receives."""
+
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        return np.array([[len(text), 1.0] for text in texts])
+
+
+def test_concurrent_requests_share_one_call():
+    embedder = RecordingEmbedder()
+    coalescer = EmbeddingCoalescer(embedder, window=0.2, max_batch_size=8)
+    texts = ["a", "bb", "ccc", "bb"]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(coalescer.embed, texts))
+
+    assert len(embedder.batches) == 1
+    assert sorted(embedder.batches[0]) == ["a", "bb", "ccc"]
+    assert [vector[0] for vector in results] == [1, 2, 3, 2]
+
+
+def test_max_batch_size_splits_batches():
+    embedder = RecordingEmbedder()
+    coalescer = EmbeddingCoalescer(embedder, window=0.2, max_batch_size=2)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(coalescer.embed, ["a", "b", "c", "d"]))
+
+    assert all(len(batch) <= 2 for batch in embedder.batches)
+    assert sum(len(batch) for batch in embedder.batches) == 4
+
+
+def test_async_callers_are_batched():
+    embedder = RecordingEmbedder()
+    coalescer = EmbeddingCoalescer(embedder, window=0.2, max_batch_size=8)
+
+    async def run():
+        return await asyncio.gather(
+            coalescer.embed_async("x"), coalescer.embed_async("yy")
+        )
+
+    first, second = asyncio.run(run())
+    assert len(embedder.batches) == 1
+    assert (first[0], second[0]) == (1, 2)
+
+
+def test_errors_propagate_to_every_caller():
+    def failing(texts):
+        raise RuntimeError("rate limited")
+
+    coalescer = EmbeddingCoalescer(failing, window=0.01, max_batch_size=8)
+    with pytest.raises(RuntimeError, match="rate limited"):
+        coalescer.embed("a")
@@ -0,0 +1,110 @@
+"""
+Tests for the two-tier query-embedding cache in lexai.services.embedding_cache.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from lexai.services.embedding_cache import (
+    EmbeddingCache,
+    LRUEmbeddingCache,
+    SQLiteEmbeddingStore,
+    cache_key,
+)
+
+
+@pytest.fixture
+def disk_store(tmp_path: Path) -> SQLiteEmbeddingStore:
+    return SQLiteEmbeddingStore(str(tmp_path / "embeddings.sqlite"))
+
+
+def test_cache_key_normalizes_text_and_includes_model():
+    assert cache_key("m", "Fire  pit?") == cache_key("m", " fire pit? ")
+    assert cache_key("m", "fire pit?") != cache_key("other", "fire pit?")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUEmbeddingCache(max_size=2)
+    cache.put("a", np.ones(2))
+    cache.put("b", np.ones(2))
+    cache.get("a")
+    cache.put("c", np.ones(2))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats.evictions == 1
+
+
+def test_lru_expires_entries_after_ttl():
+    cache = LRUEmbeddingCache(max_size=2, ttl=10)
+    with patch("lexai.services.embedding_cache.time.time", return_value=100.0):
+        cache.put("a", np.ones(2))
+    with patch("lexai.services.embedding_cache.time.time", return_value=111.0):
+        assert cache.get("a") is None
+
+
+def test_disk_store_round_trip_and_limit(disk_store):
+    disk_store.max_entries = 1
+    disk_store.put("a", np.array([1.0, 2.0]))
+    np.testing.assert_array_equal(disk_store.get("a"), [1.0, 2.0])
+
+    disk_store.put("b", np.array([3.0, 4.0]))
+    disk_store.evict()
+    assert disk_store.get("a") is None
+    assert disk_store.get("b") is not None
+
+
+def test_two_tier_cache_promotes_disk_hits(disk_store):
+    cache = EmbeddingCache(LRUEmbeddingCache(max_size=4), disk_store)
+    cache.put("model", "query", np.array([0.5, 0.5]))
+    cache.memory.clear()
+
+    np.testing.assert_array_equal(cache.get("model", "Query"), [0.5, 0.5])
+    assert len(cache.memory) == 1
+    assert cache.stats()["disk"]["hit_rate"] == 1.0
+    assert cache.stats()["memory"]["misses"] == 1
+
+
+def test_disk_errors_are_treated_as_misses_and_skipped_writes(disk_store):
+    cache = EmbeddingCache(LRUEmbeddingCache(max_size=4), disk_store)
+    locked = MagicMock()
+    locked.execute.side_effect = sqlite3.OperationalError("database is locked")
+    disk_store._local.conn = locked
+
+    assert cache.get("model", "query") is None
+    cache.put("model", "query", np.array([0.5, 0.5]))
+    disk_store.evict()
+
+    np.testing.assert_array_equal(cache.get("model", "query"), [0.5, 0.5])
+    assert cache.stats()["disk"]["misses"] == 1
+
+
+def test_async_access_runs_the_disk_tier_off_the_event_loop(disk_store):
+    cache = EmbeddingCache(LRUEmbeddingCache(max_size=4), disk_store)
+    disk_threads = []
+
+    def record_thread(method):
+        def wrapper(*args):
+            disk_threads.append(threading.get_ident())
+            return method(*args)
+        return wrapper
+
+    async def round_trip():
+        assert await cache.get_async("model", "query") is None
+        await cache.put_async("model", "query", np.array([0.5, 0.5]))
+        cache.memory.clear()
+        return await cache.get_async("model", "query")
+
+    with patch.object(disk_store, "get", record_thread(disk_store.get)):
+        with patch.object(disk_store, "put", record_thread(disk_store.put)):
+            embedding = asyncio.run(round_trip())
+
+    np.testing.assert_array_equal(embedding, [0.5, 0.5])
+    assert len(disk_threads) == 3
+    assert threading.get_ident() not in disk_threads
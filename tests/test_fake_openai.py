@@ -0,0 +1,113 @@
+"""
+Tests for the fake OpenAI server in lexai.tools.fake_openai.
+"""
+
+import asyncio
+import random
+
+import httpx
+import numpy as np
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+from lexai.tools.fake_openai import (
+    FakeOpenAIServer,
+    LatencyDistribution,
+    fake_embedding,
+)
+
+
+def _clients(server: FakeOpenAIServer):
+    app = server.create_app()
+    client = openai.OpenAI(
+        api_key="x",
+        base_url="http://fake/v1",
+        http_client=TestClient(app, base_url="http://fake"),
+        max_retries=0,
+    )
+    async_client = openai.AsyncOpenAI(
+        api_key="x",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://fake"
+        ),
+        max_retries=0,
+    )
+    return client, async_client
+
+
+def test_latency_distribution_specs():
+    rng = random.Random(0)
+    assert LatencyDistribution("constant:0.5").sample(rng) == 0.5
+    assert 0.1 <= LatencyDistribution("uniform:0.1:0.2").sample(rng) <= 0.2
+    assert LatencyDistribution("normal:0:1").sample(rng) >= 0
+    assert LatencyDistribution("lognormal:0.2:0.5").sample(rng) > 0
+    with pytest.raises(ValueError):
+        LatencyDistribution("gamma:1")
+    with pytest.raises(ValueError):
+        LatencyDistribution("uniform:a:b")
+
+
+def test_embeddings_are_deterministic_through_the_openai_client():
+    client, _ = _clients(FakeOpenAIServer(dim=8))
+
+    response = client.embeddings.create(input=["a", "b"], model="m")
+    floats = client.embeddings.create(
+        input="a", model="m", encoding_format="float"
+    )
+
+    assert [item.index for item in response.data] == [0, 1]
+    np.testing.assert_allclose(response.data[0].embedding, fake_embedding("a", 8))
+    np.testing.assert_allclose(
+        floats.data[0].embedding, fake_embedding("a", 8), rtol=1e-6
+    )
+
+
+def test_chat_completion_reports_usage():
+    client, _ = _clients(FakeOpenAIServer(answer_words=5))
+    messages = [{"role": "user", "content": "Can I build a fence?"}]
+
+    first = client.chat.completions.create(model="m", messages=messages)
+    second = client.chat.completions.create(model="m", messages=messages)
+
+    content = first.choices[0].message.content
+    assert len(content.split()) == 5
+    assert content == second.choices[0].message.content
+    assert first.usage.completion_tokens == 5
+
+
+def test_streamed_completion_matches_unstreamed_answer():
+    server = FakeOpenAIServer(answer_words=6)
+    client, async_client = _clients(server)
+    messages = [{"role": "user", "content": "Setbacks?"}]
+
+    async def collect():
+        stream = await async_client.chat.completions.create(
+            model="m",
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        return [chunk async for chunk in stream]
+
+    chunks = asyncio.run(collect())
+    text = "".join(
+        chunk.choices[0].delta.content or "" for chunk in chunks if chunk.choices
+    )
+
+    expected = client.chat.completions.create(model="m", messages=messages)
+    assert text == expected.choices[0].message.content
+    assert chunks[-1].usage.completion_tokens == 6
+    assert server.in_flight == 0
+
+
+def test_injected_rate_limits_and_errors():
+    client, _ = _clients(FakeOpenAIServer(rate_limit_rate=1.0))
+    with pytest.raises(openai.RateLimitError) as excinfo:
+        client.embeddings.create(input="a", model="m")
+    assert excinfo.value.response.headers["retry-after"] == "1"
+
+    client, _ = _clients(FakeOpenAIServer(error_rate=1.0))
+    with pytest.raises(openai.InternalServerError):
+        client.embeddings.create(input="a", model="m")
@@ -0,0 +1,119 @@
+"""
+Tests for the offline ingestion pipeline in lexai.tools.ingest.
+"""
+
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import openai
+import pytest
+
+from lexai.core.data_loader import load_embeddings
+from lexai.tools.ingest import chunk_text, ingest, parse_html, with_backoff
+
+
+class FakeEmbedder:
+    """Deterministic local stand-in for the embeddings endpoint."""
+
+    def __init__(self, fail_on_call=None):
+        self.calls = []
+        self.fail_on_call = fail_on_call
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        if self.fail_on_call == len(self.calls):
+            raise RuntimeError("simulated crash")
+        return np.array([[len(text), 1.0, 0.0] for text in texts])
+
+
+@pytest.fixture
+def jsonl_input(tmp_path: Path) -> Path:
+    path = tmp_path / "sections.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(5):
+            record = {
+                "url": f"https://example.com/{i}",
+                "title": f"Sec. {i}",
+                "subtitle": "Zoning",
+                "content": f"Content of section {i}.",
+            }
+            f.write(json.dumps(record) + "\n")
+    return path
+
+
+def test_ingest_writes_loadable_corpus(jsonl_input, tmp_path):
+    output = tmp_path / "city.corpus"
+    embedder = FakeEmbedder()
+
+    ingest(str(jsonl_input), str(output), embed_fn=embedder, batch_size=2)
+
+    embeddings, metadata = load_embeddings(str(output))
+    assert embeddings.shape == (5, 3)
+    assert sorted(len(call) for call in embedder.calls) == [1, 2, 2]
+    assert metadata.take([4])[0]["url"] == "https://example.com/4"
+
+
+def test_ingest_resumes_from_checkpoint(jsonl_input, tmp_path):
+    output = tmp_path / "city.corpus"
+
+    with pytest.raises(RuntimeError, match="simulated crash"):
+        ingest(str(jsonl_input), str(output), embed_fn=FakeEmbedder(2),
+               batch_size=2, max_workers=1)
+
+    resumed = FakeEmbedder()
+    ingest(str(jsonl_input), str(output), embed_fn=resumed, batch_size=2)
+
+    # Only the batch that failed is embedded again.
+    assert [len(call) for call in resumed.calls] == [2]
+    embeddings, _ = load_embeddings(str(output))
+    assert embeddings.shape == (5, 3)
+
+
+def test_ingest_npz_output(jsonl_input, tmp_path):
+    output = tmp_path / "city.npz"
+    ingest(str(jsonl_input), str(output), embed_fn=FakeEmbedder(),
+           output_format="npz")
+
+    embeddings, metadata = load_embeddings(str(output))
+    assert embeddings.shape == (5, 3)
+    assert metadata.columns["title"].tolist() == [f"Sec. {i}" for i in range(5)]
+
+
+def test_parse_html(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text(
+        "<html><head><title>Sec. 9-7-5</title>"
+        "<link rel='canonical' href='https://codes.example/9-7-5'>"
+        "<style>p {}</style></head>"
+        "<body><h1>Setbacks</h1><p>Front yard  setback.</p><p>Side yard.</p>"
+        "<script>ignored()</script></body></html>"
+    )
+
+    section = parse_html(str(path))
+
+    assert section == {
+        "url": "https://codes.example/9-7-5",
+        "title": "Sec. 9-7-5",
+        "subtitle": "Setbacks",
+        "content": "Setbacks\n\nFront yard setback.\n\nSide yard.",
+    }
+
+
+def test_chunk_text_respects_max_chars():
+    text = "\n\n".join(["a" * 30, "b" * 30, "c " * 40])
+    chunks = chunk_text(text, max_chars=64)
+    assert all(len(chunk) <= 64 for chunk in chunks)
+    assert chunks[0] == "a" * 30 + "\n\n" + "b" * 30
+
+
+def test_with_backoff_retries_rate_limits():
+    error = openai.RateLimitError(
+        "slow down", response=MagicMock(headers={"retry-after": "2"}), body=None
+    )
+    fn = MagicMock(side_effect=[error, "ok"])
+    delays = []
+
+    assert with_backoff(fn, sleep=delays.append) == "ok"
+    assert delays and delays[0] >= 2
@@ -0,0 +1,121 @@
+"""
+Tests for the IVF approximate nearest-neighbour index in lexai.core.ivf_index.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from lexai.core.corpus_registry import Corpus
+from lexai.core.data_loader import load_embeddings
+from lexai.core.ivf_index import IVFFlatIndex, ivf_index_path
+from lexai.core.matcher import ExactSearchEngine
+
+
+@pytest.fixture
+def clustered_embeddings():
+    """2,000 vectors drawn around 20 well-separated cluster centres."""
+    rng = np.random.default_rng(42)
+    centres = rng.normal(size=(20, 32))
+    labels = rng.integers(0, 20, size=2000)
+    return centres[labels] + 0.1 * rng.normal(size=(2000, 32))
+
+
+def test_full_probe_matches_exact_search(clustered_embeddings):
+    """Probing every list reproduces the exact results."""
+    index = IVFFlatIndex.build(clustered_embeddings, nlist=16)
+    exact = ExactSearchEngine(clustered_embeddings)
+    query = clustered_embeddings[7] + 0.05
+
+    indices, scores = index.search(query, 10, nprobe=index.nlist)
+    expected_indices, expected_scores = exact.search(query, 10)
+
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+
+def test_partial_probe_has_high_recall(clustered_embeddings):
+    index = IVFFlatIndex.build(clustered_embeddings, nlist=32, nprobe=4)
+    rng = np.random.default_rng(0)
+    queries = clustered_embeddings[rng.choice(2000, 50, replace=False)]
+
+    approx, _ = index.search_batch(queries, 5)
+    exact, _ = index.exact.search_batch(queries, 5)
+
+    recall = np.mean([len(set(a) & set(e)) / 5 for a, e in zip(approx, exact)])
+    assert recall >= 0.9
+
+
+def test_save_and_load_round_trip(clustered_embeddings, tmp_path: Path):
+    index = IVFFlatIndex.build(clustered_embeddings, nlist=8)
+    path = tmp_path / "corpus.ivf.npz"
+    index.save(str(path))
+
+    loaded = IVFFlatIndex.load(str(path), clustered_embeddings)
+    np.testing.assert_array_equal(loaded.ids, index.ids)
+    np.testing.assert_array_equal(loaded.offsets, index.offsets)
+
+    with pytest.raises(ValueError, match="does not match the corpus"):
+        IVFFlatIndex.load(str(path), clustered_embeddings[:10])
+
+
+def write_npz(path: Path, embeddings: np.ndarray, prefix: str = "") -> None:
+    count = len(embeddings)
+    np.savez(
+        path,
+        embeddings=embeddings,
+        urls=[f"{prefix}{i}" for i in range(count)],
+        titles=[str(i) for i in range(count)],
+        subtitles=[""] * count,
+        contents=[""] * count,
+    )
+
+
+def test_corpus_loads_index_next_to_npz(clustered_embeddings, tmp_path: Path):
+    corpus_path = tmp_path / "corpus.npz"
+    write_npz(corpus_path, clustered_embeddings)
+    _, metadata = load_embeddings(str(corpus_path))
+    IVFFlatIndex.build(
+        clustered_embeddings, nlist=8, corpus_digest=metadata.digest()
+    ).save(ivf_index_path(str(corpus_path)))
+
+    corpus = Corpus.load("Test", str(corpus_path))
+    assert isinstance(corpus.engine, IVFFlatIndex)
+    _, _, matches = corpus.search(clustered_embeddings[3], 1)
+    assert matches[0]["url"] == "3"
+
+
+def test_index_for_other_sections_of_the_same_size_is_ignored(
+    clustered_embeddings, tmp_path: Path
+):
+    corpus_path = tmp_path / "corpus.npz"
+    write_npz(corpus_path, clustered_embeddings)
+    _, metadata = load_embeddings(str(corpus_path))
+    IVFFlatIndex.build(
+        clustered_embeddings, nlist=8, corpus_digest=metadata.digest()
+    ).save(ivf_index_path(str(corpus_path)))
+
+    # Regenerated in place with the same number of sections.
+    write_npz(corpus_path, clustered_embeddings[::-1], prefix="new-")
+
+    corpus = Corpus.load("Test", str(corpus_path))
+    assert not isinstance(corpus.engine, IVFFlatIndex)
+
+
+def test_index_for_re_embedded_sections_is_ignored(
+    clustered_embeddings, tmp_path: Path
+):
+    corpus_path = tmp_path / "corpus.npz"
+    write_npz(corpus_path, clustered_embeddings)
+    _, metadata = load_embeddings(str(corpus_path))
+    IVFFlatIndex.build(
+        clustered_embeddings, nlist=8, corpus_digest=metadata.digest()
+    ).save(ivf_index_path(str(corpus_path)))
+
+    # Same text, embedded again (e.g. with another model).
+    rng = np.random.default_rng(1)
+    write_npz(corpus_path, rng.normal(size=clustered_embeddings.shape))
+
+    corpus = Corpus.load("Test", str(corpus_path))
+    assert not isinstance(corpus.engine, IVFFlatIndex)
@@ -0,0 +1,84 @@
+"""
+Tests for the service layer in lexai.services.lexai_service.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+from lexai.config import OVERLOADED_MESSAGE
+from lexai.services.admission import AdmissionController, Limiter
+from lexai.services.lexai_service import LexAIService
+from lexai.services.metrics import request_trace
+
+MATCHES = [{"url": "https://a.com", "title": "A", "subtitle": "a", "content": "x"}]
+
+
+async def _collect(query, location):
+    return [html async for html in LexAIService.stream_query_async(query, location)]
+
+
+def test_stream_query_renders_references_first():
+    async def fake_stream(query, location):
+        yield {"matches": MATCHES}
+        yield {"delta": "Partial"}
+        yield {"delta": " answer."}
+
+    with patch("lexai.services.lexai_service.stream_matches_async", fake_stream):
+        updates = asyncio.run(_collect("Q?", "Denver"))
+
+    assert len(updates) == 3
+    assert "https://a.com" in updates[0]
+    assert "Partial answer." in updates[-1]
+    assert updates[-1].endswith("</ul>")
+
+
+def test_stream_query_stops_on_error():
+    async def fake_stream(query, location):
+        yield {"error_html": "<p>boom</p>"}
+        yield {"delta": "never"}
+
+    with patch("lexai.services.lexai_service.stream_matches_async", fake_stream):
+        updates = asyncio.run(_collect("Q?", "Denver"))
+
+    assert len(updates) == 1
+    assert "never" not in updates[0]
+
+
+def test_queries_are_turned_away_when_saturated():
+    controller = AdmissionController(max_concurrent=1, max_queue=0, timeout=1)
+    controller.requests.acquire()
+
+    with patch("lexai.services.lexai_service.admission", controller):
+        updates = asyncio.run(_collect("Q?", "Denver"))
+        html = asyncio.run(LexAIService.handle_query_async("Q?", "Denver"))
+
+    assert updates == [html]
+    assert OVERLOADED_MESSAGE in html
+
+
+def test_queries_are_turned_away_when_embeddings_are_saturated():
+    embeddings = Limiter("test_service_embeddings", limit=1, max_waiting=0)
+    embeddings.acquire()
+
+    with patch("lexai.services.openai_client.upstream", return_value=embeddings), \
+            patch("lexai.services.openai_client.get_coalescer", return_value=None):
+        html = asyncio.run(
+            LexAIService.handle_query_async("Saturated embeddings?", "Denver")
+        )
+        updates = asyncio.run(_collect("Saturated embeddings, streamed?", "Denver"))
+
+    assert OVERLOADED_MESSAGE in html
+    assert updates == [html]
+
+
+def test_admission_stage_times_only_the_wait_for_admission():
+    async def slow_query(query, location):
+        await asyncio.sleep(0.05)
+        return {"response": "Answer.", "matches": MATCHES}
+
+    with patch("lexai.services.lexai_service.generate_matches_async", slow_query):
+        with request_trace("admission_stage") as trace:
+            html = asyncio.run(LexAIService.handle_query_async("Q?", "Denver"))
+
+    assert "Answer." in html
+    assert trace["stages_ms"]["admission"] < 25
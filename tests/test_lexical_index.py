@@ -0,0 +1,160 @@
+"""
+Tests for BM25 retrieval and rank fusion in lexai.core.lexical_index.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from lexai.core.corpus_registry import Corpus
+from lexai.core.lexical_index import (
+    LexicalIndex,
+    citation_terms,
+    lexical_index_path,
+    looks_like_citation,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+from lexai.tools.build_index import build_lexical_index
+
+SECTIONS = [
+    "Sec. 9-7-5. Setbacks. Minimum setbacks for accessory dwelling units.",
+    "Sec. 9-7-6. Parking. Off-street parking for dwelling units.",
+    "Sec. 4-1-2. Noise. Quiet hours in residential zones.",
+    "Sec. 2-3-1. Dogs. Dogs must be leashed in parks.",
+]
+
+
+@pytest.fixture
+def index():
+    return LexicalIndex.build(SECTIONS)
+
+
+def test_tokenize_keeps_citations_whole():
+    assert tokenize("See Sec. 9-7-5(a) of the Code") == [
+        "see", "sec", "9-7-5", "code"
+    ]
+
+
+def test_citation_detection():
+    assert looks_like_citation("9-7-5 setbacks")
+    assert looks_like_citation("what does § 12 say")
+    assert looks_like_citation("Section 4 noise")
+    assert looks_like_citation("what does 14.2.3 require")
+    assert looks_like_citation("Sec. 6.5 fences")
+    assert not looks_like_citation("accessory dwelling unit rules")
+    assert not looks_like_citation("Can my fence be 6.5 feet tall?")
+    assert not looks_like_citation("Noise after 10:30 pm?")
+    assert not looks_like_citation("What changed on 2024-01-15?")
+    assert citation_terms("9-7-5 setbacks") == ["9-7-5"]
+
+
+def test_search_ranks_exact_citation_first(index):
+    indices, scores = index.search("9-7-5 setbacks", 3)
+    assert indices.tolist() == [0]
+    assert scores[0] > 0
+
+
+def test_search_ranks_by_bm25(index):
+    indices, scores = index.search("accessory dwelling unit", 4)
+    assert indices.tolist() == [0, 1]
+    assert scores[0] > scores[1]
+
+
+def test_search_without_known_terms_returns_nothing(index):
+    indices, scores = index.search("zoning variance", 3)
+    assert len(indices) == len(scores) == 0
+
+
+def test_contains(index):
+    assert index.contains(["9-7-5", "setbacks"])
+    assert not index.contains(["9-7-9"])
+
+
+def test_save_and_load_round_trip(index, tmp_path: Path):
+    path = tmp_path / "corpus.bm25.npz"
+    index.save(str(path))
+
+    loaded = LexicalIndex.load(str(path), len(SECTIONS))
+    np.testing.assert_array_equal(loaded.terms, index.terms)
+    np.testing.assert_array_equal(
+        loaded.search("parking", 2)[0], index.search("parking", 2)[0]
+    )
+
+    with pytest.raises(ValueError, match="does not match the corpus"):
+        LexicalIndex.load(str(path), 2)
+
+
+def test_load_rejects_an_index_for_other_sections(tmp_path: Path):
+    path = tmp_path / "corpus.bm25.npz"
+    LexicalIndex.build(SECTIONS, corpus_digest="old").save(str(path))
+
+    assert LexicalIndex.load(str(path), corpus_digest="old").corpus_digest == "old"
+    with pytest.raises(ValueError, match="different version"):
+        LexicalIndex.load(str(path), len(SECTIONS), corpus_digest="new")
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    indices, scores = reciprocal_rank_fusion(
+        [np.array([0, 1, 2]), np.array([2, 3])], 3, k=60
+    )
+    assert indices.tolist() == [2, 0, 1]
+    assert scores[0] == pytest.approx(1 / 63 + 1 / 61)
+
+
+def test_corpus_fuses_vector_and_lexical_rankings(tmp_path: Path):
+    corpus_path = tmp_path / "corpus.npz"
+    # The vector ranking prefers the noise section; the query names 9-7-5.
+    embeddings = np.array([
+        [0.0, 1.0, 0.0], [0.0, 0.8, 0.6], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0],
+    ])
+    np.savez(
+        corpus_path,
+        embeddings=embeddings,
+        urls=[str(i) for i in range(len(SECTIONS))],
+        titles=SECTIONS,
+        subtitles=[""] * len(SECTIONS),
+        contents=[""] * len(SECTIONS),
+    )
+    assert build_lexical_index(str(corpus_path)) == lexical_index_path(
+        str(corpus_path)
+    )
+
+    corpus = Corpus.load("Test", str(corpus_path))
+    assert corpus.hybrid
+    query_embedding = np.array([1.0, 0.1, 0.0])
+
+    _, _, vector_only = corpus.search(query_embedding, 1)
+    assert vector_only[0]["url"] == "2"
+    _, _, fused = corpus.search(query_embedding, 2, query="9-7-5 setbacks")
+    assert [match["url"] for match in fused] == ["0", "2"]
+    _, _, lexical = corpus.search_lexical("9-7-5 setbacks", 1)
+    assert lexical[0]["url"] == "0"
+
+    [(_, _, batch)] = corpus.search_batch(
+        query_embedding[None, :], 2, ["9-7-5 setbacks"]
+    )
+    assert [match["url"] for match in batch] == ["0", "2"]
+
+
+def test_corpus_ignores_lexical_index_of_a_regenerated_corpus(tmp_path: Path):
+    corpus_path = tmp_path / "corpus.npz"
+
+    def write(titles):
+        np.savez(
+            corpus_path,
+            embeddings=np.eye(len(titles)),
+            urls=[str(i) for i in range(len(titles))],
+            titles=titles,
+            subtitles=[""] * len(titles),
+            contents=[""] * len(titles),
+        )
+
+    write(SECTIONS)
+    build_lexical_index(str(corpus_path))
+    # Same number of sections, in a different order.
+    write(SECTIONS[::-1])
+
+    corpus = Corpus.load("Test", str(corpus_path))
+    assert corpus.lexical is None
@@ -0,0 +1,306 @@
+"""
+Tests for the match engine in lexai.core.match_engine.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import openai
+import pytest
+
+from lexai.config import DEGRADED_RESPONSE
+from lexai.core.corpus_registry import Corpus
+from lexai.core.lexical_index import LexicalIndex, section_texts
+from lexai.core.match_engine import (
+    answer_cache,
+    generate_matches,
+    generate_matches_async,
+    generate_matches_batch,
+    stream_matches_async,
+    warm_up,
+)
+from lexai.core.metadata_store import MetadataStore
+from lexai.services.admission import Overloaded
+from lexai.services.metrics import ERRORS
+
+
+@pytest.fixture
+def corpus():
+    metadata = MetadataStore.from_columns(
+        {
+            "url": ["url1", "url2", "url3"],
+            "title": ["Title 1", "Title 2", "Title 3"],
+            "subtitle": ["Subtitle A", "Subtitle B", "Subtitle C"],
+            "content": ["Content X", "Content Y", "Content Z"],
+        }
+    )
+    return Corpus("Denver", "unused.npz", np.eye(3), metadata, (0, 0))
+
+
+@pytest.fixture
+def boulder_corpus():
+    metadata = MetadataStore.from_columns(
+        {
+            "url": ["b1", "b2"],
+            "title": ["Boulder 1", "Boulder 2"],
+            "subtitle": ["", ""],
+            "content": ["Boulder X", "Boulder Y"],
+        }
+    )
+    embeddings = np.array([[0.0, 1.0, 0.1], [1.0, 0.0, 0.0]])
+    return Corpus("Boulder", "unused.npz", embeddings, metadata, (0, 0))
+
+
+@pytest.fixture(autouse=True)
+def patched_corpus(corpus, boulder_corpus):
+    answer_cache.invalidate()
+    corpora = {"Denver": corpus, "Boulder": boulder_corpus}
+    with patch("lexai.core.match_engine.get_corpus", side_effect=corpora.get):
+        yield
+
+
+@patch("lexai.core.match_engine.get_chat_completion", return_value="Answer.")
+@patch("lexai.core.match_engine.get_embedding", return_value=np.array([0, 1, 0]))
+def test_generate_matches_returns_response_and_matches(_, __):
+    result = generate_matches("Question?", "Denver")
+    assert result["response"] == "Answer."
+    assert result["matches"][0]["title"] == "Title 2"
+
+
+@patch("lexai.core.match_engine.get_chat_completion", return_value="Answer.")
+@patch("lexai.core.match_engine.get_embedding")
+def test_generate_matches_reuses_cached_answer(mock_get_embedding, mock_chat):
+    mock_get_embedding.side_effect = [np.array([0, 1, 0]), np.array([0.1, 1, 0])]
+
+    first = generate_matches("Question?", "Denver")
+    second = generate_matches("Question, rephrased?", "Denver")
+
+    mock_chat.assert_called_once()
+    assert first["response"] == second["response"] == "Answer."
+
+
+@patch("lexai.core.match_engine.get_chat_completion_async", new_callable=AsyncMock)
+@patch("lexai.core.match_engine.get_embedding_async", new_callable=AsyncMock)
+def test_generate_matches_async(mock_get_embedding, mock_chat):
+    mock_get_embedding.return_value = np.array([0, 0, 1])
+    mock_chat.return_value = "Async answer."
+
+    result = asyncio.run(generate_matches_async("Question?", "Denver"))
+
+    assert result["response"] == "Async answer."
+    assert result["matches"][0]["title"] == "Title 3"
+
+
+async def _collect(events):
+    return [event async for event in events]
+
+
+@patch("lexai.core.match_engine.get_embedding_async", new_callable=AsyncMock)
+def test_stream_matches_yields_references_before_response(mock_get_embedding):
+    mock_get_embedding.return_value = np.array([1, 0, 0])
+
+    async def fake_stream(*_):
+        for fragment in ["Fire pits ", "are allowed."]:
+            yield fragment
+
+    with patch(
+        "lexai.core.match_engine.stream_chat_completion_async", fake_stream
+    ):
+        events = asyncio.run(_collect(stream_matches_async("Q?", "Denver")))
+        cached = asyncio.run(_collect(stream_matches_async("Q?", "Denver")))
+
+    assert events[0]["matches"][0]["title"] == "Title 1"
+    assert [e["delta"] for e in events[1:]] == ["Fire pits ", "are allowed."]
+    assert cached[1:] == [{"delta": "Fire pits are allowed."}]
+
+
+@patch("lexai.core.match_engine.get_chat_completion_async", new_callable=AsyncMock)
+@patch("lexai.core.match_engine.get_embedding_async", new_callable=AsyncMock)
+def test_saturated_chat_degrades_to_references(mock_get_embedding, mock_chat):
+    mock_get_embedding.return_value = np.array([0, 0, 1])
+    mock_chat.side_effect = Overloaded("upstream:chat", "timeout")
+
+    result = asyncio.run(generate_matches_async("Question?", "Denver"))
+
+    assert result["degraded"] is True
+    assert result["response"] == DEGRADED_RESPONSE
+    assert result["matches"][0]["title"] == "Title 3"
+
+
+@patch("lexai.core.match_engine.get_embedding_async", new_callable=AsyncMock)
+def test_saturated_embeddings_turn_the_query_away(mock_get_embedding):
+    mock_get_embedding.side_effect = Overloaded("upstream:embeddings", "queue_full")
+
+    with pytest.raises(Overloaded):
+        asyncio.run(generate_matches_async("Question?", "Denver"))
+    with pytest.raises(Overloaded):
+        asyncio.run(_collect(stream_matches_async("Question?", "Denver")))
+
+
+@patch("lexai.core.match_engine.get_embedding_async", new_callable=AsyncMock)
+def test_stream_matches_degrades_when_chat_is_saturated(mock_get_embedding):
+    mock_get_embedding.return_value = np.array([1, 0, 0])
+
+    async def saturated_stream(*_):
+        raise Overloaded("upstream:chat", "timeout")
+        yield
+
+    with patch(
+        "lexai.core.match_engine.stream_chat_completion_async", saturated_stream
+    ):
+        events = asyncio.run(_collect(stream_matches_async("Q?", "Denver")))
+
+    assert events[0]["matches"][0]["title"] == "Title 1"
+    assert events[1:] == [{"delta": DEGRADED_RESPONSE}]
+
+
+@patch("lexai.core.match_engine.get_embedding_async", new_callable=AsyncMock)
+def test_stream_matches_counts_each_error_once(mock_get_embedding):
+    mock_get_embedding.side_effect = RuntimeError("boom")
+    before = ERRORS.value(error="RuntimeError")
+    invalid_before = ERRORS.value(error="InvalidLocation")
+
+    failed = asyncio.run(_collect(stream_matches_async("Q?", "Denver")))
+    invalid = asyncio.run(_collect(stream_matches_async("Q?", "Atlantis")))
+
+    assert "boom" in failed[0]["error_html"]
+    assert "Atlantis" in invalid[0]["error_html"]
+    assert ERRORS.value(error="RuntimeError") == before + 1
+    assert ERRORS.value(error="InvalidLocation") == invalid_before + 1
+
+
+def test_generate_matches_rejects_unknown_location():
+    result = generate_matches("Question?", "Atlantis")
+    assert "Invalid location" in result["error_html"]
+
+    result = generate_matches("Question?", ["Denver", "Atlantis"])
+    assert "Atlantis" in result["error_html"]
+
+    result = generate_matches("Question?", [])
+    assert "at least one location" in result["error_html"]
+
+
+@patch("lexai.core.match_engine.get_chat_completion", return_value="Both.")
+@patch("lexai.core.match_engine.get_embedding", return_value=np.array([0, 1, 0]))
+def test_generate_matches_fans_out_and_merges(_, mock_chat):
+    result = generate_matches("Question?", ["Denver", "Boulder"])
+
+    assert result["response"] == "Both."
+    assert [(m["jurisdiction"], m["title"]) for m in result["matches"]] == [
+        ("Denver", "Title 2"),
+        ("Boulder", "Boulder 1"),
+        ("Denver", "Title 1"),
+    ]
+    system_prompt, context, _ = mock_chat.call_args.args
+    assert "Denver, Boulder" in system_prompt
+    assert context.startswith("[1] (Denver) Title 2")
+
+
+@patch("lexai.core.match_engine.get_chat_completion", return_value="Both.")
+@patch("lexai.core.match_engine.get_embedding", return_value=np.array([0, 1, 0]))
+def test_fan_out_fuses_rankings_when_scores_differ_in_scale(_, __, corpus):
+    # Denver reports RRF scores (about 0.03), Boulder cosine similarities.
+    corpus.lexical = LexicalIndex.build(section_texts(corpus.metadata))
+
+    result = generate_matches("Content Y details", ["Denver", "Boulder"])
+
+    assert [(m["jurisdiction"], m["title"]) for m in result["matches"]] == [
+        ("Denver", "Title 2"),
+        ("Boulder", "Boulder 1"),
+        ("Denver", "Title 1"),
+    ]
+
+
+@patch("lexai.core.match_engine.get_chat_completion", side_effect=["A1", "A2"])
+@patch("lexai.core.match_engine.get_embeddings")
+def test_generate_matches_batch_fans_out(mock_get_embeddings, _):
+    mock_get_embeddings.return_value = np.array([[1, 0, 0], [0, 1, 0]])
+
+    results = generate_matches_batch(["Q1", "Q2"], ["Boulder", "Denver"])
+
+    assert [r["matches"][0]["jurisdiction"] for r in results] == [
+        "Boulder", "Denver"
+    ]
+    assert all(len(r["matches"]) == 3 for r in results)
+
+
+@patch("lexai.core.match_engine.get_chat_completion", side_effect=["A1", "A2"])
+@patch("lexai.core.match_engine.get_embeddings")
+def test_generate_matches_batch(mock_get_embeddings, _):
+    mock_get_embeddings.return_value = np.array([[1, 0, 0], [0, 0, 1]])
+
+    results = generate_matches_batch(["Q1", "Q2"], "Denver")
+
+    mock_get_embeddings.assert_called_once_with(["Q1", "Q2"])
+    assert [r["response"] for r in results] == ["A1", "A2"]
+    assert [r["matches"][0]["title"] for r in results] == ["Title 1", "Title 3"]
+
+
+@patch("lexai.core.match_engine.get_embeddings", side_effect=ValueError("bad"))
+def test_generate_matches_batch_reports_errors_per_query(_):
+    results = generate_matches_batch(["Q1", "Q2"], "Denver")
+    assert len(results) == 2
+    assert all("bad" in r["error_html"] for r in results)
+
+
+@patch("lexai.core.match_engine.get_embedding_async")
+def test_errors_that_retries_could_not_fix_are_marked_retryable(mock_get_embedding):
+    mock_get_embedding.side_effect = openai.RateLimitError(
+        "slow down", response=MagicMock(status_code=429, headers={}), body=None
+    )
+    assert asyncio.run(generate_matches_async("Q", "Denver"))["retryable"]
+
+    mock_get_embedding.side_effect = ValueError("bad")
+    assert "retryable" not in asyncio.run(generate_matches_async("Q", "Denver"))
+
+
+def test_warm_up_searches_every_location(corpus, boulder_corpus):
+    with patch.object(corpus, "search", wraps=corpus.search) as denver_search, \
+            patch.object(boulder_corpus, "search") as boulder_search, \
+            patch("lexai.core.match_engine.corpus_registry") as registry:
+        registry.locations = ["Denver", "Boulder", "Missing"]
+        timings = warm_up()
+
+    assert set(timings) == {"Denver", "Boulder"}
+    denver_search.assert_called_once()
+    boulder_search.assert_called_once()
+    query = denver_search.call_args.args[0]
+    assert query.shape == (3,)
+    assert np.linalg.norm(query) == pytest.approx(1.0)
+
+
+@patch("lexai.core.match_engine.get_chat_completion", return_value="Answer.")
+@patch("lexai.core.match_engine.get_embedding")
+def test_citation_query_skips_the_embedding(mock_get_embedding, _, corpus):
+    corpus.lexical = LexicalIndex.build(section_texts(corpus.metadata))
+
+    result = generate_matches("What does Section 3 say?", "Denver")
+
+    mock_get_embedding.assert_not_called()
+    assert result["matches"][0]["title"] == "Title 3"
+
+
+@patch("lexai.core.match_engine.get_chat_completion", return_value="Answer.")
+@patch("lexai.core.match_engine.get_embedding", return_value=np.array([0, 1, 0]))
+def test_unknown_citation_falls_back_to_hybrid_search(mock_get_embedding, _, corpus):
+    corpus.lexical = LexicalIndex.build(section_texts(corpus.metadata))
+
+    result = generate_matches("What does Section 7 say?", "Denver")
+
+    mock_get_embedding.assert_called_once()
+    assert result["matches"][0]["title"] == "Title 2"
+
+
+@patch("lexai.core.match_engine.get_embedding_async")
+@patch("lexai.core.match_engine.get_chat_completion_async", new_callable=AsyncMock)
+def test_citation_query_skips_the_embedding_async(
+    mock_completion, mock_get_embedding, corpus
+):
+    mock_completion.return_value = "Answer."
+    corpus.lexical = LexicalIndex.build(section_texts(corpus.metadata))
+
+    result = asyncio.run(generate_matches_async("Sec. 2 details", "Denver"))
+
+    mock_get_embedding.assert_not_called()
+    assert result["matches"][0]["title"] == "Title 2"
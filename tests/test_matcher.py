@@ -1,15 +1,22 @@
 """
-Unit tests for the `find_top_matches` function in `lexai.core.matcher`.
+Unit tests for `find_top_matches` and the search engine in `lexai.core.matcher`.
 
 These tests verify correct match ranking, boundary cases,
 empty input handling, and input validation.
 """
 
 import numpy as np
-import pandas as pd
 import pytest
 
-from lexai.core.matcher import find_top_matches
+from lexai.core.matcher import (
+    ExactSearchEngine,
+    find_top_matches,
+    find_top_matches_batch,
+    normalize_rows,
+    top_k_indices,
+    top_k_indices_batch,
+)
+from lexai.core.metadata_store import MetadataStore
 
 
 @pytest.fixture
@@ -29,7 +36,7 @@ def sample_embeddings():
 @pytest.fixture
 def sample_jurisdiction_data():
     """Sample jurisdiction metadata with 4 entries."""
-    return pd.DataFrame(
+    return MetadataStore.from_columns(
         {
             "url": ["url1", "url2", "url3", "url4"],
             "title": ["Title 1", "Title 2", "Title 3", "Title 4"],
@@ -53,8 +60,10 @@ def empty_embeddings():
 
 @pytest.fixture
 def empty_jurisdiction_data():
-    """Empty jurisdiction DataFrame for edge case testing."""
-    return pd.DataFrame(columns=["url", "title", "subtitle", "content"])
+    """Empty jurisdiction metadata for edge case testing."""
+    return MetadataStore.from_columns(
+        {"url": [], "title": [], "subtitle": [], "content": []}
+    )
 
 
 def test_returns_expected_number_of_matches(
@@ -149,7 +158,10 @@ def test_handles_single_embedding_and_row(
     matches = find_top_matches(
         query_embedding=sample_query_embedding,
         embeddings=sample_embeddings[:1],
-        jurisdiction_data=sample_jurisdiction_data.iloc[:1],
+        jurisdiction_data=MetadataStore.from_columns({
+            name: values[:1]
+            for name, values in sample_jurisdiction_data.to_columns().items()
+        }),
         num_matches=3,
     )
     assert len(matches) == 1
@@ -178,3 +190,74 @@ def test_raises_for_invalid_query_embedding_shape(
             jurisdiction_data=sample_jurisdiction_data,
             num_matches=1,
         )
+
+
+def test_search_engine_matches_brute_force_ranking():
+    """Argpartition top-k agrees with a full sort of cosine similarities."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(500, 16))
+    query = rng.normal(size=16)
+    engine = ExactSearchEngine(embeddings)
+
+    indices, scores = engine.search(query, 10)
+
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:10]
+    np.testing.assert_array_equal(indices, expected)
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_search_engine_reuses_normalized_float32_matrix():
+    """Unit-length float32 embeddings are used without a copy."""
+    embeddings = normalize_rows(np.random.rand(8, 4))
+    engine = ExactSearchEngine(embeddings)
+    assert engine.embeddings is embeddings
+
+
+def test_search_engine_handles_zero_vectors(sample_query_embedding):
+    """All-zero rows score zero instead of producing NaNs."""
+    embeddings = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    indices, scores = ExactSearchEngine(embeddings).search(sample_query_embedding, 2)
+    assert indices.tolist() == [1, 0]
+    assert scores.tolist() == pytest.approx([1.0, 0.0])
+
+
+def test_top_k_indices_handles_small_inputs():
+    scores = np.array([0.2, 0.9, 0.5])
+    assert top_k_indices(scores, 0).tolist() == []
+    assert top_k_indices(scores, 2).tolist() == [1, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 2, 0]
+
+
+def test_find_top_matches_batch_agrees_with_single_queries(
+    sample_embeddings,
+    sample_jurisdiction_data,
+):
+    """Batched retrieval returns the same matches as per-query retrieval."""
+    queries = np.array(
+        [[1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.5, 0.5, 0.5]], dtype=np.float32
+    )
+    batch = find_top_matches_batch(
+        queries, sample_embeddings, sample_jurisdiction_data, num_matches=2
+    )
+    expected = [
+        find_top_matches(query, sample_embeddings, sample_jurisdiction_data, 2)
+        for query in queries
+    ]
+    assert batch == expected
+
+
+def test_find_top_matches_batch_rejects_wrong_dimensionality(
+    sample_embeddings,
+    sample_jurisdiction_data,
+):
+    with pytest.raises(ValueError, match="dimensionality"):
+        find_top_matches_batch(
+            np.ones((2, 5)), sample_embeddings, sample_jurisdiction_data
+        )
+
+
+def test_top_k_indices_batch_orders_each_row():
+    scores = np.array([[0.1, 0.9, 0.5], [0.7, 0.2, 0.3]])
+    assert top_k_indices_batch(scores, 2).tolist() == [[1, 2], [0, 2]]
+    assert top_k_indices_batch(scores, 5).tolist() == [[1, 2, 0], [0, 2, 1]]
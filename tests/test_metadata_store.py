@@ -0,0 +1,73 @@
+"""
+Tests for the columnar metadata store in lexai.core.metadata_store.
+"""
+
+import pytest
+
+from lexai.core.metadata_store import MatchRecord, MetadataStore, StringColumn
+from lexai.services.lexai_service import LexAIService
+from lexai.ui.formatters import format_references
+
+
+@pytest.fixture
+def store():
+    return MetadataStore.from_columns({
+        "url": ["u0", "u1", "u2"],
+        "title": ["Setbacks", "Parking", "Noise"],
+        "subtitle": ["9-7-5", "", "béta"],
+        "content": ["Front yard.", "Two spaces.", "Quiet hours."],
+    })
+
+
+def test_take_materializes_only_requested_rows(store):
+    records = store.take([2, 0])
+
+    assert [record.title for record in records] == ["Noise", "Setbacks"]
+    assert records[0].subtitle == "béta"
+    assert len(store) == 3
+    assert store.shape == (3, 4)
+    assert not store.empty
+
+
+def test_string_column_round_trip():
+    column = StringColumn.from_values(["", "a", "§ 9"])
+    assert len(column) == 3
+    assert column.tolist() == ["", "a", "§ 9"]
+
+
+def test_missing_column_is_rejected():
+    with pytest.raises(KeyError, match="content"):
+        MetadataStore.from_columns({"url": [], "title": [], "subtitle": []})
+
+
+def test_match_record_behaves_like_a_read_only_mapping(store):
+    [record] = store.take([1])
+
+    assert record["url"] == "u1"
+    assert record.get("jurisdiction") is None
+    assert "jurisdiction" not in record
+    assert dict(record) == {
+        "url": "u1", "title": "Parking", "subtitle": "", "content": "Two spaces."
+    }
+    with pytest.raises(AttributeError):
+        record.extra = "no __dict__"
+
+
+def test_with_jurisdiction_tags_a_copy(store):
+    [record] = store.take([0])
+    tagged = record.with_jurisdiction("Denver")
+
+    assert tagged["jurisdiction"] == "Denver"
+    assert {**tagged}["jurisdiction"] == "Denver"
+    assert record.jurisdiction is None
+
+
+def test_records_render_as_references(store):
+    records = [MatchRecord("u0", "Setbacks", "9-7-5", "").with_jurisdiction("Denver")]
+
+    html = format_references(records)
+    assert "<strong>Denver</strong>" in html
+    assert "Setbacks: 9-7-5" in html
+
+    result = LexAIService.format_result({"response": "Yes.", "matches": records})
+    assert "Setbacks: 9-7-5" in result
@@ -0,0 +1,232 @@
+"""
+Tests for request metrics in lexai.services.metrics.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from lexai.core import match_engine
+from lexai.core.corpus_registry import Corpus
+from lexai.core.metadata_store import MetadataStore
+from lexai.services import metrics
+from lexai.services.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    record_cache_lookup,
+    record_error,
+    record_usage,
+    request_trace,
+    span,
+)
+
+
+def test_counter_renders_labelled_series():
+    counter = Counter("hits_total", "Hits.", ("cache",))
+    counter.inc(cache="answer")
+    counter.inc(2, cache="answer")
+
+    assert counter.value(cache="answer") == 3
+    assert 'hits_total{cache="answer"} 3' in counter.render()
+    with pytest.raises(ValueError):
+        counter.inc(stage="search")
+
+
+def test_gauge_goes_up_and_down():
+    gauge = Gauge("queue_depth", "Depth.", ("pool",))
+    gauge.set(3, pool="requests")
+    gauge.inc(-1, pool="requests")
+
+    assert gauge.value(pool="requests") == 2
+    assert "# TYPE queue_depth gauge" in gauge.render()
+    assert 'queue_depth{pool="requests"} 2' in gauge.render()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in lines
+    assert "latency_seconds_count 2" in lines
+    assert histogram.count() == 2
+
+
+def test_registry_reuses_metrics_by_name():
+    registry = MetricsRegistry()
+    first = registry.counter("a_total", "A.")
+    assert registry.counter("a_total", "A.") is first
+    assert registry.render().startswith("# HELP a_total A.\n# TYPE a_total counter")
+
+
+def test_shared_registry_sums_the_snapshots_of_every_worker(tmp_path):
+    def worker_registry():
+        registry = MetricsRegistry(shared_dir=str(tmp_path))
+        registry.counter("a_total", "A.", ("pool",)).inc(pool="x")
+        registry.gauge("c_active", "C.").set(2)
+        registry.histogram("b_seconds", "B.", buckets=(1.0,)).observe(0.5)
+        return registry
+
+    # Snapshots of a live worker, of one that has exited (no such pid) and a
+    # partial one, which is skipped.
+    worker_registry().write_snapshot()
+    os.replace(tmp_path / f"{os.getpid()}.json", tmp_path / f"{os.getppid()}.json")
+    worker_registry().write_snapshot()
+    os.replace(tmp_path / f"{os.getpid()}.json", tmp_path / "999999999.json")
+    (tmp_path / "999999998.json").write_text("{")
+
+    rendered = worker_registry().render()
+
+    assert 'a_total{pool="x"} 3' in rendered
+    assert "c_active 4" in rendered
+    assert 'b_seconds_bucket{le="1"} 3' in rendered
+    assert "b_seconds_count 3" in rendered
+    assert "b_seconds_sum 1.5" in rendered
+
+
+def test_request_trace_records_stages_and_outcome():
+    before = metrics.REQUEST_DURATION.count(operation="test_op", outcome="ok")
+
+    with request_trace("test_op") as trace:
+        with span("embedding"):
+            pass
+        record_cache_lookup("answer", hit=True)
+
+    assert "embedding" in trace["stages_ms"]
+    assert trace["answer_cache"] == "hit"
+    assert metrics.REQUEST_DURATION.count(operation="test_op", outcome="ok") == (
+        before + 1
+    )
+
+
+def test_nested_trace_joins_outer_trace():
+    with request_trace("outer") as outer:
+        with request_trace("inner") as inner:
+            record_error(ValueError("boom"))
+
+    assert inner is outer
+    assert outer["outcome"] == "error"
+    assert outer["error"] == "ValueError"
+
+
+def test_request_trace_marks_exceptions():
+    before = metrics.REQUEST_DURATION.count(operation="failing", outcome="error")
+
+    with pytest.raises(RuntimeError):
+        with request_trace("failing"):
+            raise RuntimeError("boom")
+
+    assert metrics.REQUEST_DURATION.count(operation="failing", outcome="error") == (
+        before + 1
+    )
+
+
+def test_request_trace_logs_json_when_enabled(caplog):
+    with patch.object(metrics, "JSON_LOGS", True):
+        with caplog.at_level(logging.INFO, logger="lexai.services.metrics"):
+            with request_trace("logged", location="Denver"):
+                with span("search"):
+                    pass
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["operation"] == "logged"
+    assert record["location"] == "Denver"
+    assert "search" in record["stages_ms"]
+    assert record["duration_ms"] >= 0
+
+
+def test_record_usage_counts_tokens():
+    class Usage:
+        prompt_tokens = 12
+        completion_tokens = 5
+
+    before = metrics.TOKENS.value(kind="prompt")
+    with request_trace("usage") as trace:
+        record_usage(Usage())
+        record_usage(None)
+
+    assert metrics.TOKENS.value(kind="prompt") == before + 12
+    assert trace["completion_tokens"] == 5
+
+
+@patch("lexai.core.match_engine.get_chat_completion", return_value="Answer.")
+@patch("lexai.core.match_engine.get_embedding", return_value=np.array([0, 1, 0]))
+def test_generate_matches_times_each_stage(_, __):
+    metadata = MetadataStore.from_columns({
+        "url": ["u1", "u2", "u3"],
+        "title": ["A", "B", "C"],
+        "subtitle": ["", "", ""],
+        "content": ["x", "y", "z"],
+    })
+    corpus = Corpus("Denver", "unused.npz", np.eye(3), metadata, (0, 0))
+    match_engine.answer_cache.invalidate()
+
+    with patch("lexai.core.match_engine.get_corpus", return_value=corpus):
+        with request_trace("stages") as trace:
+            match_engine.generate_matches("Question?", "Denver")
+
+    assert set(trace["stages_ms"]) == {
+        "embedding", "corpus_load", "search", "context", "completion"
+    }
+    assert trace["answer_cache"] == "miss"
+
+
+def test_stream_query_traces_the_same_stages_as_handle_query(caplog):
+    from lexai.services.lexai_service import LexAIService
+
+    metadata = MetadataStore.from_columns({
+        "url": ["u1", "u2"],
+        "title": ["A", "B"],
+        "subtitle": ["", ""],
+        "content": ["x", "y"],
+    })
+    corpus = Corpus("Denver", "unused.npz", np.eye(2), metadata, (0, 0))
+    match_engine.answer_cache.invalidate()
+
+    class Usage:
+        prompt_tokens = 7
+        completion_tokens = 2
+
+    async def embed(query):
+        return np.array([1.0, 0.0])
+
+    async def stream_chat(*args):
+        yield "Streamed "
+        yield "answer."
+        record_usage(Usage())
+
+    async def collect():
+        return [
+            html async for html in LexAIService.stream_query_async("Q?", "Denver")
+        ]
+
+    with patch.multiple(
+        match_engine,
+        get_corpus=lambda location: corpus,
+        get_embedding_async=embed,
+        stream_chat_completion_async=stream_chat,
+    ):
+        with patch.object(metrics, "JSON_LOGS", True):
+            with caplog.at_level(logging.INFO, logger="lexai.services.metrics"):
+                updates = asyncio.run(collect())
+
+    assert "Streamed answer." in updates[-1]
+    [trace] = [
+        json.loads(record.getMessage()) for record in caplog.records
+        if '"stream_query"' in record.getMessage()
+    ]
+    assert set(trace["stages_ms"]) == {
+        "admission", "embedding", "corpus_load", "search", "context",
+        "completion", "format",
+    }
+    assert trace["prompt_tokens"] == 7
@@ -2,11 +2,29 @@
 Tests for the OpenAI client service in lexai.services.openai_client.
 """
 
-from unittest.mock import MagicMock, patch
+import asyncio
+import subprocess
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import numpy as np
+import pytest
 
-from lexai.services.openai_client import get_chat_completion, get_embedding
+from lexai.services.openai_client import (
+    embedding_cache,
+    get_chat_completion,
+    get_chat_completion_async,
+    get_client,
+    get_embedding,
+    get_embeddings,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_embedding_cache():
+    embedding_cache.clear()
+    yield
+    embedding_cache.clear()
 
 
 @patch("lexai.services.openai_client.client")
@@ -21,6 +39,36 @@ def test_get_embedding_success(mock_client):
     np.testing.assert_array_equal(embedding, np.array([0.1, 0.2, 0.3]))
 
 
+@patch("lexai.services.openai_client.client")
+def test_get_embedding_uses_cache_for_repeat_queries(mock_client):
+    """Test that a repeated (normalized) query does not call the API again."""
+    mock_response = MagicMock()
+    mock_response.data = [MagicMock(embedding=[0.1, 0.2, 0.3])]
+    mock_client.embeddings.create.return_value = mock_response
+
+    first = get_embedding("Can I build a fire pit?")
+    second = get_embedding("  can I build a  FIRE pit? ")
+
+    mock_client.embeddings.create.assert_called_once()
+    np.testing.assert_allclose(first, second, rtol=1e-6)
+    assert embedding_cache.stats()["memory"]["hits"] == 1
+
+
+@patch("lexai.services.openai_client.client")
+def test_get_embeddings_preserves_input_order(mock_client):
+    """Test that get_embeddings sends one request and orders rows by index."""
+    mock_response = MagicMock()
+    mock_response.data = [
+        MagicMock(index=1, embedding=[0.0, 1.0]),
+        MagicMock(index=0, embedding=[1.0, 0.0]),
+    ]
+    mock_client.embeddings.create.return_value = mock_response
+
+    embeddings = get_embeddings(["first", "second"])
+    mock_client.embeddings.create.assert_called_once()
+    np.testing.assert_array_equal(embeddings, np.array([[1.0, 0.0], [0.0, 1.0]]))
+
+
 @patch("lexai.services.openai_client.client")
 def test_get_chat_completion_success(mock_client):
     """Test that get_chat_completion returns the expected string."""
@@ -37,3 +85,44 @@ def test_get_chat_completion_success(mock_client):
     )
     assert isinstance(response, str)
     assert response == "Here is your legal summary."
+
+
+@patch("lexai.services.openai_client.async_client")
+def test_get_chat_completion_async_success(mock_client):
+    """Test that get_chat_completion_async awaits the async client."""
+    mock_choice = MagicMock()
+    mock_choice.message.content = " Async summary. "
+    mock_response = MagicMock()
+    mock_response.choices = [mock_choice]
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+    response = asyncio.run(
+        get_chat_completion_async(
+            role_description="You are a legal assistant.",
+            context_summary="1. Case A",
+            query="What is the precedent for X?",
+        )
+    )
+    assert response == "Async summary."
+
+
+def test_get_client_builds_once_and_respects_replacement():
+    with patch("lexai.services.openai_client.API_KEY", "test-key"):
+        with patch("lexai.services.openai_client.client", None):
+            built = get_client()
+            assert get_client() is built
+
+    replacement = MagicMock()
+    with patch("lexai.services.openai_client.client", replacement):
+        assert get_client() is replacement
+
+
+def test_importing_the_query_path_defers_heavy_modules():
+    code = (
+        "import sys, lexai.core.match_engine, lexai.services.lexai_service; "
+        "print(sorted({'openai', 'pandas', 'httpx'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,94 @@
+"""
+Tests for quantized embedding search with exact rescoring.
+"""
+
+import numpy as np
+import pytest
+
+from lexai.core.corpus_format import write_corpus
+from lexai.core.corpus_registry import Corpus
+from lexai.core.matcher import ExactSearchEngine
+from lexai.core.quantization import (
+    QuantizedSearchEngine,
+    make_search_engine,
+    quantize_float16,
+    quantize_int8,
+)
+
+
+@pytest.fixture
+def embeddings() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((500, 32))
+
+
+def test_int8_round_trip_is_close(embeddings):
+    codes, scales = quantize_int8(embeddings)
+    assert codes.dtype == np.int8
+    assert scales.shape == (32,)
+
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.testing.assert_allclose(codes * scales, normalized, atol=scales.max())
+
+
+def test_float16_rows_are_normalized(embeddings):
+    compact = quantize_float16(embeddings)
+    assert compact.dtype == np.float16
+    np.testing.assert_allclose(
+        np.linalg.norm(compact.astype(np.float32), axis=1), 1.0, atol=1e-3
+    )
+
+
+@pytest.mark.parametrize("mode", ["float16", "int8"])
+def test_search_matches_exact_engine(embeddings, mode):
+    exact = ExactSearchEngine(embeddings)
+    quantized = QuantizedSearchEngine(embeddings, mode)
+    queries = np.random.default_rng(1).standard_normal((20, 32))
+
+    for query in queries:
+        exact_indices, exact_scores = exact.search(query, 5)
+        indices, scores = quantized.search(query, 5)
+        np.testing.assert_array_equal(indices, exact_indices)
+        np.testing.assert_allclose(scores, exact_scores, rtol=1e-5)
+
+    batch_indices, batch_scores = quantized.search_batch(queries, 5)
+    exact_indices, exact_scores = exact.search_batch(queries, 5)
+    np.testing.assert_array_equal(batch_indices, exact_indices)
+    np.testing.assert_allclose(batch_scores, exact_scores, rtol=1e-5)
+
+
+def test_compact_matrix_is_smaller(embeddings):
+    full_size = ExactSearchEngine(embeddings).embeddings.nbytes
+    assert QuantizedSearchEngine(embeddings, "float16").nbytes < full_size
+    assert QuantizedSearchEngine(embeddings, "int8").nbytes < full_size / 3
+
+
+def test_num_matches_larger_than_corpus(embeddings):
+    engine = QuantizedSearchEngine(embeddings[:3], "int8")
+    indices, scores = engine.search_batch(embeddings[:2], 10)
+    assert indices.shape == scores.shape == (2, 3)
+
+
+def test_make_search_engine_modes(embeddings):
+    assert isinstance(make_search_engine(embeddings, "none"), ExactSearchEngine)
+    engine = make_search_engine(embeddings, "INT8")
+    assert isinstance(engine, QuantizedSearchEngine)
+    assert engine.mode == "int8"
+    with pytest.raises(ValueError, match="Unsupported"):
+        make_search_engine(embeddings, "int4")
+
+
+def test_corpus_rescores_against_memory_map(embeddings, tmp_path):
+    columns = {
+        name: [f"{name}{i}" for i in range(len(embeddings))]
+        for name in ("url", "title", "subtitle", "content")
+    }
+    write_corpus(str(tmp_path / "c.corpus"), embeddings, columns)
+
+    corpus = Corpus.load("City", str(tmp_path / "c.corpus"), quantization="int8")
+    assert isinstance(corpus.engine, QuantizedSearchEngine)
+    assert isinstance(corpus.engine.embeddings, np.memmap)
+
+    _, scores, matches = corpus.search(embeddings[42], num_matches=1)
+    assert matches[0]["url"] == "url42"
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,167 @@
+"""
+Tests for segmented corpora: delta segments, tombstones and compaction.
+"""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from lexai.core.corpus_format import write_corpus
+from lexai.core.corpus_registry import Corpus, file_fingerprint
+from lexai.core.ivf_index import ivf_index_path
+from lexai.core.segments import (
+    add_delta,
+    compact,
+    create_segmented_corpus,
+    load_segmented_corpus,
+    read_segments_manifest,
+)
+from lexai.tools.build_index import build_index
+from lexai.tools.update_corpus import add_update
+
+
+def _columns(urls):
+    return {
+        "url": urls,
+        "title": [url.upper() for url in urls],
+        "subtitle": [""] * len(urls),
+        "content": [f"text of {url}" for url in urls],
+    }
+
+
+def _unit(dim, index):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[index] = 1.0
+    return vector
+
+
+@pytest.fixture
+def segmented(tmp_path: Path) -> str:
+    base = tmp_path / "base.corpus"
+    write_corpus(str(base), np.eye(4, 8), _columns(["a", "b", "c", "d"]))
+    root = tmp_path / "city.segments"
+    create_segmented_corpus(str(root), str(base))
+    return str(root)
+
+
+def _search_urls(root, dim_index, k=2):
+    engine, metadata = load_segmented_corpus(root)
+    indices, _ = engine.search(_unit(8, dim_index), k)
+    return [row["url"] for row in metadata.take(indices)]
+
+
+def test_base_only(segmented):
+    assert _search_urls(segmented, 2, k=1) == ["c"]
+
+
+def test_delta_additions_are_merged(segmented):
+    add_delta(segmented, np.eye(8)[4:6], _columns(["e", "f"]))
+    assert _search_urls(segmented, 5, k=1) == ["f"]
+    assert _search_urls(segmented, 0, k=1) == ["a"]
+
+
+def test_tombstone_hides_earlier_sections(segmented):
+    add_delta(segmented, np.empty(0), _columns([]), tombstones=["a"])
+    engine, metadata = load_segmented_corpus(segmented)
+    indices, _ = engine.search(_unit(8, 0), 4)
+    urls = [row["url"] for row in metadata.take(indices)]
+    assert "a" not in urls
+    assert len(urls) == 3
+
+
+def test_amendment_replaces_section(segmented):
+    amended = _unit(8, 6)[np.newaxis, :]
+    add_delta(segmented, amended, _columns(["b"]), tombstones=["b"])
+
+    engine, metadata = load_segmented_corpus(segmented)
+    indices, scores = engine.search(_unit(8, 6), 1)
+    assert metadata.take(indices)[0]["url"] == "b"
+    assert scores[0] == pytest.approx(1.0)
+    # The old version of "b" no longer matches its old direction.
+    indices, _ = engine.search(_unit(8, 1), 5)
+    assert [row["url"] for row in metadata.take(indices)].count("b") == 1
+
+
+def test_search_batch_pads_when_too_few_live_sections(segmented):
+    add_delta(segmented, np.empty(0), _columns([]), tombstones=["a", "b", "c"])
+    engine, _ = load_segmented_corpus(segmented)
+    indices, scores = engine.search_batch(np.eye(8, dtype=np.float32)[:2], 3)
+    assert indices.shape == (2, 3)
+    assert (indices[:, 1:] == -1).all()
+    assert np.isneginf(scores[:, 1:]).all()
+
+
+def test_compact_folds_deltas(segmented):
+    add_delta(segmented, np.eye(8)[4:5], _columns(["e"]))
+    add_delta(segmented, np.empty(0), _columns([]), tombstones=["a"])
+    before = _search_urls(segmented, 4, k=4)
+
+    name = compact(segmented)
+    manifest = read_segments_manifest(segmented)
+    assert manifest["base"] == name
+    assert manifest["deltas"] == []
+    assert sorted(p.name for p in Path(segmented).iterdir()) == [
+        name, "segments.json"
+    ]
+    after = _search_urls(segmented, 4, k=4)
+    assert after[0] == before[0] == "e"
+    assert sorted(after) == sorted(before) == ["b", "c", "d", "e"]
+    assert compact(segmented) is None
+
+
+def test_compact_keeps_deltas_added_while_it_runs(segmented):
+    add_delta(segmented, np.eye(8)[4:5], _columns(["e"]))
+
+    def write_and_add_delta(path, embeddings, columns):
+        write_corpus(path, embeddings, columns)
+        if Path(path).name.startswith("base-"):
+            added.append(add_delta(segmented, np.eye(8)[5:6], _columns(["f"]),
+                                   tombstones=["b"]))
+
+    added = []
+    with patch("lexai.core.segments.write_corpus", write_and_add_delta):
+        name = compact(segmented)
+
+    manifest = read_segments_manifest(segmented)
+    assert manifest["base"] == name
+    assert manifest["deltas"] == added
+    assert Path(segmented, added[0]).is_dir()
+    assert _search_urls(segmented, 5, k=1) == ["f"]
+    assert "b" not in _search_urls(segmented, 1, k=4)
+    assert not Path(segmented, "segments.lock").exists()
+
+
+def test_compact_rebuilds_base_index(segmented):
+    base = Path(segmented, read_segments_manifest(segmented)["base"])
+    build_index(str(base), nlist=2)
+    add_delta(segmented, np.eye(8)[4:5], _columns(["e"]))
+
+    name = compact(segmented)
+    assert Path(ivf_index_path(str(Path(segmented, name)))).exists()
+
+
+def test_delta_dimension_mismatch(segmented):
+    with pytest.raises(ValueError, match="matrix"):
+        add_delta(segmented, np.zeros((1, 3)), _columns(["x"]))
+
+
+def test_add_update_replace(segmented, tmp_path):
+    update = tmp_path / "update.corpus"
+    write_corpus(str(update), _unit(8, 7)[np.newaxis, :], _columns(["d"]))
+    add_update(segmented, str(update), delete_urls=["c"], replace=True)
+
+    assert _search_urls(segmented, 7, k=1) == ["d"]
+    assert "c" not in _search_urls(segmented, 2, k=4)
+
+
+def test_registry_corpus_loads_segments(segmented):
+    fingerprint = file_fingerprint(segmented)
+    corpus = Corpus.load("City", segmented)
+    assert corpus.embeddings is None
+    _, _, matches = corpus.search(_unit(8, 3), num_matches=1)
+    assert matches[0]["url"] == "d"
+
+    add_delta(segmented, np.eye(8)[4:5], _columns(["e"]))
+    assert file_fingerprint(segmented) != fingerprint
@@ -0,0 +1,78 @@
+"""
+Tests for the ASGI application in lexai.ui.server.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import gradio as gr
+import pytest
+from fastapi.testclient import TestClient
+
+from lexai.services.admission import AdmissionController, Limiter
+from lexai.ui.gradio_interface import build_interface
+from lexai.ui.server import create_app
+
+
+@pytest.fixture
+def client():
+    with gr.Blocks() as interface:
+        gr.Markdown("LexAI")
+    return TestClient(create_app(interface))
+
+
+def test_metrics_endpoint_serves_exposition_format(client):
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE lexai_request_duration_seconds histogram" in response.text
+
+
+@patch("lexai.ui.server.generate_matches_async", new_callable=AsyncMock)
+def test_query_endpoint_returns_match_engine_result(mock_generate, client):
+    mock_generate.return_value = {"response": "Answer.", "matches": []}
+
+    response = client.post(
+        "/api/query", json={"query": "Q?", "location": ["Denver", "Boulder"]}
+    )
+
+    assert response.json() == {"response": "Answer.", "matches": []}
+    mock_generate.assert_awaited_once_with("Q?", ["Denver", "Boulder"])
+
+
+def test_query_endpoint_validates_body(client):
+    assert client.post("/api/query", json={"query": "Q?"}).status_code == 422
+
+
+@patch("lexai.ui.server.generate_matches_async", new_callable=AsyncMock)
+def test_query_endpoint_rejects_when_saturated(mock_generate, client):
+    controller = AdmissionController(max_concurrent=1, max_queue=0, timeout=1)
+    controller.requests.acquire()
+
+    with patch("lexai.ui.server.admission", controller):
+        response = client.post("/api/query", json={"query": "Q?", "location": "Denver"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    mock_generate.assert_not_awaited()
+
+
+def test_query_endpoint_rejects_when_embeddings_are_saturated(client):
+    embeddings = Limiter("test_server_embeddings", limit=1, max_waiting=0)
+    embeddings.acquire()
+
+    with patch("lexai.services.openai_client.upstream", return_value=embeddings), \
+            patch("lexai.services.openai_client.get_coalescer", return_value=None):
+        response = client.post(
+            "/api/query", json={"query": "Saturated?", "location": "Denver"}
+        )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert "test_server_embeddings" in response.json()["error"]
+
+
+def test_interface_without_queue_serves_each_event_in_one_request():
+    interface = build_interface(queue=False)
+
+    assert not any(dep["queue"] for dep in interface.config["dependencies"])
@@ -0,0 +1,179 @@
+"""
+Tests for sharing corpora between worker processes in lexai.core.shared_corpus.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from lexai.core.corpus_format import is_corpus_dir, write_corpus
+from lexai.core.corpus_registry import Corpus, CorpusRegistry
+from lexai.core.ivf_index import IVFFlatIndex, ivf_index_path
+from lexai.core.lexical_index import LexicalIndex, lexical_index_path
+from lexai.core.matcher import normalize_rows
+from lexai.core.metadata_store import MetadataStore
+from lexai.core.shared_corpus import (
+    CorpusStager,
+    stage_corpora,
+    stage_corpus,
+    staging_directory,
+)
+
+COLUMNS = {
+    "url": ["u1", "u2", "u3"],
+    "title": ["Sec. 1", "Sec. 2", "Sec. 3"],
+    "subtitle": ["", "", ""],
+    "content": ["Fences", "Setbacks", "Fire pits"],
+}
+
+
+def write_npz(path: Path, embeddings: np.ndarray) -> Path:
+    np.savez(
+        path,
+        embeddings=embeddings,
+        urls=np.array(COLUMNS["url"], dtype=object),
+        titles=np.array(COLUMNS["title"], dtype=object),
+        subtitles=np.array(COLUMNS["subtitle"], dtype=object),
+        contents=np.array(COLUMNS["content"], dtype=object),
+    )
+    return path
+
+
+def test_npz_corpus_is_staged_as_a_shared_mapping(tmp_path: Path):
+    embeddings = np.array([[3.0, 4.0], [1.0, 0.0], [0.0, 2.0]])
+    source = write_npz(tmp_path / "denver.npz", embeddings)
+    digest = MetadataStore.from_columns(COLUMNS).digest()
+    LexicalIndex.build(COLUMNS["content"], corpus_digest=digest).save(
+        lexical_index_path(str(source))
+    )
+    staging_dir = tmp_path / "shm"
+    staging_dir.mkdir()
+
+    staged = stage_corpus("Denver", str(source), str(staging_dir))
+
+    assert staged == str(staging_dir / "denver.corpus")
+    assert is_corpus_dir(staged)
+    assert os.path.islink(lexical_index_path(staged))
+    corpus = Corpus.load("Denver", staged)
+    # The exact engine searches the mapped file itself, not a private copy.
+    assert isinstance(corpus.engine.embeddings, np.memmap)
+    np.testing.assert_allclose(corpus.embeddings[0], [0.6, 0.8], rtol=1e-6)
+    assert corpus.lexical is not None
+    assert corpus.metadata.to_columns() == COLUMNS
+
+
+def test_staged_copy_keeps_the_ivf_index_of_a_normalized_npz(tmp_path: Path):
+    embeddings = normalize_rows(np.random.default_rng(0).normal(size=(3, 4)))
+    source = write_npz(tmp_path / "denver.npz", embeddings)
+    IVFFlatIndex.build(
+        embeddings, nlist=1, corpus_digest=MetadataStore.from_columns(COLUMNS).digest()
+    ).save(ivf_index_path(str(source)))
+
+    staged = stage_corpus("Denver", str(source), str(tmp_path))
+
+    assert isinstance(Corpus.load("Denver", staged).engine, IVFFlatIndex)
+
+
+def test_normalized_corpus_directory_is_shared_in_place(tmp_path: Path):
+    normalized = tmp_path / "normalized.corpus"
+    write_corpus(str(normalized), np.eye(3), COLUMNS)
+    unnormalized = tmp_path / "unnormalized.corpus"
+    write_corpus(str(unnormalized), 2 * np.eye(3), COLUMNS)
+
+    assert stage_corpus("A", str(normalized), str(tmp_path)) == str(normalized)
+    assert stage_corpus("B", str(unnormalized), str(tmp_path)) == str(
+        tmp_path / "b.corpus"
+    )
+
+
+def test_stage_corpora_keeps_paths_that_fail_to_stage(tmp_path: Path):
+    source = write_npz(tmp_path / "boulder.npz", np.eye(3))
+    location_info = {
+        "Boulder": {"npz_file": str(source)},
+        "Atlantis": {"npz_file": str(tmp_path / "missing.npz")},
+    }
+
+    paths = stage_corpora(location_info, str(tmp_path))
+
+    assert paths == {
+        "Boulder": str(tmp_path / "boulder.corpus"),
+        "Atlantis": str(tmp_path / "missing.npz"),
+    }
+
+
+def test_stager_restages_a_changed_original(tmp_path: Path):
+    source = write_npz(tmp_path / "denver.npz", np.eye(3))
+    digest = MetadataStore.from_columns(COLUMNS).digest()
+    LexicalIndex.build(COLUMNS["content"], corpus_digest=digest).save(
+        lexical_index_path(str(source))
+    )
+    staging_dir = tmp_path / "shm"
+    staging_dir.mkdir()
+    stager = CorpusStager({"Denver": {"npz_file": str(source)}}, str(staging_dir))
+    paths = stager.stage_all()
+    registry = CorpusRegistry(
+        {"Denver": {"npz_file": paths["Denver"]}}, check_interval=0
+    )
+    assert registry.get("Denver").embeddings[0].tolist() == [1.0, 0.0, 0.0]
+
+    stager.refresh()  # unchanged originals are left alone
+    assert registry.get("Denver").embeddings[0].tolist() == [1.0, 0.0, 0.0]
+    write_npz(source, 2 * np.eye(3)[::-1])
+    os.utime(source, ns=(0, 10**9))
+    stager.refresh()
+
+    corpus = registry.get("Denver")
+    assert corpus.embeddings[0].tolist() == [0.0, 0.0, 1.0]
+    assert corpus.lexical is not None
+    assert sorted(os.listdir(staging_dir)) == ["denver.corpus"]
+
+
+def test_stager_leaves_corpora_served_in_place(tmp_path: Path):
+    normalized = tmp_path / "normalized.corpus"
+    write_corpus(str(normalized), np.eye(3), COLUMNS)
+    stager = CorpusStager({"A": {"npz_file": str(normalized)}}, str(tmp_path))
+    assert stager.stage_all() == {"A": str(normalized)}
+
+    write_corpus(str(normalized), 2 * np.eye(3), COLUMNS)
+    stager.refresh()
+
+    assert not (tmp_path / "a.corpus").exists()
+
+
+def test_staging_directory_is_removed_on_exit(tmp_path: Path):
+    with staging_directory(str(tmp_path)) as staging_dir:
+        write_corpus(os.path.join(staging_dir, "x.corpus"), np.eye(3), COLUMNS)
+        assert os.path.dirname(staging_dir) == str(tmp_path)
+
+    assert not os.path.exists(staging_dir)
+
+
+def test_workers_read_staged_paths_from_the_environment():
+    env = {**os.environ, "LEXAI_CORPUS_PATHS": json.dumps({"Denver": "/shm/d"})}
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "from lexai.config import LOCATION_INFO; "
+         "print(LOCATION_INFO['Denver']['npz_file'])"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+
+    assert result.stdout.strip() == "/shm/d"
+
+
+def test_workers_divide_the_limits_among_themselves():
+    env = {**os.environ, "LEXAI_SERVE_WORKERS": "4",
+           "LEXAI_ADMISSION_MAX_CONCURRENT": "32", "LEXAI_CHAT_MAX_CONCURRENT": "2",
+           "LEXAI_ADMISSION_MAX_QUEUE": "0"}
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "from lexai import config; "
+         "print(config.ADMISSION_MAX_CONCURRENT, config.CHAT_MAX_CONCURRENT, "
+         "config.ADMISSION_MAX_QUEUE)"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+
+    assert result.stdout.split() == ["8", "1", "0"]
@@ -0,0 +1,62 @@
+"""
+Tests for startup timing in lexai.startup and lexai.tools.import_report.
+"""
+
+import logging
+import time
+
+from lexai.startup import StartupTimer, process_age
+from lexai.tools.import_report import parse_importtime, summarize
+
+
+def test_startup_timer_reports_each_phase():
+    timer = StartupTimer()
+    with timer.phase("import"):
+        time.sleep(0.01)
+    with timer.phase("warm_up"):
+        pass
+
+    report = timer.report()
+    assert list(report) == ["before_main", "import", "warm_up", "total"]
+    assert report["import"] >= 0.01
+    assert report["total"] >= report["import"] + report["warm_up"]
+
+
+def test_startup_timer_records_failed_phases():
+    timer = StartupTimer()
+    try:
+        with timer.phase("broken"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert "broken" in timer.report()
+
+
+def test_startup_timer_logs_a_table(caplog):
+    timer = StartupTimer()
+    with timer.phase("build_app"):
+        pass
+    with caplog.at_level(logging.INFO, logger="lexai.startup"):
+        timer.log()
+    assert "build_app" in caplog.text
+
+
+def test_process_age_is_positive_when_known():
+    age = process_age()
+    assert age is None or age > 0
+
+
+def test_parse_importtime_and_summarize():
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 |   numpy.core",
+        "import time:       300 |        400 | numpy",
+        "import time:      1000 |       1400 | lexai.core",
+    ])
+    records = parse_importtime(output)
+
+    assert [r.module for r in records] == ["numpy.core", "numpy", "lexai.core"]
+    assert records[1].self_time == 0.0003
+    report = summarize(records, "lexai.core", top=5)
+    assert report.startswith("lexai.core: 0.001s")
+    assert "numpy" in report.splitlines()[3]
@@ -0,0 +1,245 @@
+"""
+Tests for deadlines, retries and hedging in lexai.services.transport.
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+from lexai.services import transport
+from lexai.services.admission import Limiter
+from lexai.services.transport import (
+    Deadlines,
+    LatencyTracker,
+    RetryPolicy,
+    hedged,
+    hedged_async,
+    request,
+    request_async,
+)
+from lexai.tools.fake_openai import FakeOpenAIServer
+
+NO_DELAY = RetryPolicy(max_retries=3, base_delay=0.0, max_delay=0.0)
+DEADLINES = Deadlines(connect=1.0, read=5.0, total=10.0)
+
+
+def _status_error(status: int, headers=None) -> openai.APIStatusError:
+    response = httpx.Response(
+        status, headers=headers, request=httpx.Request("POST", "http://fake")
+    )
+    error_class = {
+        400: openai.BadRequestError,
+        429: openai.RateLimitError,
+        503: openai.InternalServerError,
+    }[status]
+    return error_class("failed", response=response, body=None)
+
+
+def _flaky(errors, result="ok"):
+    calls = []
+
+    def call(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return call, calls
+
+
+def test_retry_policy_uses_full_jitter_and_retry_after():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, rng=random.Random(0))
+
+    delays = [policy.delay(2, ValueError()) for _ in range(100)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert max(delays) > 2.0
+
+    assert 2.0 <= policy.delay(0, _status_error(429, {"retry-after": "2"})) <= 3.0
+    assert policy.delay(0, _status_error(429, {"retry-after": "60"})) == 5.0
+
+
+def test_request_retries_rate_limits_and_server_errors():
+    call, calls = _flaky([_status_error(429), _status_error(503)])
+
+    assert request(call, DEADLINES, "test", policy=NO_DELAY) == "ok"
+    assert len(calls) == 3
+    assert calls[0].connect == 1.0
+    assert calls[0].read == 5.0
+
+
+def test_request_does_not_retry_client_errors():
+    call, calls = _flaky([_status_error(400)])
+
+    with pytest.raises(openai.BadRequestError):
+        request(call, DEADLINES, "test", policy=NO_DELAY)
+    assert len(calls) == 1
+
+
+def test_request_gives_up_after_max_retries():
+    call, calls = _flaky([_status_error(503)] * 5)
+
+    with pytest.raises(openai.InternalServerError):
+        request(call, DEADLINES, "test", policy=NO_DELAY)
+    assert len(calls) == 4
+
+
+def test_request_respects_total_deadline():
+    call, calls = _flaky([_status_error(429, {"retry-after": "5"})])
+    policy = RetryPolicy(max_retries=3, base_delay=0.0, max_delay=10.0)
+
+    start = time.monotonic()
+    with pytest.raises(openai.RateLimitError):
+        request(call, Deadlines(1.0, 5.0, total=1.0), "test", policy=policy)
+    assert time.monotonic() - start < 0.5
+    assert len(calls) == 1
+
+
+def test_request_caps_timeouts_by_remaining_deadline():
+    call, calls = _flaky([])
+
+    request(call, Deadlines(connect=1.0, read=5.0, total=0.5), "test")
+
+    assert calls[0].read <= 0.5
+    assert calls[0].connect <= 0.5
+
+
+def test_request_async_retries_and_enforces_deadline():
+    attempts = []
+
+    async def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            raise _status_error(503)
+        return "ok"
+
+    assert asyncio.run(request_async(flaky, DEADLINES, "test", policy=NO_DELAY)) == "ok"
+
+    async def stalled(timeout):
+        await asyncio.sleep(10)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(request_async(stalled, Deadlines(1.0, 5.0, 0.05), "test"))
+
+
+def test_request_retries_injected_429s_from_fake_server():
+    app = FakeOpenAIServer(dim=4, rate_limit_rate=0.5, seed=1).create_app()
+    client = openai.OpenAI(
+        api_key="x",
+        base_url="http://fake/v1",
+        http_client=TestClient(app, base_url="http://fake"),
+        max_retries=0,
+    )
+    policy = RetryPolicy(max_retries=10, base_delay=0.0, max_delay=0.0)
+
+    for _ in range(5):
+        response = request(
+            lambda timeout: client.embeddings.create(
+                input="a", model="m", timeout=timeout
+            ),
+            DEADLINES,
+            "test",
+            policy=policy,
+        )
+        assert len(response.data[0].embedding) == 4
+
+
+def _warm_tracker(latency: float) -> LatencyTracker:
+    tracker = LatencyTracker(min_samples=3)
+    for _ in range(3):
+        tracker.record(latency)
+    return tracker
+
+
+def test_latency_tracker_needs_min_samples():
+    tracker = LatencyTracker(min_samples=2)
+    tracker.record(1.0)
+    assert tracker.quantile(0.95) is None
+    tracker.record(3.0)
+    assert tracker.quantile(0.5) == pytest.approx(2.0)
+
+
+def test_hedged_sends_duplicate_when_call_stalls():
+    tracker = _warm_tracker(0.01)
+    calls = []
+    lock = threading.Lock()
+    before = transport.HEDGES.value(call="test", result="won")
+
+    def call():
+        with lock:
+            calls.append(None)
+            first = len(calls) == 1
+        time.sleep(1.0 if first else 0.0)
+        return "slow" if first else "fast"
+
+    start = time.perf_counter()
+    assert hedged(call, tracker, "test") == "fast"
+    assert time.perf_counter() - start < 0.5
+    assert transport.HEDGES.value(call="test", result="won") == before + 1
+
+
+def test_hedged_duplicate_needs_a_free_upstream_slot():
+    tracker = _warm_tracker(0.01)
+    slots = Limiter("test_hedge_slots", limit=2)
+    slots.acquire()  # held by the caller for the primary request
+    calls = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            calls.append(None)
+            first = len(calls) == 1
+        time.sleep(0.3 if first else 0.0)
+        return "primary" if first else "duplicate"
+
+    assert hedged(call, tracker, "test_slots", slots=slots) == "duplicate"
+    time.sleep(0.01)
+    assert slots.in_flight == 1
+
+    calls.clear()
+    slots.acquire()  # no slot is left for a duplicate
+    assert hedged(call, tracker, "test_slots", slots=slots) == "primary"
+    assert len(calls) == 1
+    assert transport.HEDGES.value(call="test_slots", result="skipped") == 1
+    assert slots.in_flight == 2
+
+
+def test_hedged_runs_once_without_enough_samples():
+    calls = []
+
+    def call():
+        calls.append(None)
+        return "ok"
+
+    assert hedged(call, LatencyTracker(min_samples=5), "test") == "ok"
+    assert len(calls) == 1
+
+
+def test_hedged_async_cancels_the_loser():
+    tracker = _warm_tracker(0.01)
+    started = []
+    cancelled = []
+
+    async def call():
+        started.append(None)
+        if len(started) == 1:
+            try:
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "slow"
+        return "fast"
+
+    async def run():
+        result = await hedged_async(call, tracker, "test")
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == "fast"
+    assert cancelled == [True]